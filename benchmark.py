@@ -0,0 +1,438 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Production workload replay benchmark.
+#
+# benchmark.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Creates a fresh database for each combination of journal mode,
+#   synchronous level and checkpoint policy, as setup.py would: with the
+#   PRAGMA profile of mode '--profile' (profiles.py, PRD by default), the
+#   journal mode and synchronous level of the combination overriding the
+#   profile's. It then runs the production workloads against it
+#   concurrently, each in its own process, which applies the recorded
+#   runtime settings (profiles.apply()):
+#
+#       psud            PSU status update (2 Hz) and command claiming
+#       hitcount        one rotation every 15 s
+#       pulseheight     frequent single event inserts (20 Hz)
+#       ui              dashboard reads (2 Hz), command inserts (0.5 Hz)
+#
+#   Cadences can be compressed with '--speedup'. Checkpoint policy 'auto'
+#   leaves checkpointing to SQLite (the profile's wal_autocheckpoint),
+#   'walmaint' runs the maintenance daemon (walmaint.py) and defers it in
+#   the workers (walmaint.configure()).
+#
+#   Latency percentiles (p50/p95/p99), SQLITE_BUSY counts and throughput
+#   are reported per operation, and written as JSON into the output
+#   directory (one file per invocation), for tracking regressions. The
+#   WAL size is sampled when the workloads have finished, before the
+#   final checkpoint of walmaint (or of the last connection to close).
+#
+import os
+import sys
+import json
+import time
+import queue
+import numpy
+import random
+import sqlite3
+import argparse
+import tempfile
+import itertools
+import threading
+import multiprocessing
+
+import schema
+import devdata
+import profiles
+import walmaint
+import cmdqueue
+import psustatus
+
+
+class Config:
+    duration        = 30.0          # seconds per run
+    speedup         = 1.0           # cadence multiplier
+    busy_timeout    = 5.0           # seconds
+    grace           = 30.0          # seconds; workers late beyond the run are stopped
+    output          = "benchmark"   # results directory
+    profile         = "PRD"         # profiles.py mode
+    class Matrix:
+        journal_mode    = ["wal", "delete"]
+        synchronous     = ["NORMAL", "FULL"]
+        checkpoint      = ["auto", "walmaint"]
+
+
+# Workload: interval (seconds, at real cadence)
+WORKLOADS = {
+    "psud":         0.5,
+    "hitcount":     15.0,
+    "pulseheight":  0.05,
+    "ui":           0.5
+}
+
+
+def create_database(filename: str, settings: dict):
+    """Create database as setup.py does, with the profile of the run and
+    minimal content."""
+    pragmas = profiles.profile(
+        settings["profile"],
+        {
+            "journal_mode": settings["journal_mode"],
+            "synchronous":  settings["synchronous"]
+        }
+    )
+    connection = sqlite3.connect(filename)
+    profiles.create(connection, pragmas)
+    schema.create(connection, "table")
+    profiles.record(connection, pragmas)
+    connection.execute(
+        "INSERT INTO pate (id_min, id_max, label) VALUES (0, 1000, 'Benchmark')"
+    )
+    connection.execute(
+        """
+        INSERT INTO testing_session (started, pate_id, pate_firmware)
+        VALUES (CURRENT_TIMESTAMP, 1, 'Benchmark')
+        """
+    )
+    connection.commit()
+    psustatus.publish(connection, 'OFF', 0.0, 0.0, 0.0, 0.0)
+    connection.close()
+
+
+##############################################################################
+#
+# Workloads
+#
+#   Each workload is set up with a connection and returns a function that,
+#   for each tick, yields (operation name, callable) pairs to be timed.
+#
+##############################################################################
+
+def _psud(connection):
+    def tick(n: int):
+        value = random.random()
+        yield "psu_update", lambda: psustatus.publish(
+            connection, 'ON', 5.0, 0.5, value, 5.0 - value
+        )
+        yield "command_claim", lambda: cmdqueue.claim(connection)
+    return tick
+
+
+def _hitcount(connection):
+    sql = schema.HITCOUNT.insert
+    row = next(
+        devdata.generate_hitcount_packets(1, len(schema.HITCOUNT.data), 1, seed = 1)
+    )[0].tolist()
+    def tick(n: int):
+        def insert():
+            row[0] += 15
+            connection.execute(sql, row)
+            connection.commit()
+        yield "hitcount_insert", insert
+    return tick
+
+
+def _pulseheight(connection):
+    # Timestamps are seconds, as in real data; at 20 Hz, consecutive events
+    # are one second apart to keep the primary keys unique
+    start = int(time.time())
+    def tick(n: int):
+        row = [start + n, 1] + [random.randrange(256) for _ in range(8)]
+        def insert():
+            connection.execute(schema.PULSEHEIGHT.insert, row)
+            connection.commit()
+        yield "pulseheight_insert", insert
+    return tick
+
+
+def _ui(connection):
+    def dashboard():
+        connection.execute(
+            "SELECT * FROM hitcount WHERE session_id = 1 ORDER BY timestamp DESC LIMIT 1"
+        ).fetchall()
+        connection.execute(
+            "SELECT * FROM pulseheight WHERE session_id = 1 ORDER BY timestamp DESC LIMIT 60"
+        ).fetchall()
+        connection.execute("SELECT * FROM psu").fetchall()
+        connection.execute(
+            "SELECT COUNT(*) FROM command WHERE handled IS NULL"
+        ).fetchall()
+    def command():
+        cmdqueue.submit(connection, 1, 'PSU', 'SET VOLTAGE', '5.0')
+    def tick(n: int):
+        yield "dashboard_read", dashboard
+        if n % 4 == 0:
+            yield "command_insert", command
+    return tick
+
+
+def worker(name: str, database: str, settings: dict, start: float, results):
+    """Run workload 'name' until start + duration, report results to queue
+    'results'."""
+    workloads = {"psud": _psud, "hitcount": _hitcount, "pulseheight": _pulseheight, "ui": _ui}
+    latencies = {}
+    busy = {}
+    error = None
+    try:
+        connection = sqlite3.connect(database, timeout = settings["busy_timeout"])
+        profiles.apply(connection)
+        if settings["checkpoint"] == "walmaint":
+            walmaint.configure(connection)
+        operations = workloads[name](connection)
+        interval = WORKLOADS[name] / settings["speedup"]
+        end = start + settings["duration"]
+        time.sleep(max(start - time.time(), 0))
+        next_at = time.time()
+        for tick in itertools.count():
+            if next_at >= end:
+                break
+            for op, function in operations(tick):
+                begin = time.perf_counter()
+                try:
+                    function()
+                except sqlite3.OperationalError as e:
+                    if "locked" not in str(e) and "busy" not in str(e):
+                        raise
+                    busy[op] = busy.get(op, 0) + 1
+                    if connection.in_transaction:
+                        connection.rollback()
+                    continue
+                latencies.setdefault(op, []).append(time.perf_counter() - begin)
+            next_at = max(next_at + interval, time.time())
+            time.sleep(max(next_at - time.time(), 0))
+        connection.close()
+    except Exception as e:
+        error = "{}: {}".format(name, e)
+    finally:
+        results.put((name, latencies, busy, error))
+
+
+def maintainer(database: str, stop):
+    """Run walmaint until multiprocessing.Event 'stop' is set."""
+    m = walmaint.Maintainer(database)
+    threading.Thread(target = lambda: (stop.wait(), m.stop())).start()
+    m.run()
+
+
+def run(settings: dict) -> dict:
+    """Run all workloads with given settings, return per-operation results."""
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, "patemon.sqlite3")
+        create_database(database, settings)
+        # Keeps the WAL file from being checkpointed and removed by the
+        # last worker to close, until it has been measured
+        observer = sqlite3.connect(database)
+        observer.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        results = multiprocessing.Queue()
+        stop = multiprocessing.Event()
+        start = time.time() + 1.0
+        workers = {
+            name: multiprocessing.Process(
+                target = worker,
+                args = (name, database, settings, start, results)
+            )
+            for name in WORKLOADS
+        }
+        processes = list(workers.values())
+        if settings["checkpoint"] == "walmaint":
+            processes.append(
+                multiprocessing.Process(
+                    target = maintainer,
+                    args = (database, stop)
+                )
+            )
+        for p in processes:
+            p.start()
+        latencies, busy, errors = {}, {}, []
+        deadline = start + settings["duration"] + Config.grace
+        while workers:
+            # Results of a worker are in the queue by the time it has exited;
+            # one that exited without (killed, out of memory) never reports
+            exited = [name for name, p in workers.items() if not p.is_alive()]
+            try:
+                name, lat, bsy, error = results.get(timeout = 1.0)
+            except queue.Empty:
+                for name in exited:
+                    errors.append(
+                        "{}: exited with code {}".format(name, workers.pop(name).exitcode)
+                    )
+                if time.time() > deadline:
+                    for name, p in workers.items():
+                        p.terminate()
+                        errors.append("{}: did not finish, terminated".format(name))
+                    workers.clear()
+                continue
+            workers.pop(name)
+            if error:
+                errors.append(error)
+            latencies.update(lat)
+            for op, n in bsy.items():
+                busy[op] = busy.get(op, 0) + n
+        wal = database + "-wal"
+        wal_size = os.path.getsize(wal) if os.path.exists(wal) else 0
+        stop.set()
+        for p in processes:
+            p.join()
+        observer.close()
+    results = {}
+    for op in sorted(set(latencies) | set(busy)):
+        values = numpy.array(latencies.get(op, [numpy.nan])) * 1000
+        results[op] = {
+            "count":        len(latencies.get(op, [])),
+            "busy":         busy.get(op, 0),
+            "throughput":   len(latencies.get(op, [])) / settings["duration"],
+            "mean_ms":      float(numpy.nanmean(values)),
+            "p50_ms":       float(numpy.nanpercentile(values, 50)),
+            "p95_ms":       float(numpy.nanpercentile(values, 95)),
+            "p99_ms":       float(numpy.nanpercentile(values, 99)),
+            "max_ms":       float(numpy.nanmax(values))
+        }
+    return {
+        "settings":     settings,
+        "wal_size":     wal_size,
+        "errors":       errors,
+        "operations":   results
+    }
+
+
+def matrix(journal_modes, synchronous, checkpoints):
+    """Setting combinations; checkpoint policy only matters for WAL."""
+    for journal_mode, sync in itertools.product(journal_modes, synchronous):
+        for checkpoint in (checkpoints if journal_mode == "wal" else ["auto"]):
+            yield {
+                "journal_mode": journal_mode,
+                "synchronous":  sync,
+                "checkpoint":   checkpoint,
+                "profile":      Config.profile,
+                "duration":     Config.duration,
+                "speedup":      Config.speedup,
+                "busy_timeout": Config.busy_timeout
+            }
+
+
+def report(result: dict):
+    s = result["settings"]
+    print(
+        "profile={} journal_mode={} synchronous={} checkpoint={} wal_size={}".format(
+            s["profile"], s["journal_mode"], s["synchronous"], s["checkpoint"],
+            result["wal_size"]
+        )
+    )
+    print(
+        "    {:<20} {:>7} {:>6} {:>8} {:>8} {:>8} {:>8} {:>6}".format(
+            "operation", "count", "ops/s", "p50 ms", "p95 ms", "p99 ms", "max ms", "busy"
+        )
+    )
+    for error in result["errors"]:
+        print("    ERROR: {}".format(error))
+    for op, r in result["operations"].items():
+        print(
+            "    {:<20} {:>7} {:>6.1f} {:>8.2f} {:>8.2f} {:>8.2f} {:>8.2f} {:>6}".format(
+                op, r["count"], r["throughput"], r["p50_ms"], r["p95_ms"],
+                r["p99_ms"], r["max_ms"], r["busy"]
+            )
+        )
+
+
+def write(results: list, directory: str) -> str:
+    """Write run results as JSON into 'directory'. Returns the filename."""
+    os.makedirs(directory, exist_ok = True)
+    filename = os.path.join(
+        directory,
+        "benchmark-{}.json".format(time.strftime("%Y%m%d-%H%M%S"))
+    )
+    with open(filename, "w") as file:
+        json.dump(
+            {
+                "created":          time.strftime("%Y-%m-%d %H:%M:%S"),
+                "sqlite_version":   sqlite3.sqlite_version,
+                "python_version":   sys.version.split()[0],
+                "runs":             results
+            },
+            file,
+            indent = 4
+        )
+    return filename
+
+
+##############################################################################
+#
+# MAIN
+#
+##############################################################################
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description = "PATE Monitor database workload replay benchmark."
+    )
+    parser.add_argument(
+        '--duration',
+        help    = "Seconds per run. Default: {}".format(Config.duration),
+        default = Config.duration,
+        type    = float
+    )
+    parser.add_argument(
+        '--speedup',
+        help    = "Workload cadence multiplier. Default: {}".format(Config.speedup),
+        default = Config.speedup,
+        type    = float
+    )
+    parser.add_argument(
+        '--journal',
+        help    = "Journal mode(s) to run. Default: {}".format(
+            ",".join(Config.Matrix.journal_mode)
+        ),
+        default = ",".join(Config.Matrix.journal_mode)
+    )
+    parser.add_argument(
+        '--synchronous',
+        help    = "Synchronous level(s) to run. Default: {}".format(
+            ",".join(Config.Matrix.synchronous)
+        ),
+        default = ",".join(Config.Matrix.synchronous)
+    )
+    parser.add_argument(
+        '--checkpoint',
+        help    = "Checkpoint policies (WAL only). Default: {}".format(
+            ",".join(Config.Matrix.checkpoint)
+        ),
+        default = ",".join(Config.Matrix.checkpoint)
+    )
+    parser.add_argument(
+        '--profile',
+        help    = "PRAGMA profile of the databases. Default: '{}'".format(Config.profile),
+        choices = list(profiles.PROFILES),
+        default = Config.profile,
+        type    = str.upper
+    )
+    parser.add_argument(
+        '-o',
+        '--output',
+        help    = "Results directory. Default: '{}'".format(Config.output),
+        default = Config.output
+    )
+    args = parser.parse_args()
+    Config.duration = args.duration
+    Config.speedup  = args.speedup
+    Config.profile  = args.profile
+
+    results = []
+    for settings in matrix(
+        args.journal.lower().split(","),
+        args.synchronous.upper().split(","),
+        args.checkpoint.lower().split(",")
+    ):
+        result = run(settings)
+        report(result)
+        results.append(result)
+
+    filename = write(results, args.output)
+    print("Results written into '{}'".format(filename))
+
+
+# EOF
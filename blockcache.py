@@ -0,0 +1,212 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# LRU block cache for hitcount and housekeeping range reads.
+#
+# blockcache.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Read-side cache for the web UI, which queries the same time ranges
+#   over and over while panning and zooming. Data is fetched in blocks of
+#   BLOCK_SECONDS, aligned to multiples of the block length, per table and
+#   session, and kept as NumPy arrays (timestamps int64, data in the
+#   schema.py dtype of the table). A range query is assembled from blocks;
+#   only missing blocks are read from the database.
+#
+#   Blocks are evicted least recently used first, when the cache holds
+#   more than 'budget' bytes.
+#
+#   Every block is validated on use with an index-only COUNT/MAX query
+#   and reloaded when rows have been added; live rows, and rows that
+#   imports and merges (csvimport.py, csvbulk.py, devshard.py) write into
+#   the past from other processes. invalidate() drops blocks whose rows
+#   were replaced or deleted, which COUNT/MAX may not reveal.
+#
+#   Rows in partition files are included (see partition.relation()). The
+#   partitions that hold rows of a block are remembered with the block,
+#   until the registry spans of its partitions change; only then are the
+#   partition files opened again to find them.
+#
+#       cache = blockcache.BlockCache()
+#       timestamps, data = cache.query(connection, "hitcount", 1, begin, end)
+#
+import numpy
+import threading
+import collections
+
+import schema
+import hitblob
+import partition
+
+
+class Config:
+    budget          = 256 * 2**20   # bytes
+
+
+BLOCK_SECONDS = {
+    "hitcount":         3600,       # 240 rotations, ~730 kB
+    "housekeeping":     86400       # 1440 samples, ~430 kB
+}
+
+
+Block = collections.namedtuple(
+    "Block",
+    ["timestamps", "data", "count", "latest"]
+)
+
+
+def _load(connection, table: str, session_id: int, begin: int, end: int) -> tuple:
+    """Returns (timestamps, data) of session rows in [begin, end[."""
+    if table == "hitcount":
+        chunks = list(hitblob.iter_rotations(connection, session_id, begin, end))
+        columns = hitblob.NCOUNTERS
+    else:
+        columns = len(schema.TABLES[table].data)
+        rows = connection.execute(
+            """
+            SELECT  timestamp, {}
+            FROM    {}
+            WHERE   session_id = ? AND timestamp >= ? AND timestamp < ?
+            ORDER BY timestamp
+            """.format(
+                ", ".join(schema.TABLES[table].data),
+                partition.relation(connection, table, session_id, begin, end)
+            ),
+            (session_id, begin, end)
+        ).fetchall()
+        data = numpy.array(rows, dtype = numpy.int64).reshape(-1, columns + 1)
+        chunks = [(data[:, 0], data[:, 1:])]
+    dtype = numpy.dtype(schema.TABLES[table].columns[-1].dtype)
+    if not chunks:
+        return numpy.empty(0, dtype = numpy.int64), numpy.empty((0, columns), dtype = dtype)
+    return (
+        numpy.concatenate([c[0] for c in chunks]),
+        numpy.concatenate([c[1] for c in chunks]).astype(dtype, copy = False)
+    )
+
+
+def _state(connection, relation: str, session_id: int, begin: int, end: int) -> tuple:
+    """(row count, latest timestamp) of session rows in [begin, end[."""
+    return tuple(
+        connection.execute(
+            """
+            SELECT  COUNT(*), MAX(timestamp)
+            FROM    {}
+            WHERE   session_id = ? AND timestamp >= ? AND timestamp < ?
+            """.format(relation),
+            (session_id, begin, end)
+        ).fetchone()
+    )
+
+
+class BlockCache:
+    """Thread-safe LRU cache of time-aligned blocks; see module header."""
+    def __init__(self, budget: int = None):
+        self.budget     = budget or Config.budget
+        self.blocks     = collections.OrderedDict()     # key: Block, LRU order
+        self.holding    = {}                            # key: (spans, partitions)
+        self.size       = 0
+        self.lock       = threading.Lock()
+        self.stats      = collections.Counter()         # hits, misses, reloads, evictions
+
+    def _put(self, key: tuple, block: Block):
+        old = self.blocks.pop(key, None)
+        if old:
+            self.size -= old.timestamps.nbytes + old.data.nbytes
+        self.blocks[key] = block
+        self.size += block.timestamps.nbytes + block.data.nbytes
+        while self.size > self.budget and len(self.blocks) > 1:
+            evicted_key, evicted = self.blocks.popitem(last = False)
+            self.holding.pop(evicted_key, None)
+            self.size -= evicted.timestamps.nbytes + evicted.data.nbytes
+            self.stats["evictions"] += 1
+
+    def _relation(self, connection, key: tuple, end: int) -> str:
+        """partition.relation() of a block, with the partitions that hold
+        its rows remembered while their registry spans do not change."""
+        table, session_id, start = key
+        if table == "hitcount":
+            table = hitblob.table(connection)
+        spans = partition.spans(connection, start, end)
+        if not spans:
+            return table
+        with self.lock:
+            cached = self.holding.get(key)
+        if cached and cached[0] == spans:
+            names = cached[1]
+        else:
+            names = partition.holding(connection, [s[0] for s in spans], table, session_id)
+            with self.lock:
+                self.holding[key] = (spans, names)
+        if not names:
+            return table
+        partition.Router(connection).route(names = names)
+        return table + "_all"
+
+    def block(self, connection, table: str, session_id: int, start: int) -> Block:
+        """The block of 'table' starting at 'start' (a multiple of the
+        table's BLOCK_SECONDS)."""
+        end = start + BLOCK_SECONDS[table]
+        key = (table, session_id, start)
+        with self.lock:
+            block = self.blocks.get(key)
+            if block:
+                self.blocks.move_to_end(key)
+        if block and (
+            _state(connection, self._relation(connection, key, end), session_id, start, end)
+            != (block.count, block.latest)
+        ):
+            block = None
+            outcome = "reloads"
+        else:
+            outcome = "hits" if block else "misses"
+        with self.lock:
+            self.stats[outcome] += 1
+        if block:
+            return block
+        timestamps, data = _load(connection, table, session_id, start, end)
+        block = Block(
+            timestamps,
+            data,
+            len(timestamps),
+            int(timestamps[-1]) if len(timestamps) else None
+        )
+        with self.lock:
+            self._put(key, block)
+        return block
+
+    def query(self, connection, table: str, session_id: int, begin: int, end: int) -> tuple:
+        """Returns (timestamps, data) of session rows in [begin, end[."""
+        if table not in BLOCK_SECONDS:
+            raise ValueError("Table '{}' is not cached".format(table))
+        length = BLOCK_SECONDS[table]
+        blocks = [
+            self.block(connection, table, session_id, start)
+            for start in range(begin // length * length, max(begin, end), length)
+        ] or [self.block(connection, table, session_id, begin // length * length)]
+        timestamps = numpy.concatenate([b.timestamps for b in blocks])
+        data = numpy.concatenate([b.data for b in blocks])
+        first, last = numpy.searchsorted(timestamps, [begin, end])
+        return timestamps[first:last], data[first:last]
+
+    def invalidate(self, table: str = None, session_id: int = None, timestamp: int = None):
+        """Drop cached blocks; all of them, or those of 'table', 'session_id'
+        and/or containing 'timestamp'."""
+        with self.lock:
+            for key in list(self.blocks):
+                t, s, start = key
+                if table is not None and t != table:
+                    continue
+                if session_id is not None and s != session_id:
+                    continue
+                if timestamp is not None and not (
+                    start <= timestamp < start + BLOCK_SECONDS[t]
+                ):
+                    continue
+                block = self.blocks.pop(key)
+                self.holding.pop(key, None)
+                self.size -= block.timestamps.nbytes + block.data.nbytes
+
+
+# EOF
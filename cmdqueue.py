@@ -0,0 +1,273 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Command queue helpers for instrument daemons.
+#
+# cmdqueue.py
+#   0.1.0   2026.10.16  Initial version.
+#   0.2.0   2026.10.16  Datagram socket notifications (Listener, notify()).
+#
+#   Table 'command' is used as a work queue between the web UI and the
+#   daemons. Rows where 'handled' is NULL are pending. Daemons claim the
+#   oldest pending row for their interface by setting 'handled', and later
+#   record the 'result'.
+#
+#   Claiming is a single UPDATE ... RETURNING statement (SQLite 3.35+),
+#   which makes it atomic without an explicit transaction. Older SQLite
+#   libraries fall back to a short BEGIN IMMEDIATE transaction. Either way,
+#   the lookup is served by the partial index 'command_pending_idx'.
+#
+#   Notifications: each consuming daemon binds a Unix datagram socket into
+#   'Config.directory' (Listener). Producers insert commands with submit(),
+#   which sends one datagram to the sockets of the command's interface
+#   after the commit (notify()). The consumer loop is
+#
+#       with cmdqueue.Listener("PSU") as listener:
+#           while True:
+#               row = cmdqueue.claim(connection, "PSU")
+#               if row:
+#                   ...
+#                   continue
+#               listener.wait()
+#
+#   Datagrams that arrive between claim() and wait() stay in the socket
+#   buffer, so no notification is lost. wait() returns after
+#   Config.poll_interval even without one, which covers commands inserted
+#   by other means (or while the daemon was not listening). Sockets of
+#   consumers that have exited are removed by notify().
+#
+#   Producers (the 'www-data' web UI) and consumers ('patemon' daemons) run
+#   as different users, so they share group Config.group (the group of the
+#   database directory, see setup.py). Listener creates the directory
+#   setgid to that group, and gives each socket the group and mode
+#   Config.mode. A producer that is denied access to a socket logs it.
+#
+import os
+import grp
+import glob
+import select
+import socket
+import sqlite3
+import logging
+import itertools
+
+
+class Config:
+    directory       = "/run/patemon/command"
+    directory_mode  = 0o2770        # setgid; sockets inherit the group
+    group           = "www-data"    # shared by producers and consumers
+    mode            = 0o660         # socket file; producers need write access
+    poll_interval   = 5.0           # seconds; fallback when not notified
+
+
+log = logging.getLogger("cmdqueue")
+
+
+COLUMNS = ("id", "session_id", "interface", "command", "value", "created")
+
+_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+_LISTENERS = itertools.count(1)     # Listener socket serial, per process
+
+
+def _pending_sql(interface: str) -> str:
+    sql = "SELECT id FROM command WHERE handled IS NULL"
+    if interface is not None:
+        sql += " AND interface = ?"
+    return sql + " ORDER BY id LIMIT 1"
+
+
+def claim(connection, interface: str = None) -> tuple:
+    """Claim the oldest pending command (optionally for 'interface') and
+    mark it handled. Returns tuple in COLUMNS order, or None if the queue
+    is empty. The change is committed before returning."""
+    binds = () if interface is None else (interface,)
+    if _RETURNING:
+        sql = """
+        UPDATE  command
+        SET     handled = CURRENT_TIMESTAMP
+        WHERE   id = ({})
+        RETURNING {}
+        """.format(_pending_sql(interface), ", ".join(COLUMNS))
+        row = connection.execute(sql, binds).fetchone()
+        connection.commit()
+        return row
+    # Pre-3.35 SQLite; reserve the write lock before looking up the row
+    isolation = connection.isolation_level
+    connection.isolation_level = None
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(_pending_sql(interface), binds).fetchone()
+            if row:
+                connection.execute(
+                    "UPDATE command SET handled = CURRENT_TIMESTAMP WHERE id = ?",
+                    row
+                )
+                row = connection.execute(
+                    "SELECT {} FROM command WHERE id = ?".format(", ".join(COLUMNS)),
+                    row
+                ).fetchone()
+            connection.execute("COMMIT")
+        except:
+            connection.execute("ROLLBACK")
+            raise
+    finally:
+        connection.isolation_level = isolation
+    return row
+
+
+def submit(
+    connection,
+    session_id: int,
+    interface: str,
+    command: str,
+    value: str = ''
+) -> int:
+    """Insert and commit a command, and notify the consumers of 'interface'.
+    Commands without a value store '' (column 'value' is NOT NULL).
+    Returns command id."""
+    cursor = connection.execute(
+        "INSERT INTO command (session_id, interface, command, value) VALUES (?, ?, ?, ?)",
+        (session_id, interface, command, value)
+    )
+    connection.commit()
+    notify(interface)
+    return cursor.lastrowid
+
+
+def complete(connection, command_id: int, result: str):
+    """Record the result of a claimed command."""
+    connection.execute(
+        "UPDATE command SET result = ? WHERE id = ?",
+        (result, command_id)
+    )
+    connection.commit()
+
+
+##############################################################################
+#
+# Notifications
+#
+##############################################################################
+
+def _prefix(interface: str) -> str:
+    return "any" if interface is None else "".join(
+        c if c.isalnum() else "_" for c in interface
+    )
+
+
+def notify(interface: str = None) -> int:
+    """Wake the listeners of 'interface' (and those listening to any
+    interface). Call after the command has been committed. Returns the
+    number of listeners notified."""
+    paths = set(glob.glob(os.path.join(Config.directory, "any.*.sock")))
+    if interface is not None:
+        paths.update(
+            glob.glob(os.path.join(Config.directory, _prefix(interface) + ".*.sock"))
+        )
+    sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sender.setblocking(False)
+    notified = 0
+    try:
+        for path in paths:
+            try:
+                sender.sendto(b"!", path)
+                notified += 1
+            except BlockingIOError:
+                # Buffer full; listener has wakeups pending already
+                notified += 1
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Listener has exited without removing its socket
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            except PermissionError:
+                log.error(
+                    "No write access to '{}'; is it in group '{}' and mode {:o}?".format(
+                        path, Config.group, Config.mode
+                    )
+                )
+    finally:
+        sender.close()
+    return notified
+
+
+def _gid() -> int:
+    try:
+        return grp.getgrnam(Config.group).gr_gid
+    except KeyError:
+        log.error("Group '{}' does not exist".format(Config.group))
+        return None
+
+
+def _share(path: str, mode: int):
+    """Give 'path' group Config.group and 'mode'. Only the owner (or root)
+    can; others leave it as it is."""
+    gid = _gid()
+    try:
+        if gid is not None and os.stat(path).st_gid != gid:
+            os.chown(path, -1, gid)
+        os.chmod(path, mode)
+    except PermissionError:
+        log.error(
+            "Cannot give '{}' group '{}' and mode {:o}".format(path, Config.group, mode)
+        )
+
+
+class Listener:
+    """Datagram socket that submit() / notify() wake up; see module header.
+    Interface None listens to commands of all interfaces."""
+    def __init__(self, interface: str = None):
+        if not os.path.isdir(Config.directory):
+            os.makedirs(Config.directory, exist_ok = True)
+            _share(Config.directory, Config.directory_mode)
+        # Unique per Listener; a process may listen more than once
+        self.path = os.path.join(
+            Config.directory,
+            "{}.{}-{}.sock".format(_prefix(interface), os.getpid(), next(_LISTENERS))
+        )
+        if os.path.exists(self.path):
+            # Left behind by an earlier process with the same pid
+            os.unlink(self.path)
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.socket.bind(self.path)
+        _share(self.path, Config.mode)
+        self.socket.setblocking(False)
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until notified or 'timeout' (default Config.poll_interval)
+        seconds have passed. Returns True if notified. Pending notifications
+        are consumed."""
+        if timeout is None:
+            timeout = Config.poll_interval
+        readable, _, _ = select.select([self.socket], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            while True:
+                self.socket.recv(64)
+        except BlockingIOError:
+            pass
+        return True
+
+    def fileno(self) -> int:
+        return self.socket.fileno()
+
+    def close(self):
+        self.socket.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+# EOF
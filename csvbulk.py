@@ -0,0 +1,545 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Parallel bulk import of calibration CSV files.
+#
+# csvbulk.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Imports a backlog of calibration CSV files (directories and/or glob
+#   patterns) into pulseheight storage. Files are read, hashed and parsed
+#   by a pool of worker processes (one file per task), which send parsed
+#   chunks to this process over a bounded queue. This process is the single
+#   writer; each chunk is inserted in one transaction (csvimport.py).
+#   Workers stream each file twice: first to hash it and count its events,
+#   then to parse the events that are not imported yet. Neither pass holds
+#   more than one chunk of a file in memory.
+#
+#   Every file is recorded in table 'csv_import' (schema.py) by SHA-256 of
+#   its content, together with its session, the timestamps allotted to its
+#   events and the number of events committed so far, updated in the same
+#   transaction as the events. Therefore:
+#
+#       - files already imported are skipped, whatever their name,
+#       - a file that was interrupted continues from its first uncommitted
+#         event, with the same session and timestamps,
+#       - of files with identical content, only one is imported.
+#
+#   CSV files have no timestamps. Each file is allotted its own span of
+#   'interval' spaced timestamps in the past, ending at the file
+#   modification time, or moved back before existing events (rows, also
+#   in partition files, chunks and other imports) that the span would
+#   overlap. Imported events thus
+#   never take the timestamps (primary keys) of live data. Each file gets
+#   a new testing session (pate_firmware 'Imported from <file>', started at
+#   its first event) unless '--session' is given.
+#
+#   Usage:
+#       python3 csvbulk.py /srv/calibration [more.csv 'batch-*.csv' ...]
+#                          [--workers N] [--session ID] [--storage zlib]
+#                          [--bins 4,ac1=16]
+#
+import io
+import os
+import sys
+import csv
+import glob
+import time
+import queue
+import numpy
+import hashlib
+import sqlite3
+import argparse
+import itertools
+import collections
+import multiprocessing
+
+import schema
+import phhist
+import partition
+import csvimport
+
+
+QUEUE_CHUNKS    = 4         # parsed chunks in flight, per worker
+
+
+Task = collections.namedtuple(
+    "Task",
+    [
+        "index",
+        "filename",
+        "chunk_rows"
+    ]
+)
+
+
+Result = collections.namedtuple(
+    "Result",
+    ["files", "imported", "skipped", "duplicates", "failed", "events", "seconds"]
+)
+
+
+def _log(text: str):
+    # Over the progress line (devdata.Progress)
+    print("\r{:<60}".format(text))
+
+
+def files(patterns: list) -> list:
+    """CSV files of directories (*.csv) and glob patterns, sorted, once."""
+    found = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*.csv")
+        found.update(f for f in glob.glob(pattern) if os.path.isfile(f))
+    return sorted(found)
+
+
+##############################################################################
+#
+# Workers
+#
+##############################################################################
+
+_queue  = None
+_ledger = None
+_owners = None
+
+
+def _initialize(messages, ledger: dict, owners):
+    global _queue, _ledger, _owners
+    _queue  = messages
+    _ledger = ledger
+    _owners = owners
+
+
+class _Digest(io.RawIOBase):
+    """Binary file reader that hashes (SHA-256) the bytes read through it."""
+    def __init__(self, file):
+        self.file   = file
+        self.sha256 = hashlib.sha256()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        count = self.file.readinto(buffer)
+        self.sha256.update(memoryview(buffer)[:count])
+        return count
+
+
+def _rows(binary):
+    """Data rows of a CSV file opened in binary mode, headers and blank
+    lines skipped. Quoted fields may contain newlines."""
+    text = io.TextIOWrapper(binary, "utf-8", "replace", newline = "")
+    reader = csv.reader(text, dialect = "excel-finnish")
+    return (
+        row for row in itertools.islice(reader, csvimport.CSV_HEADER_ROWS, None) if row
+    )
+
+
+def _parse(task: Task):
+    """Hash and parse one file. Sends messages into the queue:
+        ("skip",  index, sha256)
+        ("begin", index, sha256, events)
+        ("chunk", index, first event, adc)
+        ("end",   index)
+        ("error", index, message)
+    """
+    # Shared memory, not a message; visible even if this process dies
+    _owners[task.index] = os.getpid()
+    try:
+        # First pass: hash and count events
+        with open(task.filename, "rb", buffering = 0) as file:
+            digest = _Digest(file)
+            total = sum(1 for _ in _rows(io.BufferedReader(digest)))
+        sha256 = digest.sha256.hexdigest()
+        imported, completed = _ledger.get(sha256, (0, False))
+        if completed:
+            _queue.put(("skip", task.index, sha256))
+            return
+        _queue.put(("begin", task.index, sha256, total))
+        # Second pass: events not imported yet
+        with open(task.filename, "rb") as file:
+            rows = itertools.islice(_rows(file), imported, None)
+            first = imported
+            while True:
+                chunk = list(itertools.islice(rows, task.chunk_rows))
+                if not chunk:
+                    break
+                status, adc = csvimport.parse_chunk(chunk)
+                _queue.put(("chunk", task.index, first, adc))
+                first += len(adc)
+        _queue.put(("end", task.index))
+    except (OSError, ValueError, IndexError, csv.Error) as e:
+        _queue.put(("error", task.index, "{}: {}".format(type(e).__name__, e)))
+
+
+##############################################################################
+#
+# Writer
+#
+##############################################################################
+
+class _File:
+    """Writer state of one file."""
+    def __init__(self, filename: str, sha256: str):
+        self.filename   = filename
+        self.sha256     = sha256
+        self.session_id = None
+        self.start      = None
+        self.total      = None
+        self.imported   = 0
+        self.ignored    = False     # duplicate or failed; messages dropped
+
+
+class Importer:
+    """Single writer; applies worker messages (see _parse())."""
+    def __init__(
+        self,
+        connection,
+        session_id: int = None,
+        pate_id: int = None,
+        interval: int = csvimport.PULSEHEIGHT_INTERVAL,
+        storage: str = "rows",
+        layout: dict = None,
+        log = _log
+    ):
+        self.connection = connection
+        self.session_id = session_id
+        self.pate_id    = pate_id
+        self.interval   = interval
+        self.storage    = storage
+        self.layout     = layout      # None = phhist.Config.layout
+        self.log        = log
+        self.files      = {}        # task index: _File
+        self.claimed    = {}        # sha256: filename, this run
+        self.counts     = collections.Counter()
+        self.ledger     = {
+            sha256: (imported, completed is not None)
+            for sha256, imported, completed in connection.execute(
+                "SELECT sha256, imported, completed FROM csv_import"
+            )
+        }
+
+    def _allot(self, end: int, total: int) -> int:
+        """First timestamp of a span of 'total' events that ends at or
+        before 'end' and overlaps no existing events (rows, chunks or
+        other imports, including uncommitted ones of this connection).
+        Occupied spans are skipped backwards. Commits an open transaction,
+        as partition files cannot be attached within one."""
+        if self.connection.in_transaction:
+            # Ledger row of another file; resuming it needs no more
+            self.connection.commit()
+        span = max(total - 1, 0) * self.interval
+        while True:
+            start = end - span
+            rows = partition.relation(self.connection, "pulseheight", None, start, end + 1)
+            first = self.connection.execute(
+                """
+                SELECT MIN(t) FROM (
+                    SELECT MIN(timestamp) AS t FROM {}
+                    WHERE timestamp BETWEEN :start AND :end
+                    UNION ALL
+                    SELECT MIN(timestamp) FROM pulseheight_chunk
+                    WHERE timestamp <= :end AND latest >= :start
+                    UNION ALL
+                    SELECT MIN(start) FROM csv_import
+                    WHERE start <= :end AND start + (total - 1) * interval >= :start
+                )
+                """.format(rows),
+                {"start": start, "end": end}
+            ).fetchone()[0]
+            if first is None:
+                return start
+            end = first - 1
+
+    def _session(self, filename: str, started: int) -> int:
+        """New testing session for a file. Does not commit."""
+        if self.pate_id is None:
+            row = self.connection.execute(
+                "SELECT pate_id FROM testing_session ORDER BY id DESC LIMIT 1"
+            ).fetchone() or self.connection.execute(
+                "SELECT id FROM pate ORDER BY id DESC LIMIT 1"
+            ).fetchone()
+            if row:
+                self.pate_id = row[0]
+            else:
+                self.pate_id = self.connection.execute(
+                    """
+                    INSERT INTO pate (id_min, id_max, label)
+                    VALUES (0, 1000, 'Created to import calibration data')
+                    """
+                ).lastrowid
+        return self.connection.execute(
+            """
+            INSERT INTO testing_session (started, pate_id, pate_firmware)
+            VALUES (?, ?, ?)
+            """,
+            (
+                time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(started)),
+                self.pate_id,
+                "Imported from '{}'".format(os.path.basename(filename))
+            )
+        ).lastrowid
+
+    def begin(self, entry: _File, total: int):
+        """Claim the file; record it into the ledger, or resume it."""
+        if entry.sha256 in self.claimed:
+            entry.ignored = True
+            self.counts["duplicates"] += 1
+            self.log("'{}': same content as '{}', skipped".format(
+                entry.filename, self.claimed[entry.sha256]
+            ))
+            return
+        self.claimed[entry.sha256] = entry.filename
+        row = self.connection.execute(
+            """
+            SELECT session_id, start, total, imported
+            FROM csv_import WHERE sha256 = ?
+            """,
+            (entry.sha256,)
+        ).fetchone()
+        if row:
+            entry.session_id, entry.start, entry.total, entry.imported = row
+            if entry.total != total:
+                raise ValueError(
+                    "{} events, ledger has {}".format(total, entry.total)
+                )
+            self.log("'{}': resuming at event {} of {}".format(
+                entry.filename, entry.imported, entry.total
+            ))
+            return
+        entry.start = self._allot(
+            int(min(os.path.getmtime(entry.filename), time.time())), total
+        )
+        entry.total = total
+        entry.session_id = self.session_id or self._session(entry.filename, entry.start)
+        self.connection.execute(
+            schema.CSV_IMPORT.insert,
+            (
+                entry.sha256, entry.filename, entry.session_id,
+                entry.start, self.interval, total, 0, None
+            )
+        )
+        # Committed with the first chunk (or end(), or the next _allot())
+
+    def chunk(self, entry: _File, first: int, adc: numpy.ndarray):
+        """Write events and advance the ledger, in one transaction."""
+        if first != entry.imported or first + len(adc) > entry.total:
+            raise ValueError(
+                "Events {} - {} do not follow the {} imported (of {})".format(
+                    first, first + len(adc), entry.imported, entry.total
+                )
+            )
+        timestamps = entry.start + (first + numpy.arange(len(adc))) * self.interval
+        csvimport.write_events(
+            self.connection, entry.session_id, timestamps, adc,
+            self.storage, self.layout
+        )
+        self.connection.execute(
+            "UPDATE csv_import SET imported = imported + ? WHERE sha256 = ?",
+            (len(adc), entry.sha256)
+        )
+        self.connection.commit()
+        entry.imported += len(adc)
+        self.counts["events"] += len(adc)
+
+    def end(self, entry: _File):
+        if entry.imported != entry.total:
+            raise ValueError(
+                "{} of {} events imported".format(entry.imported, entry.total)
+            )
+        self.connection.execute(
+            "UPDATE csv_import SET completed = ? WHERE sha256 = ?",
+            (time.strftime('%Y-%m-%d %H:%M:%S'), entry.sha256)
+        )
+        self.connection.commit()
+        self.counts["imported"] += 1
+
+    def handle(self, message: tuple, filename: str):
+        """Apply one worker message. A file that fails is left in the
+        ledger as it is; importing it again resumes it."""
+        kind, index = message[:2]
+        entry = self.files.get(index)
+        if entry and entry.ignored:
+            return
+        try:
+            if kind == "skip":
+                self.counts["skipped"] += 1
+                self.log("'{}': already imported, skipped".format(filename))
+            elif kind == "begin":
+                entry = self.files[index] = _File(filename, message[2])
+                self.begin(entry, message[3])
+            elif kind == "chunk":
+                self.chunk(entry, message[2], message[3])
+            elif kind == "end":
+                self.end(entry)
+            else:
+                raise ValueError(message[2])
+        except (ValueError, sqlite3.Error) as e:
+            if self.connection.in_transaction:
+                self.connection.rollback()
+            self.counts["failed"] += 1
+            self.log("'{}': import failed: {}".format(filename, e))
+            if entry:
+                entry.ignored = True
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def run(
+    connection,
+    filenames: list,
+    workers: int = None,
+    chunk_rows: int = csvimport.CHUNK_ROWS,
+    **kwargs
+) -> Result:
+    """Import files; keyword arguments are passed to Importer()."""
+    from devdata import Progress
+    workers  = workers or os.cpu_count()
+    tasks    = [Task(i, f, chunk_rows) for i, f in enumerate(filenames)]
+    importer = Importer(connection, **kwargs)
+    messages = multiprocessing.Queue(QUEUE_CHUNKS * workers)
+    pending  = set(range(len(tasks)))
+    owners   = multiprocessing.Array("i", len(tasks), lock = False)
+    progress = Progress(None)
+    with multiprocessing.Pool(
+        min(workers, len(tasks)) or 1,
+        _initialize,
+        (messages, importer.ledger, owners)
+    ) as pool:
+        result = pool.map_async(_parse, tasks, chunksize = 1)
+        while pending:
+            try:
+                message = messages.get(timeout = 1.0)
+            except queue.Empty:
+                # A worker that dies (out of memory, killed) loses its task
+                # without a message; the pool replaces the worker, but the
+                # map result would never become ready
+                lost = [i for i in pending if owners[i] and not _alive(owners[i])]
+                if result.ready():
+                    # Re-raises unexpected worker exceptions
+                    result.get()
+                    lost = list(pending)
+                for index in sorted(lost):
+                    importer.handle(
+                        ("error", index, "worker process exited"), tasks[index].filename
+                    )
+                    pending.discard(index)
+                continue
+            importer.handle(message, tasks[message[1]].filename)
+            if message[0] in ("skip", "end", "error"):
+                pending.discard(message[1])
+            progress.update(importer.counts["events"])
+    progress.finish()
+    counts = importer.counts
+    return Result(
+        len(tasks),
+        counts["imported"],
+        counts["skipped"],
+        counts["duplicates"],
+        counts["failed"],
+        counts["events"],
+        time.perf_counter() - progress.started
+    )
+
+
+##############################################################################
+#
+# MAIN
+#
+##############################################################################
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description = "Import directories of Excel-Finnish calibration CSV files."
+    )
+    parser.add_argument(
+        'paths',
+        help    = "Directories (*.csv) and/or files and glob patterns.",
+        nargs   = '+'
+    )
+    parser.add_argument(
+        '-d',
+        '--database',
+        help    = "Database file. Default: '/srv/patemon.sqlite3'",
+        dest    = "database",
+        default = "/srv/patemon.sqlite3"
+    )
+    parser.add_argument(
+        '-s',
+        '--session',
+        help    = "testing_session.id for all files. Default: new session per file",
+        dest    = "session_id",
+        type    = int
+    )
+    parser.add_argument(
+        '--pate',
+        help    = "pate.id of new sessions. Default: that of the latest session",
+        dest    = "pate_id",
+        type    = int
+    )
+    parser.add_argument(
+        '--workers',
+        help    = "Parser processes. Default: {}".format(os.cpu_count()),
+        dest    = "workers",
+        default = os.cpu_count(),
+        type    = int
+    )
+    parser.add_argument(
+        '--chunk',
+        help    = "Rows per chunk/transaction. Default: {}".format(csvimport.CHUNK_ROWS),
+        dest    = "chunk_rows",
+        default = csvimport.CHUNK_ROWS,
+        type    = int
+    )
+    parser.add_argument(
+        '--storage',
+        help    = "Event storage (rows|zlib|lzma). Default: 'rows'",
+        dest    = "storage",
+        choices = csvimport.STORAGES,
+        default = "rows"
+    )
+    parser.add_argument(
+        '--bins',
+        help    = "Histogram bin widths, e.g. '4,ac1=16' (see phhist.py).",
+        dest    = "layout",
+        type    = phhist.parse_layout
+    )
+    args = parser.parse_args()
+
+    filenames = files(args.paths)
+    connection = sqlite3.connect(args.database)
+    connection.execute("PRAGMA foreign_keys = 1")
+    print("Importing {} files ({} workers)...".format(len(filenames), args.workers))
+    result = run(
+        connection,
+        filenames,
+        args.workers,
+        args.chunk_rows,
+        session_id  = args.session_id,
+        pate_id     = args.pate_id,
+        storage     = args.storage,
+        layout      = args.layout
+    )
+    connection.close()
+    print(
+        "{} files: {} imported, {} already imported, {} duplicates, {} failed; "
+        "{} events in {:.1f} s".format(
+            result.files, result.imported, result.skipped, result.duplicates,
+            result.failed, result.events, result.seconds
+        )
+    )
+    if result.failed:
+        sys.exit(1)
+
+
+# EOF
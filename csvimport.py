@@ -0,0 +1,224 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Streaming pulseheight CSV importer.
+#
+# csvimport.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Calibration CSV files (Finnish locale Excel, ';' separated, decimal
+#   comma) are read in fixed-size chunks. Each chunk is converted into NumPy
+#   arrays in one go and bulk inserted with executemany(), so that memory
+#   use does not depend on the size of the file.
+#
+#   File layout (see 'sample.csv'): two header rows, then one row per event.
+#   Columns 20 - 28 are: status (8-bit binary mask as '10000000'), AC1, D1A,
+#   D1B, D1C, D2A, D2B, D3, AC2.
+#
+#   Events are written as rows into table 'pulseheight', or with storage
+#   'zlib' / 'lzma' as compressed chunks into 'pulseheight_chunk' (see
+#   phblob.py). Session histograms (phhist.py) are updated in the same
+#   transaction, in the bin layout of option '--bins' (phhist.Config.layout
+#   by default).
+#
+import csv
+import time
+import numpy
+import sqlite3
+import argparse
+import itertools
+
+import schema
+import phblob
+import phhist
+
+
+PULSEHEIGHT_COLUMNS     = schema.PULSEHEIGHT.data
+PULSEHEIGHT_INTERVAL    = 15        # data every 15 seconds
+CSV_HEADER_ROWS         = 2
+CSV_STATUS_COLUMN       = 20        # followed by PULSEHEIGHT_COLUMNS
+CHUNK_ROWS              = 10000
+STORAGES                = ("rows",) + tuple(phblob.FORMATS)
+
+
+class excel_finnish(csv.Dialect):
+    """Describe the properties of Finnish locale Excel-generated CSV files."""
+    delimiter = ';'
+    quotechar = '"'
+    doublequote = True
+    skipinitialspace = False
+    lineterminator = '\r\n'
+    quoting = csv.QUOTE_MINIMAL
+
+csv.register_dialect("excel-finnish", excel_finnish)
+
+
+def read_chunks(filename: str, chunk_rows: int = CHUNK_ROWS):
+    """Yield lists of (at most 'chunk_rows') raw CSV rows, headers skipped."""
+    with open(filename, 'r', newline = '') as csvfile:
+        reader = csv.reader(csvfile, dialect = 'excel-finnish')
+        for _ in range(CSV_HEADER_ROWS):
+            next(reader, None)
+        while True:
+            chunk = list(itertools.islice(reader, chunk_rows))
+            if not chunk:
+                return
+            yield chunk
+
+
+def parse_decimal(values: numpy.ndarray) -> numpy.ndarray:
+    """Convert array of decimal comma strings ('689,1') into rounded int64."""
+    values = numpy.char.replace(values, ',', '.').astype(numpy.float64)
+    return numpy.rint(values).astype(numpy.int64)
+
+
+def parse_binary(values: numpy.ndarray) -> numpy.ndarray:
+    """Convert array of binary strings ('10000000') into int64. Raises
+    ValueError for any other character, and for empty values."""
+    empty = numpy.char.str_len(numpy.char.strip(values)) == 0
+    if empty.any():
+        # zfill() would pad them into zeros
+        raise ValueError(
+            "Empty binary value in row {}".format(int(numpy.argmax(empty)))
+        )
+    width = max(int(numpy.char.str_len(values).max()), 1)
+    digits = numpy.char.zfill(values, width).astype("S{}".format(width))
+    digits = digits.view(numpy.uint8).reshape(-1, width) - ord('0')
+    # Characters below '0' wrap around
+    invalid = (digits > 1).any(axis = 1)
+    if invalid.any():
+        raise ValueError(
+            "Invalid binary value '{}'".format(values[numpy.argmax(invalid)])
+        )
+    weights = numpy.left_shift(1, numpy.arange(width - 1, -1, -1, dtype = numpy.int64))
+    return digits.astype(numpy.int64) @ weights
+
+
+def parse_chunk(rows: list) -> tuple:
+    """Returns (status, adc) arrays for a chunk of raw rows. 'status' is the
+    hit mask vector and 'adc' is a (n, 8) array in PULSEHEIGHT_COLUMNS order."""
+    first = CSV_STATUS_COLUMN
+    last  = CSV_STATUS_COLUMN + len(PULSEHEIGHT_COLUMNS) + 1
+    cols  = numpy.array([row[first:last] for row in rows], dtype = str)
+    return parse_binary(cols[:, 0]), parse_decimal(cols[:, 1:])
+
+
+def write_events(
+    connection,
+    session_id: int,
+    timestamps: numpy.ndarray,
+    adc: numpy.ndarray,
+    storage: str = "rows",
+    layout: dict = None
+):
+    """Insert events into the 'storage' and update session histograms in
+    bin 'layout' (see phhist.py). Does not commit."""
+    if storage == "rows":
+        block = numpy.empty((len(adc), adc.shape[1] + 2), dtype = numpy.int64)
+        block[:, 0] = timestamps
+        block[:, 1] = session_id
+        block[:, 2:] = adc
+        connection.executemany(schema.PULSEHEIGHT.insert, block.tolist())
+    else:
+        phblob.write(connection, session_id, timestamps, adc, phblob.FORMATS[storage])
+    phhist.update(connection, session_id, adc, layout)
+
+
+def import_pulseheight(
+    connection,
+    filename: str,
+    session_id: int,
+    start: int = None,
+    interval: int = PULSEHEIGHT_INTERVAL,
+    chunk_rows: int = CHUNK_ROWS,
+    storage: str = "rows",
+    layout: dict = None
+) -> tuple:
+    """Stream 'filename' into table 'pulseheight', one transaction per chunk.
+    Event timestamps begin from 'start' (default: now) and advance by
+    'interval'. Storage 'zlib' or 'lzma' writes compressed chunks instead
+    (phblob.py). Histograms are binned in 'layout' (default:
+    phhist.Config.layout). Returns (rows imported, rows/s)."""
+    from devdata import Progress
+    if start is None:
+        start = int(time.time())
+    progress = Progress(None)
+    done     = 0
+    for chunk in read_chunks(filename, chunk_rows):
+        status, adc = parse_chunk(chunk)
+        timestamps = start + (done + numpy.arange(len(adc))) * interval
+        write_events(connection, session_id, timestamps, adc, storage, layout)
+        connection.commit()
+        done += len(adc)
+        progress.update(done)
+    return done, progress.finish()
+
+
+##############################################################################
+#
+# MAIN
+#
+##############################################################################
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description = "Import Excel-Finnish pulseheight CSV file."
+    )
+    parser.add_argument(
+        'file',
+        help    = "CSV file to import."
+    )
+    parser.add_argument(
+        '-s',
+        '--session',
+        help    = "testing_session.id for the imported rows.",
+        dest    = "session_id",
+        required = True,
+        type    = int
+    )
+    parser.add_argument(
+        '-d',
+        '--database',
+        help    = "Database file. Default: '/srv/patemon.sqlite3'",
+        dest    = "database",
+        default = "/srv/patemon.sqlite3"
+    )
+    parser.add_argument(
+        '--chunk',
+        help    = "Rows per chunk/transaction. Default: {}".format(CHUNK_ROWS),
+        dest    = "chunk_rows",
+        default = CHUNK_ROWS,
+        type    = int
+    )
+    parser.add_argument(
+        '--storage',
+        help    = "Event storage (rows|zlib|lzma). Default: 'rows'",
+        dest    = "storage",
+        choices = STORAGES,
+        default = "rows"
+    )
+    parser.add_argument(
+        '--bins',
+        help    = "Histogram bin widths, e.g. '4,ac1=16' (see phhist.py).",
+        dest    = "layout",
+        type    = phhist.parse_layout
+    )
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(args.database)
+    connection.execute("PRAGMA foreign_keys = 1")
+    print("Importing '{}'...".format(args.file))
+    import_pulseheight(
+        connection,
+        args.file,
+        args.session_id,
+        chunk_rows = args.chunk_rows,
+        storage    = args.storage,
+        layout     = args.layout
+    )
+    connection.close()
+
+
+# EOF
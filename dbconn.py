@@ -0,0 +1,418 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Instrumented connection factory.
+#
+# dbconn.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   connect() opens the database, applies the recorded PRAGMA profile (see
+#   profiles.py), registers the SQL functions of the schema (schema.register())
+#   and returns a connection that records, per statement
+#   shape (SQL with literals replaced by '?', whitespace collapsed):
+#
+#       calls       execute() / executemany() / commit() calls
+#       statements  statements SQLite executed (trace callback); one per
+#                   executemany() row, plus implicit BEGINs
+#       latency     histogram of call durations (BOUNDS_MS), total and max
+#       lock wait   time spent waiting for locks (SQLITE_BUSY), and retries
+#       rows        rows fetched, and time from execute() until the last
+#                   row was fetched (the statement was active), recorded
+#                   once per statement
+#       vm steps    virtual machine instructions (progress handler, in
+#                   units of Config.progress_ops)
+#
+#   The trace callback receives each statement with its parameters
+#   expanded into the SQL text. For bulk inserts of wide rows or BLOBs that
+#   costs more than the insert itself, so it is only installed when
+#   Config.trace is set ('statements' is not counted by default).
+#
+#   Lock waits are measured by handling SQLITE_BUSY here instead of in
+#   SQLite: the connection has no SQLite busy timeout. A statement that
+#   begins a transaction (none was open before it, and it changed nothing),
+#   or a COMMIT, is retried with a growing delay until 'busy_timeout'
+#   seconds have passed. The implicit transaction the failed statement
+#   opened is rolled back first, so that the retry reads a new snapshot.
+#   Other statements raise SQLITE_BUSY at once, as they do with SQLite's
+#   busy handler when a transaction cannot upgrade a stale snapshot or
+#   would deadlock. Unlike SQLite, the first statement of an explicit
+#   deferred transaction ('BEGIN') is not retried either; writers use
+#   'BEGIN IMMEDIATE'.
+#
+#   Statistics are collected per process (STATISTICS). A summary of the
+#   busiest shapes is logged every Config.interval seconds (checked as
+#   statements complete) and the full set is written as JSON into
+#   Config.dump_file, if set. Code that is not SQL can be timed into the
+#   same statistics with phase():
+#
+#       with dbconn.STATISTICS.phase("hitcount content"):
+#           ...
+#
+import re
+import json
+import time
+import sqlite3
+import logging
+import threading
+import contextlib
+
+import schema
+import profiles
+
+
+class Config:
+    interval        = 60.0          # seconds between logged summaries
+    dump_file       = None          # JSON statistics, rewritten each summary
+    top             = 10            # shapes in a logged summary
+    progress_ops    = 10000         # VM instructions per progress handler call
+    trace           = False         # count statements with the trace callback
+
+
+log = logging.getLogger("dbconn")
+
+
+BOUNDS_MS   = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 10000)
+_LITERALS   = re.compile(r"'(?:[^']|'')*'|\b[xX]'[0-9a-fA-F]*'|(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_SPACES     = re.compile(r"\s+")
+_VALUES     = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+
+
+def shape(sql: str) -> str:
+    """Statement shape; literals as '?', whitespace collapsed."""
+    sql = _SPACES.sub(" ", _LITERALS.sub("?", sql)).strip()
+    return _VALUES.sub("(?)", sql)
+
+
+def _busy(e: sqlite3.OperationalError) -> bool:
+    return str(e).startswith("database is locked")
+
+
+class Shape:
+    """Statistics of one statement shape."""
+    __slots__ = (
+        "calls", "statements", "total_ms", "max_ms", "histogram",
+        "lock_wait_ms", "retries", "rows", "fetch_ms", "steps"
+    )
+
+    def __init__(self):
+        self.calls          = 0
+        self.statements     = 0
+        self.total_ms       = 0.0
+        self.max_ms         = 0.0
+        self.histogram      = [0] * (len(BOUNDS_MS) + 1)
+        self.lock_wait_ms   = 0.0
+        self.retries        = 0
+        self.rows           = 0
+        self.fetch_ms       = 0.0
+        self.steps          = 0
+
+    def percentile(self, p: float) -> float:
+        """Upper bound (ms) of the histogram bin holding the p'th percentile."""
+        target = self.calls * p / 100
+        seen = 0
+        for bound, count in zip(BOUNDS_MS + (self.max_ms,), self.histogram):
+            seen += count
+            if count and seen >= target:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def asdict(self) -> dict:
+        result = {name: getattr(self, name) for name in self.__slots__}
+        result["steps"] *= Config.progress_ops
+        result["p50_ms"] = self.percentile(50)
+        result["p95_ms"] = self.percentile(95)
+        result["p99_ms"] = self.percentile(99)
+        return result
+
+
+class Statistics:
+    """Per-process statement statistics; see module header."""
+    def __init__(self):
+        self.lock       = threading.Lock()
+        self.shapes     = {}
+        self.started    = time.time()
+        self.reported   = time.monotonic()
+
+    def _get(self, name: str) -> Shape:
+        entry = self.shapes.get(name)
+        if entry is None:
+            entry = self.shapes[name] = Shape()
+        return entry
+
+    def record(
+        self,
+        name: str,
+        ms: float,
+        lock_wait_ms: float = 0.0,
+        retries: int = 0,
+        statements: int = 0,
+        steps: int = 0
+    ):
+        index = next((i for i, b in enumerate(BOUNDS_MS) if ms <= b), len(BOUNDS_MS))
+        with self.lock:
+            entry = self._get(name)
+            entry.calls         += 1
+            entry.statements    += statements
+            entry.total_ms      += ms
+            entry.max_ms        = max(entry.max_ms, ms)
+            entry.histogram[index] += 1
+            entry.lock_wait_ms  += lock_wait_ms
+            entry.retries       += retries
+            entry.steps         += steps
+        if time.monotonic() - self.reported > Config.interval:
+            self.report()
+
+    def fetched(self, name: str, rows: int, ms: float, steps: int = 0):
+        with self.lock:
+            entry = self._get(name)
+            entry.rows      += rows
+            entry.fetch_ms  += ms
+            entry.steps     += steps
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """Time a block of code as shape 'phase: <name>'."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            self.record("phase: " + name, ms)
+            log.info("Phase '{}': {:.1f} ms".format(name, ms))
+
+    def asdict(self) -> dict:
+        with self.lock:
+            return {
+                "started":  self.started,
+                "written":  time.time(),
+                "shapes":   {k: v.asdict() for k, v in self.shapes.items()}
+            }
+
+    def summary(self, top: int = None) -> list:
+        """Text lines; the 'top' shapes by total time of their calls."""
+        with self.lock:
+            shapes = sorted(
+                self.shapes.items(),
+                key = lambda s: -s[1].total_ms
+            )[:top or Config.top]
+            lines = [
+                "{:>8} {:>9} {:>8} {:>8} {:>8} {:>9} {:>9}  {}".format(
+                    "calls", "total ms", "p50 ms", "p99 ms", "max ms",
+                    "lock ms", "rows", "statement"
+                )
+            ]
+            for name, s in shapes:
+                lines.append(
+                    "{:>8} {:>9.1f} {:>8.2f} {:>8.2f} {:>8.2f} {:>9.1f} {:>9}  {}".format(
+                        s.calls, s.total_ms, s.percentile(50),
+                        s.percentile(99), s.max_ms, s.lock_wait_ms, s.rows,
+                        name if len(name) <= 100 else name[:97] + "..."
+                    )
+                )
+        return lines
+
+    def report(self):
+        """Log summary and write the dump file."""
+        self.reported = time.monotonic()
+        for line in self.summary():
+            log.info(line)
+        if Config.dump_file:
+            with open(Config.dump_file, "w") as file:
+                json.dump(self.asdict(), file, indent = 4)
+
+
+STATISTICS = Statistics()
+
+
+##############################################################################
+#
+# Connection
+#
+##############################################################################
+
+class Cursor(sqlite3.Cursor):
+    """Cursor that times statements and counts fetched rows. Fetches are
+    accounted once per statement, when its last row has been fetched (or
+    the cursor is re-executed or closed), not per row."""
+    shape       = None
+    rows        = 0
+    executed    = 0.0
+
+    def execute(self, sql: str, parameters = ()):
+        return self.connection._run(
+            self, sqlite3.Cursor.execute, sql, parameters
+        )
+
+    def executemany(self, sql: str, parameters):
+        if not isinstance(parameters, (list, tuple)):
+            # A generator could not be replayed after SQLITE_BUSY
+            parameters = list(parameters)
+        return self.connection._run(
+            self, sqlite3.Cursor.executemany, sql, parameters
+        )
+
+    def _done(self):
+        """Record the fetches of the current statement."""
+        if self.shape and self.rows:
+            self.connection.statistics.fetched(
+                self.shape,
+                self.rows,
+                (time.perf_counter() - self.executed) * 1000,
+                self.connection._steps()
+            )
+        self.shape = None
+        self.rows = 0
+
+    def fetchone(self):
+        row = sqlite3.Cursor.fetchone(self)
+        if row is None:
+            self._done()
+        else:
+            self.rows += 1
+        return row
+
+    def fetchmany(self, size: int = None):
+        size = size or self.arraysize
+        rows = sqlite3.Cursor.fetchmany(self, size)
+        self.rows += len(rows)
+        if len(rows) < size:
+            self._done()
+        return rows
+
+    def fetchall(self):
+        rows = sqlite3.Cursor.fetchall(self)
+        self.rows += len(rows)
+        self._done()
+        return rows
+
+    def __next__(self):
+        try:
+            row = sqlite3.Cursor.__next__(self)
+        except StopIteration:
+            self._done()
+            raise
+        self.rows += 1
+        return row
+
+    def close(self):
+        self._done()
+        sqlite3.Cursor.close(self)
+
+
+class Connection(sqlite3.Connection):
+    """Instrumented connection; create with connect()."""
+    def setup(self, statistics: Statistics, busy_timeout: float):
+        self.statistics     = statistics
+        self.busy_timeout   = busy_timeout
+        self.statements     = 0         # trace callback count
+        self.progress       = 0         # progress handler calls
+        if Config.trace:
+            self.set_trace_callback(self._trace)
+        self.set_progress_handler(self._progress, Config.progress_ops)
+
+    def _trace(self, sql: str):
+        self.statements += 1
+
+    def _progress(self) -> int:
+        self.progress += 1
+        return 0
+
+    def _steps(self) -> int:
+        steps, self.progress = self.progress, 0
+        return steps
+
+    def cursor(self, factory = Cursor):
+        return sqlite3.Connection.cursor(self, factory)
+
+    def execute(self, sql: str, parameters = ()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, parameters):
+        return self.cursor().executemany(sql, parameters)
+
+    def _retry(self, function, *args, commit: bool = False):
+        """Call function, retrying on SQLITE_BUSY if it is a COMMIT or begins
+        a transaction (see module header). Returns (result, ms of lock wait,
+        retries)."""
+        begins = not self.in_transaction
+        changes = self.total_changes
+        waited = 0.0
+        retries = 0
+        delay = 0.001
+        while True:
+            try:
+                return function(*args), waited * 1000, retries
+            except sqlite3.OperationalError as e:
+                if (
+                    not _busy(e) or
+                    waited >= self.busy_timeout or
+                    not (commit or begins and self.total_changes == changes)
+                ):
+                    raise
+                if not commit and self.in_transaction:
+                    sqlite3.Connection.rollback(self)
+                time.sleep(delay)
+                waited += delay
+                retries += 1
+                delay = min(delay * 2, 0.05)
+
+    def _run(self, cursor: Cursor, method, sql: str, parameters):
+        # Rows of the previous statement were not all fetched
+        cursor._done()
+        name = shape(sql)
+        self.statements = 0
+        self._steps()
+        start = time.perf_counter()
+        result, wait_ms, retries = self._retry(method, cursor, sql, parameters)
+        cursor.executed = time.perf_counter()
+        cursor.shape = name
+        self.statistics.record(
+            name,
+            (cursor.executed - start) * 1000,
+            wait_ms,
+            retries,
+            self.statements,
+            self._steps()
+        )
+        return result
+
+    def commit(self):
+        if not self.in_transaction:
+            return
+        self.statements = 0
+        start = time.perf_counter()
+        _, wait_ms, retries = self._retry(sqlite3.Connection.commit, self, commit = True)
+        self.statistics.record(
+            "COMMIT",
+            (time.perf_counter() - start) * 1000,
+            wait_ms,
+            retries,
+            self.statements
+        )
+
+
+def connect(
+    database: str,
+    busy_timeout: float = 5.0,
+    profile: bool = True,
+    statistics: Statistics = None,
+    **kwargs
+) -> Connection:
+    """Open an instrumented connection. Recorded PRAGMA profile is applied
+    unless 'profile' is False (new databases, see profiles.create()). Other
+    keyword arguments are passed to sqlite3.connect(), except 'timeout',
+    which is taken as 'busy_timeout' (SQLite's own busy handler is not used;
+    see module header)."""
+    busy_timeout = kwargs.pop("timeout", busy_timeout)
+    connection = sqlite3.connect(
+        database, timeout = 0, factory = Connection, **kwargs
+    )
+    connection.setup(statistics or STATISTICS, busy_timeout)
+    schema.register(connection)
+    if profile:
+        profiles.apply(connection)
+    return connection
+
+
+# EOF
@@ -0,0 +1,166 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Development content generator for PATE Monitor database.
+#
+# devdata.py
+#   0.1.0   2026.10.16  Initial version (vectorized, batched generation).
+#
+#   Random science data is generated in NumPy blocks, one block holding
+#   'block_size' complete rows (timestamp, session_id, counters...), and
+#   inserted with executemany() in transactions of 'commit_rows' rows.
+#   Supplying a seed makes the generated dataset reproducible.
+#
+import sys
+import time
+import numpy
+
+import schema
+
+
+# Defaults, as used by setup.py DEV mode
+HITCOUNT_INTERVAL       = schema.HITCOUNT_INTERVAL
+HITCOUNT_MAXHITS        = 2**21     # Full 21-bit register (exclusive bound)
+HOUSEKEEPING_INTERVAL   = 60
+HOUSEKEEPING_MAXVAL     = 255       # inclusive
+BLOCK_SIZE              = 1024      # rows per generated NumPy block
+COMMIT_ROWS             = 5760      # rows per transaction
+
+
+class Progress:
+    """Single-line progress display, redrawn at most every 'interval' seconds.
+    With 'total' of None, only the row count is displayed."""
+    def __init__(self, total: int, interval: float = 0.5, stream = sys.stdout):
+        self.total      = total
+        self.interval   = interval
+        self.stream     = stream
+        self.started    = time.perf_counter()
+        self.drawn      = 0.0
+        self.done       = 0
+
+    def update(self, done: int):
+        self.done = done
+        now = time.perf_counter()
+        if now - self.drawn < self.interval:
+            return
+        self.drawn = now
+        if self.total:
+            text = "{:>6.2f} %".format((100 * done) / self.total)
+        else:
+            text = "{:>10} rows".format(done)
+        print(
+            "\r{} ... {:>10.0f} rows/s".format(text, self.rate(now)),
+            end     = '',
+            flush   = True,
+            file    = self.stream
+        )
+
+    def rate(self, now: float = None) -> float:
+        elapsed = (now or time.perf_counter()) - self.started
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def finish(self) -> float:
+        """Print final line and return achieved rows/s."""
+        rate = self.rate()
+        print(
+            "\r{}({} rows, {:.0f} rows/s)            ".format(
+                "100.00 % " if self.total else "",
+                self.done,
+                rate
+            ),
+            file  = self.stream,
+            flush = True
+        )
+        return rate
+
+
+def generate_blocks(
+    session_id: int,
+    ncols: int,
+    count: int,
+    high: int,
+    start: int = None,
+    interval: int = 15,
+    seed: int = None,
+    block_size: int = BLOCK_SIZE
+):
+    """Yield (n, 2 + ncols) int64 arrays of rows [timestamp, session_id, ...].
+
+    Counter values are uniformly distributed in [0, high[. Timestamps begin
+    from 'start' (default: now) and advance by 'interval' seconds per row."""
+    rng = numpy.random.default_rng(seed)
+    if start is None:
+        start = int(time.time())
+    for offset in range(0, count, block_size):
+        n = min(block_size, count - offset)
+        block = numpy.empty((n, ncols + 2), dtype = numpy.int64)
+        block[:, 0] = start + (offset + numpy.arange(n)) * interval
+        block[:, 1] = session_id
+        block[:, 2:] = rng.integers(0, high, size = (n, ncols))
+        yield block
+
+
+def generate_hitcount_packets(
+    session_id: int,
+    ncols: int,
+    rotations: int,
+    interval: int = HITCOUNT_INTERVAL,
+    start: int = None,
+    seed: int = None,
+    block_size: int = BLOCK_SIZE
+):
+    """Yield blocks of hitcount rotations (see generate_blocks())."""
+    return generate_blocks(
+        session_id, ncols, rotations, HITCOUNT_MAXHITS,
+        start, interval, seed, block_size
+    )
+
+
+def generate_housekeeping_packets(
+    session_id: int,
+    ncols: int,
+    samples: int,
+    interval: int = HOUSEKEEPING_INTERVAL,
+    start: int = None,
+    seed: int = None,
+    block_size: int = BLOCK_SIZE
+):
+    """Yield blocks of housekeeping samples (see generate_blocks())."""
+    return generate_blocks(
+        session_id, ncols, samples, HOUSEKEEPING_MAXVAL + 1,
+        start, interval, seed, block_size
+    )
+
+
+def populate(
+    connection,
+    sql: str,
+    blocks,
+    total: int,
+    commit_rows: int = COMMIT_ROWS,
+    transform = None
+) -> float:
+    """Insert generated blocks with executemany(), committing after every
+    'commit_rows' rows. Returns the achieved insert rate (rows/s).
+    Optional 'transform(block)' converts a block into parameter rows."""
+    progress = Progress(total)
+    cursor   = connection.cursor()
+    done     = 0
+    pending  = 0
+    for block in blocks:
+        # Split the block where a transaction ends
+        while len(block):
+            part, block = block[:commit_rows - pending], block[commit_rows - pending:]
+            cursor.executemany(sql, transform(part) if transform else part.tolist())
+            done    += len(part)
+            pending += len(part)
+            if pending == commit_rows:
+                connection.commit()
+                pending = 0
+        progress.update(done)
+    connection.commit()
+    return progress.finish()
+
+
+# EOF
@@ -0,0 +1,206 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Parallel sharded development content build.
+#
+# devshard.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Large DEV datasets (months of rotations) are generated by a process
+#   pool. Hitcount and housekeeping content is split into time slices
+#   (tasks); each worker generates one slice into its own shard database
+#   (no journal, no sync) together with the slice's hitcount rollups.
+#
+#   The main process merges finished shards into the database as they
+#   complete, table by table in timestamp order, with ATTACH and
+#   INSERT ... SELECT; rows are therefore always appended to the end of
+#   the table B-trees. Rollup buckets that span two slices are combined
+#   with rollup.merge().
+#
+#   Every slice has its own random stream (numpy SeedSequence.spawn()),
+#   so a seeded build is reproducible for a given number of slices, but
+#   differs from the single-process (devdata.populate()) dataset.
+#
+import os
+import time
+import numpy
+import sqlite3
+import collections
+import multiprocessing
+
+import schema
+import rollup
+import hitblob
+import devdata
+
+
+MIN_SLICE   = 4 * devdata.BLOCK_SIZE    # rows; smaller slices are not worth a process
+
+
+Task = collections.namedtuple(
+    "Task",
+    [
+        "table",        # 'hitcount' or 'housekeeping'
+        "part",         # slice number within table
+        "storage",      # hitcount layout; 'table', 'uint32' or 'packed21'
+        "session_id",
+        "first",        # first row of the slice
+        "count",        # rows in the slice
+        "start",        # timestamp of row zero
+        "interval",
+        "seed",         # numpy.random.SeedSequence
+        "filename"      # shard database
+    ]
+)
+
+
+def target(task: Task) -> schema.Table:
+    """The schema table that task rows are written into."""
+    if task.table == "hitcount":
+        return schema.HITCOUNT if task.storage == "table" else schema.HITCOUNT_PACKED
+    return schema.HOUSEKEEPING
+
+
+def slices(total: int, workers: int) -> list:
+    """Split 'total' rows into (first, count) slices; two per worker, as
+    long as slices stay at least MIN_SLICE rows."""
+    n = max(1, min(2 * workers, total // MIN_SLICE))
+    bounds = numpy.linspace(0, total, n + 1).astype(int)
+    return [(int(a), int(b - a)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def tasks(
+    directory: str,
+    session_id: int,
+    storage: str,
+    rotations: int,
+    samples: int,
+    workers: int,
+    seed: int = None,
+    start: int = None
+) -> list:
+    """Tasks for 'rotations' of hitcount and 'samples' of housekeeping data,
+    largest first."""
+    if start is None:
+        start = int(time.time())
+    result = []
+    for table, total, interval, table_seed in (
+        ("hitcount", rotations, schema.HITCOUNT_INTERVAL, seed),
+        ("housekeeping", samples, devdata.HOUSEKEEPING_INTERVAL,
+            None if seed is None else seed + 1)
+    ):
+        parts = slices(total, workers)
+        seeds = numpy.random.SeedSequence(table_seed).spawn(len(parts))
+        for part, ((first, count), part_seed) in enumerate(zip(parts, seeds)):
+            result.append(
+                Task(
+                    table, part, storage, session_id, first, count, start,
+                    interval, part_seed,
+                    os.path.join(directory, "{}.{:04}.sqlite3".format(table, part))
+                )
+            )
+    return sorted(result, key = lambda t: -t.count)
+
+
+def build_shard(task: Task) -> Task:
+    """Worker: generate a slice into its own shard database."""
+    table = target(task)
+    connection = sqlite3.connect(task.filename)
+    connection.execute("PRAGMA journal_mode = OFF")
+    connection.execute("PRAGMA synchronous = OFF")
+    connection.execute(table.ddl)
+    start = task.start + task.first * task.interval
+    if task.table == "hitcount":
+        connection.execute(schema.HITCOUNT_ROLLUP.ddl)
+        blocks = devdata.generate_hitcount_packets(
+            task.session_id, hitblob.NCOUNTERS, task.count,
+            interval = task.interval, start = start, seed = task.seed
+        )
+    else:
+        blocks = devdata.generate_housekeeping_packets(
+            task.session_id, len(table.data), task.count,
+            interval = task.interval, start = start, seed = task.seed
+        )
+    for block in blocks:
+        if table is schema.HITCOUNT_PACKED:
+            rows = hitblob.block_rows(block, hitblob.FORMATS[task.storage])
+        else:
+            rows = block.tolist()
+        connection.executemany(table.insert, rows)
+        if task.table == "hitcount":
+            rollup.update(connection, task.session_id, block[:, 0], block[:, 2:])
+    connection.commit()
+    connection.close()
+    return task
+
+
+def merge(connection, task: Task) -> int:
+    """Append shard content into the database and remove the shard file.
+    Returns the number of rows merged. If the merge fails, it is rolled back
+    and the shard file is kept."""
+    table = target(task)
+    connection.execute("ATTACH DATABASE ? AS shard", (task.filename,))
+    try:
+        rows = connection.execute(
+            "INSERT INTO main.{0} ({1}) SELECT {1} FROM shard.{0} ORDER BY timestamp".format(
+                table.name, ", ".join(table.names)
+            )
+        ).rowcount
+        if task.table == "hitcount":
+            for resolution in rollup.RESOLUTIONS:
+                buckets = connection.execute(
+                    """
+                    SELECT  bucket, rotations, sums, mins, maxs
+                    FROM    shard.hitcount_rollup
+                    WHERE   session_id = ? AND resolution = ?
+                    ORDER BY bucket
+                    """,
+                    (task.session_id, resolution)
+                ).fetchall()
+                if not buckets:
+                    continue
+                b, r, s, lo, hi = zip(*buckets)
+                rollup.merge(
+                    connection,
+                    task.session_id,
+                    resolution,
+                    numpy.array(b, dtype = numpy.int64),
+                    numpy.array(r, dtype = numpy.int64),
+                    numpy.frombuffer(b"".join(s), dtype = rollup.SUM).reshape(len(b), -1).copy(),
+                    numpy.frombuffer(b"".join(lo), dtype = rollup.MINMAX).reshape(len(b), -1).copy(),
+                    numpy.frombuffer(b"".join(hi), dtype = rollup.MINMAX).reshape(len(b), -1).copy()
+                )
+        connection.commit()
+    except:
+        # DETACH fails with a transaction open, and would hide the error
+        if connection.in_transaction:
+            connection.rollback()
+        raise
+    finally:
+        connection.execute("DETACH DATABASE shard")
+    os.remove(task.filename)
+    return rows
+
+
+def build(connection, tasks: list, workers: int) -> dict:
+    """Generate shards with a pool of 'workers' processes and merge them in
+    timestamp order as they complete. Returns rows per table."""
+    total    = sum(t.count for t in tasks)
+    ready    = collections.defaultdict(dict)    # table: {part: task}
+    merged   = collections.Counter()            # table: next part to merge
+    rows     = collections.Counter()
+    progress = devdata.Progress(total)
+    with multiprocessing.Pool(workers) as pool:
+        for task in pool.imap_unordered(build_shard, tasks):
+            ready[task.table][task.part] = task
+            while merged[task.table] in ready[task.table]:
+                done = ready[task.table].pop(merged[task.table])
+                rows[done.table] += merge(connection, done)
+                merged[task.table] += 1
+                progress.update(sum(rows.values()))
+    progress.finish()
+    return dict(rows)
+
+
+# EOF
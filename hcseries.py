@@ -0,0 +1,213 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Per-sector hitcount time series.
+#
+# hcseries.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Extracts selected sector/channel counters from hitcount rotations in
+#   long format: one record per (rotation, sector, channel), with the time
+#   at which the sector measurement started.
+#
+#   A rotation takes 'interval' seconds (one rotation per row). Rotating
+#   sectors 1 - 36 are measured one after another, each for 1/36 of the
+#   rotation, so sector N starts at timestamp + (N - 1) * interval / 36.
+#   Sector 0 is the sun-pointing telescope, which measures over the whole
+#   rotation and starts at the rotation timestamp.
+#
+#   Rotations are read with hitblob.iter_rotations(): only the selected
+#   columns from a flat 'hitcount' table, or packed rotations decoded and
+#   the counters picked out. Results are yielded in chunks of rotations, so
+#   memory use does not depend on the time range. Rotations in partition
+#   files are included (see partition.relation()).
+#
+#   There is no long-format SQL view. Over the flat table, it would be a
+#   UNION ALL of one SELECT per counter column (740 of them), each of which
+#   reads every selected row again; over packed rotations, each SELECT
+#   would also decode the whole BLOB for one counter. iter_series() reads
+#   each rotation once and only the selected columns, and the CLI below
+#   writes the same records as CSV for tools outside of Python.
+#
+#   Usage:
+#       python3 hcseries.py -s 1 -p e -c 3 [--sectors 1-36] > series.csv
+#
+import sys
+import numpy
+import sqlite3
+import argparse
+
+import schema
+import hitblob
+
+
+PARTICLES       = {
+    "p":    schema.PROTON_CHANNELS,     # proton
+    "e":    schema.ELECTRON_CHANNELS    # electron
+}
+ROTATING        = tuple(range(1, schema.SECTORS))
+CHUNK_ROWS      = 1024
+LONG            = numpy.dtype([
+    ("timestamp",   "<f8"),             # sector measurement start
+    ("rotation",    "<i8"),             # rotation (row) timestamp
+    ("sector",      "u1"),
+    ("channel",     "u1"),
+    ("count",       "<u4")
+])
+
+
+def selection(sectors, particle: str, channels) -> tuple:
+    """Returns (columns, sectors, channels) of the selection; column names
+    in hitcount column order and matching per-column sector and channel
+    vectors."""
+    if particle not in PARTICLES:
+        raise ValueError("Unknown particle class '{}' (use 'p' or 'e')".format(particle))
+    sectors  = sorted(set(sectors))
+    channels = sorted(set(channels))
+    if not sectors or not channels:
+        raise ValueError("Empty sector or channel selection")
+    if sectors[0] < 0 or sectors[-1] >= schema.SECTORS:
+        raise ValueError("Sectors are 0 - {}".format(schema.SECTORS - 1))
+    if channels[0] < 1 or channels[-1] > PARTICLES[particle]:
+        raise ValueError(
+            "Channels of class '{}' are 1 - {}".format(particle, PARTICLES[particle])
+        )
+    pairs = [(s, c) for s in sectors for c in channels]
+    return (
+        ["s{:02}{}{:02}".format(s, particle, c) for s, c in pairs],
+        numpy.array([p[0] for p in pairs], dtype = numpy.uint8),
+        numpy.array([p[1] for p in pairs], dtype = numpy.uint8)
+    )
+
+
+def offsets(sectors: numpy.ndarray, interval: float = schema.HITCOUNT_INTERVAL) -> numpy.ndarray:
+    """Sector measurement start times relative to the rotation timestamp."""
+    sectors = numpy.asarray(sectors, dtype = numpy.float64)
+    return numpy.where(
+        sectors > 0,
+        (sectors - 1) * interval / len(ROTATING),
+        0.0
+    )
+
+
+def iter_series(
+    connection,
+    session_id: int,
+    sectors = ROTATING,
+    particle: str = "e",
+    channels = (1,),
+    begin: int = None,
+    end: int = None,
+    interval: float = schema.HITCOUNT_INTERVAL,
+    chunk_rows: int = CHUNK_ROWS
+):
+    """Yield LONG record arrays for rotations in [begin, end[, in rotation
+    order; within a rotation, by sector and channel."""
+    columns, sector, channel = selection(sectors, particle, channels)
+    offset = offsets(sector, interval)
+    for timestamps, counters in hitblob.iter_rotations(
+        connection, session_id, begin, end, chunk_rows, columns
+    ):
+        n, k = counters.shape
+        records = numpy.empty(n * k, dtype = LONG)
+        records["rotation"]  = numpy.repeat(timestamps, k)
+        records["timestamp"] = (timestamps[:, None] + offset[None, :]).ravel()
+        records["sector"]    = numpy.tile(sector, n)
+        records["channel"]   = numpy.tile(channel, n)
+        records["count"]     = counters.ravel()
+        yield records
+
+
+def fetch(connection, session_id: int, *args, **kwargs) -> numpy.ndarray:
+    """iter_series() results as one LONG array."""
+    chunks = list(iter_series(connection, session_id, *args, **kwargs))
+    return numpy.concatenate(chunks) if chunks else numpy.empty(0, dtype = LONG)
+
+
+def parse_range(text: str) -> list:
+    """'1-36' or '0,3,5-7' into a list of integers."""
+    values = []
+    for part in text.split(","):
+        first, _, last = part.partition("-")
+        values.extend(range(int(first), int(last or first) + 1))
+    return values
+
+
+##############################################################################
+#
+# MAIN
+#
+##############################################################################
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description = "Write per-sector hitcount time series as CSV (long format)."
+    )
+    parser.add_argument(
+        '-s',
+        '--session',
+        help    = "testing_session.id to read.",
+        dest    = "session_id",
+        required = True,
+        type    = int
+    )
+    parser.add_argument(
+        '-p',
+        '--particle',
+        help    = "Particle class (p|e). Default: 'e'",
+        choices = list(PARTICLES),
+        default = "e"
+    )
+    parser.add_argument(
+        '-c',
+        '--channels',
+        help    = "Channels, for example '3' or '1-4'. Default: '1'",
+        default = "1"
+    )
+    parser.add_argument(
+        '--sectors',
+        help    = "Sectors, for example '0' or '1-36'. Default: '1-36'",
+        default = "1-36"
+    )
+    parser.add_argument(
+        '--begin',
+        help    = "First rotation timestamp (unix time).",
+        type    = int
+    )
+    parser.add_argument(
+        '--end',
+        help    = "End of range (unix time, exclusive).",
+        type    = int
+    )
+    parser.add_argument(
+        '-d',
+        '--database',
+        help    = "Database file. Default: '/srv/patemon.sqlite3'",
+        dest    = "database",
+        default = "/srv/patemon.sqlite3"
+    )
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(args.database)
+    print(",".join(LONG.names))
+    for records in iter_series(
+        connection,
+        args.session_id,
+        parse_range(args.sectors),
+        args.particle,
+        parse_range(args.channels),
+        args.begin,
+        args.end
+    ):
+        numpy.savetxt(
+            sys.stdout,
+            records,
+            fmt = ["%.3f", "%d", "%d", "%d", "%d"],
+            delimiter = ","
+        )
+    connection.close()
+
+
+# EOF
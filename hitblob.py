@@ -0,0 +1,234 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Packed BLOB storage for hitcount rotations.
+#
+# hitblob.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Optional alternative to the flat (758 counter) 'hitcount' table. Each
+#   rotation is stored as a single BLOB of 21-bit counters into table
+#   'hitcount_packed', in one of two formats:
+#
+#       FORMAT_UINT32   little-endian uint32 per counter (3032 bytes).
+#                       Decodes into a zero-copy NumPy view of the BLOB.
+#       FORMAT_PACKED21 counters bit-packed to 21 bits (1990 bytes).
+#                       Smallest, but decoding has to unpack (copy).
+#
+#   Counter order is the column order of the flat 'hitcount' table, which
+#   allows view 'hitcount' to expose the familiar sXXpYY/sXXeYY/... columns.
+#   The view is evaluated through SQL function 'hitcount_counter()', which
+#   needs to be registered into the connection (register(); dbconn.connect()
+#   and snapshot.connect_readonly() do). Readers that cannot register Python
+#   functions (sqlite3 shell, other languages) have to decode the BLOBs
+#   themselves. Table and view are declared in schema.py.
+#
+#   iter_rotations() and fetch() include the rows in partition files (see
+#   partition.relation()).
+#
+import numpy
+
+import schema
+import partition
+
+
+COUNTER_BITS        = 21
+COUNTER_MAX         = 2**COUNTER_BITS - 1
+
+FORMAT_UINT32       = schema.HITCOUNT_UINT32
+FORMAT_PACKED21     = schema.HITCOUNT_PACKED21
+FORMATS             = {"uint32": FORMAT_UINT32, "packed21": FORMAT_PACKED21}
+
+SECTORS             = schema.SECTORS
+PROTON_CHANNELS     = schema.PROTON_CHANNELS
+ELECTRON_CHANNELS   = schema.ELECTRON_CHANNELS
+COLUMNS             = schema.HITCOUNT.data
+NCOUNTERS           = len(COLUMNS)
+SECTOR_COUNTERS     = SECTORS * (PROTON_CHANNELS + ELECTRON_CHANNELS)
+INDEX               = {name: i for i, name in enumerate(COLUMNS)}
+UINT32              = numpy.dtype('<u4')
+PACKED21_BYTES      = (NCOUNTERS * COUNTER_BITS + 7) // 8
+_WEIGHTS            = numpy.left_shift(
+                        numpy.uint32(1),
+                        numpy.arange(COUNTER_BITS, dtype = numpy.uint32)
+                      )
+
+
+##############################################################################
+#
+# Encode / decode
+#
+##############################################################################
+
+def encode(counters: numpy.ndarray, fmt: int = FORMAT_UINT32) -> bytes:
+    """Encode one rotation (NCOUNTERS values) into a BLOB."""
+    return encode_block(numpy.asarray(counters).reshape(1, -1), fmt)[0]
+
+
+def encode_block(counters: numpy.ndarray, fmt: int = FORMAT_UINT32) -> list:
+    """Encode (n, NCOUNTERS) array of rotations into a list of BLOBs."""
+    counters = numpy.asarray(counters)
+    if counters.shape[1] != NCOUNTERS:
+        raise ValueError(
+            "Expected {} counters, got {}".format(NCOUNTERS, counters.shape[1])
+        )
+    if counters.size and (counters.min() < 0 or counters.max() > COUNTER_MAX):
+        raise ValueError("Counter values must fit into 21 bits")
+    if fmt == FORMAT_UINT32:
+        data = numpy.ascontiguousarray(counters, dtype = UINT32)
+        return [row.tobytes() for row in data]
+    elif fmt == FORMAT_PACKED21:
+        values = counters.astype(numpy.uint32)
+        bits = (values[:, :, None] >> numpy.arange(COUNTER_BITS, dtype = numpy.uint32)) & 1
+        data = numpy.packbits(
+            bits.astype(numpy.uint8).reshape(len(values), -1),
+            axis = 1,
+            bitorder = 'little'
+        )
+        return [row.tobytes() for row in data]
+    raise ValueError("Unknown hitcount BLOB format {}".format(fmt))
+
+
+def decode(blob: bytes, fmt: int = FORMAT_UINT32) -> numpy.ndarray:
+    """Return counters of one rotation as a (NCOUNTERS,) uint32 array.
+
+    FORMAT_UINT32 returns a read-only view into 'blob' (no copy)."""
+    if fmt == FORMAT_UINT32:
+        return numpy.frombuffer(blob, dtype = UINT32, count = NCOUNTERS)
+    elif fmt == FORMAT_PACKED21:
+        bits = numpy.unpackbits(
+            numpy.frombuffer(blob, dtype = numpy.uint8),
+            count = NCOUNTERS * COUNTER_BITS,
+            bitorder = 'little'
+        ).reshape(NCOUNTERS, COUNTER_BITS)
+        return bits.astype(numpy.uint32) @ _WEIGHTS
+    raise ValueError("Unknown hitcount BLOB format {}".format(fmt))
+
+
+def sectors(counters: numpy.ndarray) -> numpy.ndarray:
+    """View (SECTORS, PROTON_CHANNELS + ELECTRON_CHANNELS) of decoded counters.
+    Protons are [:, :PROTON_CHANNELS], electrons [:, PROTON_CHANNELS:]."""
+    return counters[..., :SECTOR_COUNTERS].reshape(
+        counters.shape[:-1] + (SECTORS, PROTON_CHANNELS + ELECTRON_CHANNELS)
+    )
+
+
+def telescopes(counters: numpy.ndarray) -> numpy.ndarray:
+    """View (2, 9) of telescope counters (row 0 'st', row 1 'rt')."""
+    return counters[..., SECTOR_COUNTERS:].reshape(counters.shape[:-1] + (2, -1))
+
+
+##############################################################################
+#
+# Database
+#
+##############################################################################
+
+def register(connection):
+    """Register SQL functions needed by the compatibility view 'hitcount'."""
+    schema.register(connection)
+
+
+def block_rows(block: numpy.ndarray, fmt: int = FORMAT_UINT32) -> list:
+    """Convert (n, 2 + NCOUNTERS) [timestamp, session_id, ...] rows into
+    schema.HITCOUNT_PACKED.insert parameter tuples."""
+    blobs = encode_block(block[:, 2:], fmt)
+    return [
+        (int(ts), int(sid), fmt, blob)
+        for ts, sid, blob in zip(block[:, 0], block[:, 1], blobs)
+    ]
+
+
+def storage(connection) -> str:
+    """Returns hitcount storage layout of the database; 'table' or 'packed'."""
+    row = connection.execute(
+        "SELECT type FROM sqlite_master WHERE name = 'hitcount_packed'"
+    ).fetchone()
+    return "packed" if row else "table"
+
+
+def table(connection) -> str:
+    """Table that stores the hitcount rows; 'hitcount' or 'hitcount_packed'."""
+    return "hitcount_packed" if storage(connection) == "packed" else "hitcount"
+
+
+def iter_rotations(
+    connection,
+    session_id: int,
+    begin: int = None,
+    end: int = None,
+    chunk_rows: int = 1024,
+    columns: list = None
+):
+    """Yield (timestamps, counters) chunks of session rotations in [begin, end[,
+    in timestamp order, from either storage layout. 'counters' is a
+    (n, NCOUNTERS) uint32 array, or (n, len(columns)) of the given counter
+    'columns' (only those are read from the flat table)."""
+    hitcount = table(connection)
+    packed = hitcount == "hitcount_packed"
+    relation = partition.relation(connection, hitcount, session_id, begin, end)
+    if packed:
+        sql = "SELECT timestamp, format, counters FROM {}".format(relation)
+        index = slice(None) if columns is None else [INDEX[c] for c in columns]
+    else:
+        sql = "SELECT timestamp, {} FROM {}".format(
+            ", ".join(COLUMNS if columns is None else columns), relation
+        )
+    sql += " WHERE session_id = ?"
+    binds = [session_id]
+    if begin is not None:
+        sql += " AND timestamp >= ?"
+        binds.append(begin)
+    if end is not None:
+        sql += " AND timestamp < ?"
+        binds.append(end)
+    cursor = connection.execute(sql + " ORDER BY timestamp", binds)
+    while True:
+        rows = cursor.fetchmany(chunk_rows)
+        if not rows:
+            return
+        if packed:
+            timestamps = numpy.fromiter(
+                (r[0] for r in rows), dtype = numpy.int64, count = len(rows)
+            )
+            counters = numpy.empty(
+                (len(rows), NCOUNTERS if columns is None else len(columns)),
+                dtype = numpy.uint32
+            )
+            for i, r in enumerate(rows):
+                counters[i] = decode(r[2], r[1])[index]
+        else:
+            data = numpy.array(rows, dtype = numpy.int64)
+            timestamps = data[:, 0]
+            counters = data[:, 1:].astype(numpy.uint32)
+        yield timestamps, counters
+
+
+def fetch(connection, session_id: int, begin: int = None, end: int = None) -> tuple:
+    """Returns (timestamps, counters) for session rotations in [begin, end[.
+    'counters' is a (n, NCOUNTERS) uint32 array."""
+    sql = "SELECT timestamp, format, counters FROM {} WHERE session_id = ?".format(
+        partition.relation(connection, "hitcount_packed", session_id, begin, end)
+    )
+    binds = [session_id]
+    if begin is not None:
+        sql += " AND timestamp >= ?"
+        binds.append(begin)
+    if end is not None:
+        sql += " AND timestamp < ?"
+        binds.append(end)
+    rows = connection.execute(sql + " ORDER BY timestamp", binds).fetchall()
+    timestamps = numpy.fromiter((r[0] for r in rows), dtype = numpy.int64, count = len(rows))
+    if all(r[1] == FORMAT_UINT32 for r in rows):
+        counters = numpy.frombuffer(
+            b"".join(r[2] for r in rows), dtype = UINT32
+        ).reshape(len(rows), NCOUNTERS)
+    else:
+        counters = numpy.empty((len(rows), NCOUNTERS), dtype = numpy.uint32)
+        for i, r in enumerate(rows):
+            counters[i] = decode(r[2], r[1])
+    return timestamps, counters
+
+
+# EOF
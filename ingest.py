@@ -0,0 +1,625 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Group-commit ingest service.
+#
+# ingest.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   In WAL mode, every commit acquires the write lock and (with synchronous
+#   FULL) syncs the WAL. Producers that each commit on their own therefore
+#   contend for the lock. This service is the single writer for science
+#   and operator data; producers submit rows and the writer commits them
+#   in batches, one transaction every 'interval' seconds or 'max_rows'
+#   rows, whichever comes first.
+#
+#   Tables: hitcount, pulseheight, housekeeping (rows in schema.py column
+#   order) and note (session_id, text). Hitcount rows are written into the
+#   database's hitcount layout, and the hitcount rollups (pulseheight
+#   histograms, in the bin layout of '--bins', see phhist.py) are updated
+#   within the same transaction.
+#
+#   Pulseheight events are written into 'pulseheight' rows by default. With
+#   '--pulseheight-storage zlib|lzma', each submission is written as
+#   compressed chunks instead (csvimport.write_events(), phblob.py), as
+#   csvimport.py and csvbulk.py do with '--storage'. Give the same storage
+#   as the importers of the database, or sessions end up in both; readers
+#   (phblob.iter_events()) return both, and 'phblob.py --compact' moves
+#   row events into chunks. Chunks are kept in the main database, also
+#   with '--partition'.
+#
+#   Producers submit either
+#       - over Unix socket 'Config.socket' (see Client), one JSON object
+#         per line:
+#           {"table": "pulseheight", "rows": [[...], ...], "ack": "committed"}
+#           {"metrics": true}
+#       - or through a multiprocessing queue (Service(queue = ...)), as
+#         (table, rows) tuples. Queue submissions are not acknowledged.
+#
+#   Acknowledgement levels (socket):
+#       none        no reply
+#       queued      reply once the rows are queued for the writer
+#       committed   reply once the batch containing the rows has committed
+#       synced      as committed, and the batch is committed with
+#                   PRAGMA synchronous = FULL (survives power loss)
+#
+#   With '--partition month|session', data rows are written into partition
+#   files (see partition.py); notes and rollups stay in the main database.
+#
+#   The writer connection is instrumented (dbconn.py); statement statistics
+#   are logged every 'stats_interval' seconds, and written into '--stats'
+#   file, if given.
+#
+#   With '--live', committed hitcount and housekeeping rows are also
+#   published into shared memory ring buffers for the live dashboard (see
+#   livering.py).
+#
+#   Each submission is written within its own SAVEPOINT. A submission that
+#   fails (constraint violation, etc.) is rolled back alone and reported to
+#   its producer; the rest of the batch commits.
+#
+import os
+import json
+import time
+import queue
+import numpy
+import signal
+import socket
+import sqlite3
+import logging
+import argparse
+import threading
+import socketserver
+
+import schema
+import dbconn
+import hitblob
+import phblob
+import rollup
+import phhist
+import livering
+import csvimport
+import partition
+
+
+class Config:
+    log_level       = "INFO"
+    log_file        = None          # None = stderr
+    database        = "/srv/patemon.sqlite3"
+    socket          = "/run/patemon/ingest.sock"
+    socket_mode     = 0o660
+    interval        = 0.05          # seconds; batch window
+    max_rows        = 5000          # rows; batch limit
+    queue_size      = 10000         # submissions; producers block beyond
+    hitcount_format = "uint32"      # packed layout only, see hitblob.FORMATS
+    pulseheight     = "rows"        # rows | zlib | lzma (see phblob.py)
+    bins            = None          # histogram layout; None = phhist.Config.layout
+    partition       = None          # None, 'month' or 'session' (partition.py)
+    busy_timeout    = 5.0
+    live            = False         # publish into livering.py ring buffers
+    stats_interval  = 60.0          # seconds between metric log lines
+
+
+ACK_NONE        = "none"
+ACK_QUEUED      = "queued"
+ACK_COMMITTED   = "committed"
+ACK_SYNCED      = "synced"
+ACKS            = (ACK_NONE, ACK_QUEUED, ACK_COMMITTED, ACK_SYNCED)
+
+STATEMENTS = {
+    "hitcount":     schema.HITCOUNT.insert,
+    "pulseheight":  schema.PULSEHEIGHT.insert,
+    "housekeeping": schema.HOUSEKEEPING.insert,
+    "note":         "INSERT INTO note (session_id, text) VALUES (?, ?)"
+}
+WIDTHS = {
+    "hitcount":     len(schema.HITCOUNT.names),
+    "pulseheight":  len(schema.PULSEHEIGHT.names),
+    "housekeeping": len(schema.HOUSEKEEPING.names),
+    "note":         2
+}
+
+
+log = logging.getLogger("ingest")
+
+
+def _integer(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _valid(table: str, row) -> bool:
+    """Data table rows are all integers; notes are (session_id, text)."""
+    if table == "note":
+        return _integer(row[0]) and (row[1] is None or isinstance(row[1], str))
+    return all(_integer(value) for value in row)
+
+
+class Submission:
+    """Rows for one table, and their acknowledgement state."""
+    def __init__(self, table: str, rows: list, ack: str = ACK_COMMITTED):
+        if table not in STATEMENTS:
+            raise ValueError("Unsupported table '{}'".format(table))
+        if ack not in ACKS:
+            raise ValueError("Unsupported acknowledgement '{}'".format(ack))
+        for row in rows:
+            if len(row) != WIDTHS[table]:
+                raise ValueError(
+                    "Table '{}' rows need {} values, not {}".format(
+                        table, WIDTHS[table], len(row)
+                    )
+                )
+            if not _valid(table, row):
+                raise ValueError(
+                    "Table '{}' row has a missing or non-integer value".format(table)
+                )
+        self.table  = table
+        self.rows   = rows
+        self.ack    = ack
+        self.error  = None
+        self.done   = threading.Event()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Wait until written (or failed). Returns False on timeout."""
+        return self.done.wait(timeout)
+
+
+class Writer:
+    """Single writer. Call run() to loop until stop() is called."""
+    def __init__(self, database: str):
+        self.database   = database
+        self.queue      = queue.Queue(Config.queue_size)
+        self.stopped    = threading.Event()
+        self.connection = dbconn.connect(
+            database,
+            busy_timeout = Config.busy_timeout,
+            isolation_level = None,
+            check_same_thread = False
+        )
+        self.synchronous = self.connection.execute(
+            "PRAGMA synchronous"
+        ).fetchone()[0]
+        self.packed = hitblob.storage(self.connection) == "packed"
+        self.format = hitblob.FORMATS[Config.hitcount_format]
+        self.router = None
+        if Config.partition:
+            self.router = partition.Router(self.connection, Config.partition)
+        self.live = {}
+        if Config.live:
+            self.live = {t: livering.Publisher(t) for t in livering.TABLES}
+        self.lock   = threading.Lock()
+        self.stats  = {
+            "batches":          0,
+            "rows":             0,
+            "failed":           0,
+            "last_batch_rows":  0,
+            "max_batch_rows":   0,
+            "last_commit_ms":   0.0,
+            "max_commit_ms":    0.0
+        }
+
+    def submit(self, table: str, rows: list, ack: str = ACK_COMMITTED) -> Submission:
+        """Queue rows for writing. Blocks while the queue is full."""
+        submission = Submission(table, rows, ack)
+        self.queue.put(submission)
+        return submission
+
+    def metrics(self) -> dict:
+        with self.lock:
+            metrics = dict(self.stats)
+        metrics["queue_depth"] = self.queue.qsize()
+        metrics["mean_batch_rows"] = (
+            metrics["rows"] / metrics["batches"] if metrics["batches"] else 0.0
+        )
+        return metrics
+
+    def collect(self) -> list:
+        """Block for the first submission, then gather more until the batch
+        window closes or the row limit is reached."""
+        try:
+            batch = [self.queue.get(timeout = 0.5)]
+        except queue.Empty:
+            return []
+        rows = len(batch[0].rows)
+        deadline = time.monotonic() + Config.interval
+        while rows < Config.max_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                submission = self.queue.get(timeout = remaining)
+            except queue.Empty:
+                break
+            batch.append(submission)
+            rows += len(submission.rows)
+        return batch
+
+    def _insert(self, table: schema.Table, rows: list):
+        if self.router and table.name in partition.DATA_TABLES + ("hitcount_packed",):
+            self.router.insert(table, rows)
+        else:
+            self.connection.executemany(table.insert, rows)
+
+    def _hitcount(self, rows: list):
+        block = numpy.array(rows, dtype = numpy.int64)
+        if self.packed:
+            self._insert(schema.HITCOUNT_PACKED, hitblob.block_rows(block, self.format))
+        else:
+            self._insert(schema.HITCOUNT, rows)
+        for session_id in numpy.unique(block[:, 1]):
+            selected = block[block[:, 1] == session_id]
+            rollup.update(
+                self.connection, int(session_id), selected[:, 0], selected[:, 2:]
+            )
+
+    def _pulseheight(self, rows: list):
+        block = numpy.array(rows, dtype = numpy.int64)
+        if Config.pulseheight == "rows":
+            self._insert(schema.PULSEHEIGHT, rows)
+        for session_id in numpy.unique(block[:, 1]):
+            selected = block[block[:, 1] == session_id]
+            if Config.pulseheight == "rows":
+                phhist.update(
+                    self.connection, int(session_id), selected[:, 2:], Config.bins
+                )
+            else:
+                csvimport.write_events(
+                    self.connection,
+                    int(session_id),
+                    selected[:, 0],
+                    selected[:, 2:],
+                    Config.pulseheight,
+                    Config.bins
+                )
+
+    def _publish(self, submission: Submission):
+        try:
+            self.live[submission.table].publish(submission.rows)
+        except (TypeError, ValueError) as e:
+            log.warning("'{}' rows not published: {}".format(submission.table, e))
+
+    def write(self, batch: list):
+        """Write a batch in one transaction, each submission in a SAVEPOINT."""
+        synced = any(s.ack == ACK_SYNCED for s in batch)
+        if synced:
+            self.connection.execute("PRAGMA synchronous = FULL")
+        start = time.perf_counter()
+        written = failed = 0
+        if self.router:
+            # Partitions have to be attached before the transaction begins
+            try:
+                self.router.prepare(
+                    [row for s in batch if s.table != "note" for row in s.rows]
+                )
+            except (sqlite3.Error, ValueError) as e:
+                log.error("Partitions for batch unavailable: {}".format(e))
+                for submission in batch:
+                    submission.error = str(e)
+                    submission.done.set()
+                return
+        committed = False
+        try:
+            self.connection.execute("BEGIN IMMEDIATE")
+            for submission in batch:
+                self.connection.execute("SAVEPOINT submission")
+                try:
+                    if submission.table == "hitcount":
+                        self._hitcount(submission.rows)
+                    elif submission.table == "pulseheight":
+                        self._pulseheight(submission.rows)
+                    elif submission.table == "note":
+                        self.connection.executemany(
+                            STATEMENTS[submission.table], submission.rows
+                        )
+                    else:
+                        self._insert(schema.TABLES[submission.table], submission.rows)
+                except Exception as e:
+                    self.connection.execute("ROLLBACK TO submission")
+                    submission.error = str(e)
+                    failed += len(submission.rows)
+                    log.warning(
+                        "'{}' submission rejected: {}".format(submission.table, e)
+                    )
+                else:
+                    written += len(submission.rows)
+                self.connection.execute("RELEASE submission")
+            self.connection.execute("COMMIT")
+            committed = True
+        except Exception as e:
+            # Nothing of the batch is written; the writer must not die with
+            # the transaction open
+            if self.connection.in_transaction:
+                self.connection.execute("ROLLBACK")
+            for submission in batch:
+                submission.error = submission.error or "Batch failed: {}".format(e)
+            log.error("Batch of {} submissions failed: {}".format(len(batch), e))
+            written = 0
+            failed = sum(len(s.rows) for s in batch)
+        finally:
+            if synced:
+                self.connection.execute(
+                    "PRAGMA synchronous = {}".format(self.synchronous)
+                )
+            for submission in batch:
+                # Published (after COMMIT) before acknowledged; see livering.py
+                if committed and submission.table in self.live and submission.error is None:
+                    self._publish(submission)
+                submission.done.set()
+        duration = (time.perf_counter() - start) * 1000
+        with self.lock:
+            self.stats["batches"]           += 1
+            self.stats["rows"]              += written
+            self.stats["failed"]            += failed
+            self.stats["last_batch_rows"]   = written + failed
+            self.stats["max_batch_rows"]    = max(
+                self.stats["max_batch_rows"], written + failed
+            )
+            self.stats["last_commit_ms"]    = duration
+            self.stats["max_commit_ms"]     = max(self.stats["max_commit_ms"], duration)
+
+    def run(self):
+        logged = time.monotonic()
+        while not (self.stopped.is_set() and self.queue.empty()):
+            batch = self.collect()
+            if batch:
+                self.write(batch)
+            if time.monotonic() - logged > Config.stats_interval:
+                log.info(
+                    "queue {queue_depth}, {batches} batches, {rows} rows "
+                    "(mean {mean_batch_rows:.1f}, max {max_batch_rows}), "
+                    "{failed} failed, max commit {max_commit_ms:.1f} ms".format(
+                        **self.metrics()
+                    )
+                )
+                logged = time.monotonic()
+        for publisher in self.live.values():
+            # Segments are left in place for the readers and the next writer
+            publisher.close()
+        self.connection.close()
+
+    def stop(self, *args):
+        """Stop after the queued submissions have been written."""
+        self.stopped.set()
+
+
+##############################################################################
+#
+# Producer interfaces
+#
+##############################################################################
+
+class _Handler(socketserver.StreamRequestHandler):
+    """One producer connection; newline-delimited JSON requests."""
+    def handle(self):
+        writer = self.server.writer
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if request.get("metrics"):
+                    self.reply({"ok": True, "metrics": writer.metrics()})
+                    continue
+                ack = request.get("ack", ACK_COMMITTED)
+                submission = writer.submit(request["table"], request["rows"], ack)
+            except (ValueError, KeyError, TypeError) as e:
+                self.reply({"ok": False, "error": str(e)})
+                continue
+            if ack == ACK_NONE:
+                continue
+            if ack != ACK_QUEUED:
+                submission.wait()
+            if submission.error:
+                self.reply({"ok": False, "error": submission.error})
+            else:
+                self.reply({"ok": True, "rows": len(submission.rows)})
+
+    def reply(self, message: dict):
+        self.wfile.write((json.dumps(message) + "\n").encode())
+        self.wfile.flush()
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class Service:
+    """Writer plus producer interfaces (Unix socket and/or a queue)."""
+    def __init__(self, database: str, path: str = None, queue = None):
+        self.writer = Writer(database)
+        self.path   = path
+        self.queue  = queue
+        self.server = None
+        if path:
+            if os.path.exists(path):
+                os.unlink(path)
+            os.makedirs(os.path.dirname(path) or ".", exist_ok = True)
+            self.server = _Server(path, _Handler)
+            self.server.writer = self.writer
+            os.chmod(path, Config.socket_mode)
+
+    def _consume(self):
+        """Multiprocessing queue reader; (table, rows) items, None stops."""
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            try:
+                self.writer.submit(item[0], item[1], ACK_NONE)
+            except ValueError as e:
+                log.warning("Queue submission rejected: {}".format(e))
+
+    def run(self):
+        threads = []
+        if self.server:
+            threads.append(threading.Thread(target = self.server.serve_forever))
+        if self.queue is not None:
+            threads.append(threading.Thread(target = self._consume))
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        self.writer.run()
+        if self.server:
+            self.server.server_close()
+            os.unlink(self.path)
+
+    def stop(self, *args):
+        if self.server:
+            # shutdown() waits for serve_forever(); must not block a signal handler
+            threading.Thread(target = self.server.shutdown).start()
+        if self.queue is not None:
+            self.queue.put(None)
+        self.writer.stop()
+
+
+class Client:
+    """Producer side of the Unix socket interface."""
+    def __init__(self, path: str = None, ack: str = ACK_COMMITTED):
+        self.ack    = ack
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(path or Config.socket)
+        self.file   = self.socket.makefile("rwb")
+
+    def _request(self, message: dict, reply: bool = True) -> dict:
+        self.file.write((json.dumps(message) + "\n").encode())
+        self.file.flush()
+        if not reply:
+            return None
+        return json.loads(self.file.readline())
+
+    def submit(self, table: str, rows: list, ack: str = None) -> dict:
+        """Submit rows. Returns the reply, or None for ACK_NONE."""
+        ack = ack or self.ack
+        return self._request(
+            {"table": table, "rows": rows, "ack": ack}, ack != ACK_NONE
+        )
+
+    def metrics(self) -> dict:
+        return self._request({"metrics": True})["metrics"]
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+
+##############################################################################
+#
+# MAIN
+#
+##############################################################################
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description = "PATE Monitor group-commit ingest service."
+    )
+    parser.add_argument(
+        '-l',
+        '--log',
+        help    = "Set logging level. Default: '{}'".format(Config.log_level),
+        choices = ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
+        dest    = "log_level",
+        default = Config.log_level,
+        type    = str.upper,
+        metavar = "LEVEL"
+    )
+    parser.add_argument(
+        '-d',
+        '--database',
+        help    = "Database file. Default: '{}'".format(Config.database),
+        dest    = "database",
+        default = Config.database
+    )
+    parser.add_argument(
+        '-s',
+        '--socket',
+        help    = "Unix socket path. Default: '{}'".format(Config.socket),
+        dest    = "socket",
+        default = Config.socket
+    )
+    parser.add_argument(
+        '--interval',
+        help    = "Batch window in milliseconds. Default: {:.0f}".format(
+            Config.interval * 1000
+        ),
+        dest    = "interval",
+        default = Config.interval * 1000,
+        type    = float
+    )
+    parser.add_argument(
+        '--max-rows',
+        help    = "Rows per batch, at most. Default: {}".format(Config.max_rows),
+        dest    = "max_rows",
+        default = Config.max_rows,
+        type    = int
+    )
+    parser.add_argument(
+        '--hitcount-format',
+        help    = "BLOB format for packed hitcount storage. Default: '{}'".format(
+            Config.hitcount_format
+        ),
+        dest    = "hitcount_format",
+        choices = hitblob.FORMATS.keys(),
+        default = Config.hitcount_format
+    )
+    parser.add_argument(
+        '--pulseheight-storage',
+        help    = "Pulseheight event storage (rows|zlib|lzma). Default: '{}'".format(
+            Config.pulseheight
+        ),
+        dest    = "pulseheight",
+        choices = ["rows"] + list(phblob.FORMATS),
+        default = Config.pulseheight
+    )
+    parser.add_argument(
+        '--bins',
+        help    = "Histogram bin widths, e.g. '4,ac1=16' (see phhist.py).",
+        dest    = "bins",
+        type    = phhist.parse_layout,
+        default = Config.bins
+    )
+    parser.add_argument(
+        '--partition',
+        help    = "Write data into partition files, by 'month' or 'session'.",
+        dest    = "partition",
+        choices = partition.SCHEMES,
+        default = Config.partition
+    )
+    parser.add_argument(
+        '--live',
+        help    = "Publish committed hitcount and housekeeping rows into shared memory.",
+        action  = 'store_true'
+    )
+    parser.add_argument(
+        '--stats',
+        help    = "Write statement statistics (JSON) into this file.",
+        dest    = "stats_file"
+    )
+    args = parser.parse_args()
+    Config.partition        = args.partition
+    Config.interval         = args.interval / 1000
+    Config.max_rows         = args.max_rows
+    Config.hitcount_format  = args.hitcount_format
+    Config.pulseheight      = args.pulseheight
+    Config.bins             = args.bins
+    Config.live             = args.live
+    dbconn.Config.dump_file = args.stats_file
+    dbconn.Config.interval  = Config.stats_interval
+
+    logging.basicConfig(
+        level       = getattr(logging, args.log_level),
+        filename    = Config.log_file,
+        format      = "%(asctime)s.%(msecs)03d %(levelname)s: %(message)s",
+        datefmt     = "%H:%M:%S"
+    )
+
+    service = Service(args.database, args.socket)
+    signal.signal(signal.SIGTERM, service.stop)
+    signal.signal(signal.SIGINT, service.stop)
+    log.info(
+        "Ingesting into '{}' via '{}' ({:.0f} ms / {} rows)".format(
+            args.database, args.socket, Config.interval * 1000, Config.max_rows
+        )
+    )
+    service.run()
+
+
+# EOF
@@ -0,0 +1,234 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Shared-memory ring buffer of the latest hitcount and housekeeping rows.
+#
+# livering.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   The live dashboard polls the newest hitcount rotation and the recent
+#   housekeeping samples. Instead of every browser tab and worker querying
+#   SQLite for them, the writer (ingest.py --live) publishes the last
+#   'capacity' committed rows of each table into a shared memory segment
+#   ('patemon.hitcount', 'patemon.housekeeping'), which readers map.
+#
+#   Segment layout:
+#
+#       HEADER      64 bytes; magic, layout version, capacity, row size,
+#                   'reserved' and 'committed' row sequence numbers
+#       rows        2 * capacity records of Table.dtype (schema.py column
+#                   order), row n at slots n % capacity and
+#                   n % capacity + capacity
+#
+#   Each row is written twice, so the latest k rows are always one
+#   contiguous slice and can be returned as a NumPy view, without copying.
+#
+#   There is one writer and no lock. The writer first advances 'reserved'
+#   to the sequence number it is about to write up to, writes the rows, and
+#   then advances 'committed'. A reader takes the slice ending at
+#   'committed'; the rows of the slice have not been overwritten as long as
+#   'reserved' has not passed the first of them + capacity (valid()). A
+#   reader that keeps a view for long should check valid() after using it,
+#   or ask for a copy.
+#
+#       with livering.Reader("hitcount") as ring:
+#           sequence, rows = ring.latest(1)
+#           rows["timestamp"], rows["s01e01"]
+#
+import sys
+import time
+import numpy
+from multiprocessing import shared_memory
+from multiprocessing import resource_tracker
+
+import schema
+
+
+class Config:
+    prefix          = "patemon."
+    capacity        = {
+        "hitcount":     240,        # one hour of 15 s rotations, ~1.5 MB
+        "housekeeping": 1440        # one day of 60 s samples, ~0.9 MB
+    }
+
+
+MAGIC           = 0x50415445        # "PATE"
+LAYOUT          = 1
+HEADER          = numpy.dtype([
+    ("magic",       "<u4"),
+    ("layout",      "<u4"),
+    ("capacity",    "<u8"),
+    ("itemsize",    "<u8"),
+    ("reserved",    "<u8"),         # rows being written, up to (exclusive)
+    ("committed",   "<u8"),         # rows written, up to (exclusive)
+    ("spare",       "V24")
+])
+TABLES          = ("hitcount", "housekeeping")
+
+
+def _name(table: str) -> str:
+    return Config.prefix + table
+
+
+def _header(shm: shared_memory.SharedMemory) -> numpy.void:
+    """Header record of a segment (a view; fields can be assigned)."""
+    return numpy.ndarray(1, dtype = HEADER, buffer = shm.buf)[0]
+
+
+def _rows(shm: shared_memory.SharedMemory, table: schema.Table, capacity: int) -> numpy.ndarray:
+    return numpy.ndarray(
+        2 * capacity, dtype = table.dtype, buffer = shm.buf, offset = HEADER.itemsize
+    )
+
+
+def _open(name: str, size: int = 0) -> shared_memory.SharedMemory:
+    """Attach to an existing segment (or create one of 'size' bytes), not
+    tracked; before Python 3.13, the resource tracker would unlink the
+    segment when this process exits, even if other processes use it."""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, bool(size), size, track = False)
+    shm = shared_memory.SharedMemory(name, bool(size), size)
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def _unlink(shm: shared_memory.SharedMemory):
+    if sys.version_info < (3, 13):
+        # unlink() unregisters the segment from the resource tracker
+        resource_tracker.register(shm._name, "shared_memory")
+    shm.unlink()
+
+
+class Publisher:
+    """Writer side of a table ring. A segment of the same layout left by a
+    previous writer is reused, so its rows and readers stay valid."""
+    def __init__(self, table: str, capacity: int = None):
+        if table not in TABLES:
+            raise ValueError("Table '{}' has no live ring".format(table))
+        self.table      = schema.TABLES[table]
+        self.capacity   = capacity or Config.capacity[table]
+        size = HEADER.itemsize + 2 * self.capacity * self.table.dtype.itemsize
+        try:
+            self.shm = _open(_name(table))
+            header = _header(self.shm)
+            if (
+                self.shm.size < size or
+                header["magic"] != MAGIC or
+                header["layout"] != LAYOUT or
+                header["capacity"] != self.capacity or
+                header["itemsize"] != self.table.dtype.itemsize
+            ):
+                del header
+                self.shm.close()
+                _unlink(self.shm)
+                raise FileNotFoundError
+        except FileNotFoundError:
+            self.shm = _open(_name(table), size)
+            header = _header(self.shm)
+            header["reserved"]  = 0
+            header["committed"] = 0
+            header["capacity"]  = self.capacity
+            header["itemsize"]  = self.table.dtype.itemsize
+            header["layout"]    = LAYOUT
+            header["magic"]     = MAGIC
+        self.header = _header(self.shm)
+        self.rows   = _rows(self.shm, self.table, self.capacity)
+
+    def publish(self, rows):
+        """Append rows (sequences in table column order, or a Table.dtype
+        array). Only the last 'capacity' of them are kept."""
+        if not isinstance(rows, numpy.ndarray) or rows.dtype != self.table.dtype:
+            rows = numpy.array([tuple(r) for r in rows], dtype = self.table.dtype)
+        if not len(rows):
+            return
+        # Rows beyond the capacity are counted, not written; readers see
+        # from the sequence numbers that they were lost
+        end = int(self.header["committed"]) + len(rows)
+        rows = rows[-self.capacity:]
+        first = end - len(rows)
+        self.header["reserved"] = end
+        slots = (first + numpy.arange(len(rows))) % self.capacity
+        self.rows[slots] = rows
+        self.rows[slots + self.capacity] = rows
+        self.header["committed"] = end
+
+    def close(self, unlink: bool = False):
+        """Detach; with 'unlink', also remove the segment."""
+        del self.header, self.rows
+        self.shm.close()
+        if unlink:
+            _unlink(self.shm)
+
+
+class Reader:
+    """Reader side of a table ring. Raises FileNotFoundError if no writer
+    has published the table."""
+    def __init__(self, table: str):
+        if table not in TABLES:
+            raise ValueError("Table '{}' has no live ring".format(table))
+        self.table  = schema.TABLES[table]
+        self.shm    = _open(_name(table))
+        header = _header(self.shm)
+        if header["magic"] != MAGIC or header["layout"] != LAYOUT:
+            del header
+            self.shm.close()
+            raise ValueError("Segment '{}' has an unknown layout".format(_name(table)))
+        self.capacity   = int(header["capacity"])
+        self.header     = header
+        self.rows       = _rows(self.shm, self.table, self.capacity)
+        self.rows.flags.writeable = False
+
+    @property
+    def sequence(self) -> int:
+        """Number of rows published so far."""
+        return int(self.header["committed"])
+
+    def latest(self, k: int = 1, copy: bool = False) -> tuple:
+        """Returns (sequence, rows); the newest k rows (fewer, if fewer are
+        available), oldest first, and the sequence number following them.
+        Rows are a read-only view into the segment unless 'copy' is set;
+        see valid()."""
+        while True:
+            end = int(self.header["committed"])
+            n = min(k, end, self.capacity)
+            start = (end - n) % self.capacity
+            rows = self.rows[start:start + n]
+            if not copy:
+                return end, rows
+            rows = rows.copy()
+            if self.valid(end, n):
+                return end, rows
+
+    def since(self, sequence: int, copy: bool = False) -> tuple:
+        """Rows published after 'sequence' (a previous return value), for
+        polling readers. Rows older than the ring capacity are lost."""
+        return self.latest(max(self.sequence - sequence, 0), copy)
+
+    def valid(self, sequence: int, k: int) -> bool:
+        """True if the k rows before 'sequence' have not been overwritten
+        (yet)."""
+        return int(self.header["reserved"]) <= sequence - k + self.capacity
+
+    def wait(self, sequence: int, timeout: float = None, poll: float = 0.05) -> bool:
+        """Wait until rows after 'sequence' are published. Returns False
+        on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.sequence <= sequence:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(poll)
+        return True
+
+    def close(self):
+        del self.header, self.rows
+        self.shm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# EOF
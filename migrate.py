@@ -0,0 +1,373 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# In-place schema migrations.
+#
+# migrate.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Database schema version is kept in PRAGMA user_version; databases
+#   created by setup.py carry schema.VERSION. upgrade() runs the pending
+#   migrations in order, each committed together with its new version
+#   number, so an interrupted upgrade simply continues from where it was.
+#
+#       Version 0   Databases created before versioning (setup.py 0.4.x -
+#                   0.6.1). Objects missing from those are created by
+#                   migration 1; the rest of the schema is identical.
+#       Version 1   + connection_pragma, hitcount_rollup, session indexes;
+#                   trigger psu_ari replaced by the guarded one (it only
+#                   sets psu.modified for updates that do not).
+#       Version 2   + data_partition (partition.py).
+#       Version 3   + pulseheight_chunk (phblob.py).
+#       Version 4   + pulseheight_histogram (phhist.py), built for all
+#                   sessions.
+#       Version 5   + csv_import (csvbulk.py).
+#
+#   Migrations that add tables fill them from the data, one session per
+#   transaction, so that an interrupted upgrade resumes with the sessions
+#   not yet done.
+#
+#   SQLite cannot alter column definitions; a migration that has to change
+#   them calls rebuild(), which rebuilds the table with copy() and swap().
+#   The table is copied into '<table>_new' in chunks of 'chunk_rows', one
+#   transaction per chunk, in rowid (timestamp) order, with a progress
+#   display. The rows already in '<table>_new' are the record of progress:
+#   the copy can be interrupted at any time, and rerunning the upgrade
+#   resumes after the last copied row. Writers may keep writing meanwhile:
+#   triggers on the table, created together with '<table>_new', apply
+#   inserts, updates and deletes of rows at or below the last copied row to
+#   '<table>_new' in the writer's own transaction, and rows above it are
+#   copied by later chunks. swap() copies the remaining rows, checks that
+#   both tables have the same number of rows, and only then replaces the
+#   table, all in the migration's transaction.
+#
+#   Usage:
+#       python3 migrate.py [-d /srv/patemon.sqlite3]
+#
+import sqlite3
+import argparse
+
+import schema
+import rollup
+import phhist
+import devdata
+import partition
+
+
+CHUNK_ROWS  = 20000
+MIGRATIONS  = []            # (version, description, function)
+
+
+def migration(version: int, description: str):
+    """Register a migration. Function receives (connection, chunk_rows) and
+    returns with a transaction open; upgrade() commits it."""
+    def register(function):
+        MIGRATIONS.append((version, description, function))
+        MIGRATIONS.sort(key = lambda m: m[0])
+        return function
+    return register
+
+
+def version(connection) -> int:
+    return connection.execute("PRAGMA user_version").fetchone()[0]
+
+
+def pending(connection) -> list:
+    current = version(connection)
+    return [m for m in MIGRATIONS if m[0] > current]
+
+
+def _exists(connection, name: str) -> bool:
+    return connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = ?", (name,)
+    ).fetchone() is not None
+
+
+def _packed(connection) -> bool:
+    return _exists(connection, "hitcount_packed")
+
+
+##############################################################################
+#
+# Table rebuild
+#
+##############################################################################
+
+def _triggers(table: str, new: str, columns: list) -> list:
+    """Triggers that apply changes of 'table' rows up to the last row copied
+    into 'new' (its MAX(rowid)) to 'new', so that 'new' always holds exactly
+    the rows of 'table' up to that row."""
+    copied = "(SELECT IFNULL(MAX(rowid), -1) FROM {})".format(new)
+    insert = "INSERT OR REPLACE INTO {} ({})".format(new, ", ".join(columns))
+    values = ", ".join("NEW." + c for c in columns)
+    return [
+        sql.format(table = table, new = new, copied = copied, insert = insert, values = values)
+        for sql in (
+            """
+            CREATE TRIGGER IF NOT EXISTS {table}_copy_ai AFTER INSERT ON {table}
+            WHEN NEW.rowid <= {copied}
+            BEGIN
+                {insert} VALUES ({values});
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS {table}_copy_au AFTER UPDATE ON {table}
+            BEGIN
+                DELETE FROM {new} WHERE rowid = OLD.rowid;
+                {insert} SELECT {values} WHERE NEW.rowid <= {copied};
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS {table}_copy_ad AFTER DELETE ON {table}
+            BEGIN
+                DELETE FROM {new} WHERE rowid = OLD.rowid;
+            END
+            """
+        )
+    ]
+
+
+def copy(connection, table: schema.Table, chunk_rows: int = CHUNK_ROWS) -> int:
+    """Copy 'table' into '<table>_new' (schema.py definition), one chunk per
+    transaction. Resumes a previous copy. Returns rows copied by this call.
+    The table must be keyed by its rowid (INTEGER PRIMARY KEY); the triggers
+    that keep copied rows up to date are dropped with it by swap()."""
+    new = table.name + "_new"
+    old = [r[1] for r in connection.execute("PRAGMA table_info({})".format(table.name))]
+    names = [c for c in table.names if c in old]
+    connection.execute("BEGIN IMMEDIATE")
+    if not _exists(connection, new):
+        connection.execute(table.create_sql(new))
+    for trigger in _triggers(table.name, new, names):
+        connection.execute(trigger)
+    connection.execute("COMMIT")
+    columns = ", ".join(names)
+    sql = "INSERT INTO {new} ({c}) SELECT {c} FROM {old} WHERE rowid > ? ORDER BY rowid LIMIT ?".format(
+        new = new, old = table.name, c = columns
+    )
+    total    = connection.execute("SELECT COUNT(*) FROM {}".format(table.name)).fetchone()[0]
+    done     = connection.execute("SELECT COUNT(*) FROM {}".format(new)).fetchone()[0]
+    progress = devdata.Progress(total)
+    copied   = 0
+    while True:
+        connection.execute("BEGIN IMMEDIATE")
+        last = connection.execute(
+            "SELECT IFNULL(MAX(rowid), -1) FROM {}".format(new)
+        ).fetchone()[0]
+        rows = connection.execute(sql, (last, chunk_rows)).rowcount
+        connection.execute("COMMIT")
+        copied += rows
+        progress.update(done + copied)
+        if rows < chunk_rows:
+            break
+    progress.finish()
+    return copied
+
+
+def swap(connection, table: schema.Table):
+    """Within a transaction: copy rows written since copy(), then replace
+    'table' with '<table>_new' and recreate its indexes. Raises ValueError,
+    before anything is dropped, if the row counts of the two differ.
+    Requires PRAGMA foreign_keys = 0 (see upgrade())."""
+    new = table.name + "_new"
+    old = [r[1] for r in connection.execute("PRAGMA table_info({})".format(table.name))]
+    columns = ", ".join(c for c in table.names if c in old)
+    connection.execute(
+        "INSERT INTO {new} ({c}) SELECT {c} FROM {old} WHERE rowid > (SELECT IFNULL(MAX(rowid), -1) FROM {new})".format(
+            new = new, old = table.name, c = columns
+        )
+    )
+    rows, copied = (
+        connection.execute("SELECT COUNT(*) FROM {}".format(name)).fetchone()[0]
+        for name in (table.name, new)
+    )
+    if rows != copied:
+        raise ValueError(
+            "'{}' has {} rows, '{}' {}; table not replaced".format(
+                table.name, rows, new, copied
+            )
+        )
+    connection.execute("DROP TABLE {}".format(table.name))
+    connection.execute("ALTER TABLE {} RENAME TO {}".format(new, table.name))
+    for kind, name, sql in schema.objects("uint32" if _packed(connection) else "table"):
+        if kind == "index" and " ON {} ".format(table.name) in sql + " ":
+            connection.execute(sql.replace("CREATE INDEX", "CREATE INDEX IF NOT EXISTS", 1))
+
+
+def rebuild(connection, table: schema.Table, chunk_rows: int = CHUNK_ROWS):
+    """Rebuild 'table' into its schema.py definition: copy() it, then swap()
+    within a transaction that is left open (for a migration function, see
+    migration()). An interrupted rebuild resumes when called again."""
+    print("    Copying '{}' into '{}_new'".format(table.name, table.name))
+    copied = copy(connection, table, chunk_rows)
+    print("    {} rows copied".format(copied))
+    connection.execute("BEGIN IMMEDIATE")
+    swap(connection, table)
+    print("    Table '{}' replaced".format(table.name))
+
+
+##############################################################################
+#
+# Migrations
+#
+##############################################################################
+
+@migration(1, "Rollups, session indexes and PRAGMA profile table; psu_ari trigger guarded")
+def _version1(connection, chunk_rows: int):
+    connection.execute("BEGIN IMMEDIATE")
+    # Version 0 trigger rewrites every row; recreated below from schema.py
+    connection.execute("DROP TRIGGER IF EXISTS psu_ari")
+    for kind, name, sql in schema.objects("uint32" if _packed(connection) else "table"):
+        if not _exists(connection, name):
+            connection.execute(sql)
+            print("    {} '{}' created".format(kind.capitalize(), name))
+    connection.execute("COMMIT")
+    # One session per transaction; sessions already rolled up are skipped
+    sessions = connection.execute(
+        """
+        SELECT id FROM testing_session
+        WHERE id NOT IN (SELECT DISTINCT session_id FROM hitcount_rollup)
+        """
+    ).fetchall()
+    for (session_id,) in sessions:
+        connection.execute("BEGIN IMMEDIATE")
+        rotations = rollup.rebuild(connection, session_id, chunk_rows)
+        print("    Session {} rollups: {} rotations".format(session_id, rotations))
+    connection.execute("BEGIN IMMEDIATE")
+
+
+@migration(2, "Partition registry")
+def _version2(connection, chunk_rows: int):
+    connection.execute("BEGIN IMMEDIATE")
+    # Migration 1 creates it for databases that start from version 0
+    if not _exists(connection, schema.DATA_PARTITION.name):
+        connection.execute(schema.DATA_PARTITION.ddl)
+
+
+@migration(3, "Compressed pulseheight chunk storage")
+def _version3(connection, chunk_rows: int):
+    connection.execute("BEGIN IMMEDIATE")
+    if not _exists(connection, schema.PULSEHEIGHT_CHUNK.name):
+        connection.execute(schema.PULSEHEIGHT_CHUNK.ddl)
+
+
+@migration(4, "Pulseheight histograms")
+def _version4(connection, chunk_rows: int):
+    connection.execute("BEGIN IMMEDIATE")
+    if not _exists(connection, schema.PULSEHEIGHT_HISTOGRAM.name):
+        connection.execute(schema.PULSEHEIGHT_HISTOGRAM.ddl)
+    connection.execute("COMMIT")
+    # One session per transaction; sessions already built are skipped
+    sessions = connection.execute(
+        """
+        SELECT id FROM testing_session
+        WHERE id NOT IN (SELECT DISTINCT session_id FROM pulseheight_histogram)
+        """
+    ).fetchall()
+    for (session_id,) in sessions:
+        # Partitions cannot be attached within the transaction
+        partition.relation(connection, "pulseheight", session_id)
+        connection.execute("BEGIN IMMEDIATE")
+        events = phhist.rebuild(connection, session_id)
+        print("    Session {} histograms: {} events".format(session_id, events))
+    connection.execute("BEGIN IMMEDIATE")
+
+
+@migration(5, "Calibration CSV import ledger")
+def _version5(connection, chunk_rows: int):
+    connection.execute("BEGIN IMMEDIATE")
+    if not _exists(connection, schema.CSV_IMPORT.name):
+        connection.execute(schema.CSV_IMPORT.ddl)
+
+
+
+##############################################################################
+#
+# Upgrade
+#
+##############################################################################
+
+def upgrade(connection, chunk_rows: int = CHUNK_ROWS) -> int:
+    """Run pending migrations. Connection must be in autocommit mode
+    (isolation_level = None). Returns resulting schema version."""
+    if connection.in_transaction:
+        raise ValueError("Connection has an open transaction")
+    current = version(connection)
+    if current > schema.VERSION:
+        raise ValueError(
+            "Database schema version {} is newer than this software ({})".format(
+                current, schema.VERSION
+            )
+        )
+    foreign_keys = connection.execute("PRAGMA foreign_keys").fetchone()[0]
+    connection.execute("PRAGMA foreign_keys = 0")
+    try:
+        for number, description, function in pending(connection):
+            print("Migration {}: {}".format(number, description))
+            try:
+                function(connection, chunk_rows)
+                violations = connection.execute("PRAGMA foreign_key_check").fetchall()
+                if violations:
+                    raise ValueError(
+                        "Migration {} left {} foreign key violations".format(
+                            number, len(violations)
+                        )
+                    )
+                connection.execute("PRAGMA user_version = {}".format(number))
+                connection.execute("COMMIT")
+            except:
+                if connection.in_transaction:
+                    connection.execute("ROLLBACK")
+                raise
+    finally:
+        connection.execute("PRAGMA foreign_keys = {}".format(foreign_keys))
+    return version(connection)
+
+
+##############################################################################
+#
+# MAIN
+#
+##############################################################################
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description = "Upgrade PATE Monitor database schema in place."
+    )
+    parser.add_argument(
+        '-d',
+        '--database',
+        help    = "Database file. Default: '/srv/patemon.sqlite3'",
+        dest    = "database",
+        default = "/srv/patemon.sqlite3"
+    )
+    parser.add_argument(
+        '--chunk',
+        help    = "Rows per copy transaction and rollup read. Default: {}".format(CHUNK_ROWS),
+        dest    = "chunk_rows",
+        default = CHUNK_ROWS,
+        type    = int
+    )
+    parser.add_argument(
+        '--status',
+        help    = "Show schema version and pending migrations only.",
+        action  = 'store_true'
+    )
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(args.database, isolation_level = None)
+    print(
+        "Schema version {} (current {})".format(version(connection), schema.VERSION)
+    )
+    if args.status:
+        for number, description, _ in pending(connection):
+            print("    pending {}: {}".format(number, description))
+    else:
+        upgrade(connection, args.chunk_rows)
+        print("Schema version {}".format(version(connection)))
+    connection.close()
+
+
+# EOF
@@ -0,0 +1,217 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Export session science data into NumPy (.npy) files.
+#
+# npexport.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Each exported table produces two files into the output directory:
+#
+#       <table>.npy             2-D array (rows, data columns)
+#       <table>.timestamp.npy   1-D int64 timestamp vector
+#
+#   and 'session.json' lists the column names (in table order), row counts
+#   and dtypes. Arrays are written through NumPy memory maps, one chunk at
+#   a time, so memory use does not depend on session size. load() reopens
+#   them with np.load(mmap_mode = 'r'); nothing is read until used.
+#
+#   All tables are read within one read transaction (consistent snapshot,
+#   even while the session is still being recorded); the caller's, if it
+#   has one open, which export() then leaves open. Rows in partition
+#   files are included; their partitions are attached before the
+#   transaction begins (see partition.relation()).
+#
+import os
+import json
+import numpy
+import sqlite3
+import argparse
+
+import schema
+import hitblob
+import phblob
+import partition
+
+
+TABLES      = ("hitcount", "pulseheight", "housekeeping")
+DTYPES      = {
+    table: numpy.dtype(schema.TABLES[table].columns[-1].dtype)
+    for table in TABLES
+}
+CHUNK_ROWS  = 10000
+MANIFEST    = "session.json"
+
+
+def iter_chunks(connection, table: str, session_id: int, chunk_rows: int):
+    """Yield (timestamps, data) chunks of a session, in timestamp order."""
+    if table == "hitcount":
+        yield from hitblob.iter_rotations(
+            connection, session_id, chunk_rows = chunk_rows
+        )
+        return
+    if table == "pulseheight":
+        yield from phblob.iter_events(
+            connection, session_id, chunk_rows = chunk_rows
+        )
+        return
+    cursor = connection.execute(
+        "SELECT timestamp, {} FROM {} WHERE session_id = ? ORDER BY timestamp".format(
+            ", ".join(schema.TABLES[table].data),
+            _relation(connection, table, session_id)
+        ),
+        (session_id,)
+    )
+    while True:
+        rows = cursor.fetchmany(chunk_rows)
+        if not rows:
+            return
+        data = numpy.array(rows, dtype = numpy.int64)
+        yield data[:, 0], data[:, 1:]
+
+
+def _relation(connection, table: str, session_id: int) -> str:
+    if table == "hitcount":
+        table = hitblob.table(connection)
+    return partition.relation(connection, table, session_id)
+
+
+def count_rows(connection, table: str, session_id: int) -> int:
+    if table == "pulseheight":
+        return phblob.count_events(connection, session_id)
+    return connection.execute(
+        "SELECT COUNT(*) FROM {} WHERE session_id = ?".format(
+            _relation(connection, table, session_id)
+        ),
+        (session_id,)
+    ).fetchone()[0]
+
+
+def export(
+    connection,
+    session_id: int,
+    directory: str,
+    tables: tuple = TABLES,
+    chunk_rows: int = CHUNK_ROWS
+) -> dict:
+    """Export session tables into 'directory'. Returns the manifest."""
+    os.makedirs(directory, exist_ok = True)
+    manifest = {"session_id": session_id, "tables": {}}
+    for table in tables:
+        _relation(connection, table, session_id)
+    # A transaction of the caller is left to the caller
+    owned = not connection.in_transaction
+    if owned:
+        connection.execute("BEGIN")
+    try:
+        for table in tables:
+            columns = schema.TABLES[table].data
+            nrows = count_rows(connection, table, session_id)
+            data = numpy.lib.format.open_memmap(
+                os.path.join(directory, table + ".npy"),
+                mode = "w+",
+                dtype = DTYPES[table],
+                shape = (nrows, len(columns))
+            )
+            stamps = numpy.lib.format.open_memmap(
+                os.path.join(directory, table + ".timestamp.npy"),
+                mode = "w+",
+                dtype = numpy.int64,
+                shape = (nrows,)
+            )
+            row = 0
+            for timestamps, chunk in iter_chunks(connection, table, session_id, chunk_rows):
+                data[row:row + len(chunk)] = chunk
+                stamps[row:row + len(chunk)] = timestamps
+                row += len(chunk)
+            data.flush()
+            stamps.flush()
+            del data, stamps
+            manifest["tables"][table] = {
+                "rows":     nrows,
+                "dtype":    DTYPES[table].str,
+                "columns":  list(columns)
+            }
+    except:
+        if owned:
+            connection.rollback()
+        raise
+    if owned:
+        connection.commit()
+    with open(os.path.join(directory, MANIFEST), "w") as file:
+        json.dump(manifest, file, indent = 4)
+    return manifest
+
+
+def load(directory: str, table: str) -> tuple:
+    """Returns (timestamps, data, columns) of an exported table. Arrays are
+    read-only memory maps of the .npy files."""
+    with open(os.path.join(directory, MANIFEST)) as file:
+        manifest = json.load(file)
+    return (
+        numpy.load(os.path.join(directory, table + ".timestamp.npy"), mmap_mode = 'r'),
+        numpy.load(os.path.join(directory, table + ".npy"), mmap_mode = 'r'),
+        tuple(manifest["tables"][table]["columns"])
+    )
+
+
+##############################################################################
+#
+# MAIN
+#
+##############################################################################
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description = "Export session science data into NumPy .npy files."
+    )
+    parser.add_argument(
+        '-s',
+        '--session',
+        help    = "testing_session.id to export.",
+        dest    = "session_id",
+        required = True,
+        type    = int
+    )
+    parser.add_argument(
+        '-o',
+        '--output',
+        help    = "Output directory.",
+        dest    = "directory",
+        required = True
+    )
+    parser.add_argument(
+        '-t',
+        '--table',
+        help    = "Table to export (repeatable). Default: all",
+        dest    = "tables",
+        action  = "append",
+        choices = TABLES
+    )
+    parser.add_argument(
+        '-d',
+        '--database',
+        help    = "Database file. Default: '/srv/patemon.sqlite3'",
+        dest    = "database",
+        default = "/srv/patemon.sqlite3"
+    )
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(args.database)
+    manifest = export(
+        connection,
+        args.session_id,
+        args.directory,
+        tuple(args.tables or TABLES)
+    )
+    connection.close()
+    for table, info in manifest["tables"].items():
+        print("{:<14} {:>10} rows x {} columns".format(
+                table, info["rows"], len(info["columns"])
+            )
+        )
+
+
+# EOF
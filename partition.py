@@ -0,0 +1,512 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Time-partitioned science data files.
+#
+# partition.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Science data tables (hitcount, pulseheight, housekeeping) can be kept
+#   in partition files next to the main database, one per month
+#   ('/srv/patemon.2026-10.sqlite3') or per session
+#   ('/srv/patemon.session-0012.sqlite3'). Table 'data_partition' in the
+#   main database lists them with the time span of their rows; all other
+#   tables, including hitcount_rollup, stay in the main database.
+#
+#   Router (one per connection):
+#       insert()    Writes rows into their partitions. Call prepare() with
+#                   the same rows first, outside of a transaction (SQLite
+#                   cannot ATTACH within one).
+#       route()     Attaches the partitions that a time range touches and
+#                   (re)creates TEMP views '<table>_all', UNION ALL of the
+#                   main database table and the attached partitions. Query
+#                   the views with the same time range.
+#       query()     Rows of a time range, in timestamp order. A range that
+#                   touches more partitions than can be attached is read in
+#                   consecutive windows (windows()), one route() each.
+#   At most Config.max_attached partitions stay attached; the least
+#   recently used ones are detached.
+#
+#   relation() serves the readers (hitblob.py, phblob.py, npexport.py,
+#   hcseries.py, blockcache.py, rowexport.py, rollup.py, phhist.py): it
+#   names the table itself while no partition holds rows of the requested
+#   range (and session), otherwise a '<table>_all' view routed over those
+#   partitions. Partitions stay attached to the reader's connection. A
+#   read that touches more than Config.max_attached partitions raises
+#   ValueError; narrow it down, or read it with Router.query().
+#
+#   Crash recovery. Router.insert() writes rows into partition files while
+#   the registry spans (and, in ingest.py, the rollups and histograms) are
+#   updated in the main database, all in one transaction. In WAL mode that
+#   transaction is atomic per database file only: a crash during COMMIT can
+#   leave either side committed without the other. Unacknowledged rows are
+#   then resubmitted by their producers, and a resubmission whose rows did
+#   commit into a partition is rejected (primary key). After an unclean
+#   shutdown:
+#       python3 partition.py --recover      registry spans from the files
+#       python3 rollup.py -s N              rollups of recent sessions
+#       python3 phhist.py --rebuild -s N    histograms of recent sessions
+#   A span wider than the rows only costs an unnecessary ATTACH; a span
+#   narrower than the rows hides them from route() until recovered.
+#
+#   retire() detaches a partition and moves its file away. The main
+#   database is not touched beyond one registry row, regardless of how
+#   much data the partition holds.
+#
+#   Partition tables have no FOREIGN KEY constraints (they cannot refer to
+#   another database file).
+#
+import os
+import time
+import shutil
+import sqlite3
+import argparse
+import collections
+
+import schema
+
+
+class Config:
+    scheme          = "month"       # 'month' or 'session'
+    max_attached    = 8             # SQLITE_MAX_ATTACHED is 10 by default
+
+
+SCHEMES     = ("month", "session")
+DATA_TABLES = ("hitcount", "pulseheight", "housekeeping")
+
+
+def key(scheme: str, timestamp: int, session_id: int) -> str:
+    """Partition name of a row."""
+    if scheme == "month":
+        return time.strftime("%Y-%m", time.gmtime(timestamp))
+    if scheme == "session":
+        return "session-{:04}".format(session_id)
+    raise ValueError("Unsupported partition scheme '{}'".format(scheme))
+
+
+def filename(database: str, name: str) -> str:
+    """Partition file of the main 'database' file."""
+    base, ext = os.path.splitext(database)
+    return "{}.{}{}".format(base, name, ext)
+
+
+def alias(name: str) -> str:
+    """Schema name of an attached partition."""
+    return "p_" + "".join(c if c.isalnum() else "_" for c in name)
+
+
+def _database(connection) -> str:
+    return connection.execute("PRAGMA main.database_list").fetchone()[2]
+
+
+def _packed(connection) -> bool:
+    return connection.execute(
+        "SELECT 1 FROM main.sqlite_master WHERE name = 'hitcount_packed'"
+    ).fetchone() is not None
+
+
+def create(connection, name: str) -> str:
+    """Create partition file 'name' (if needed) with the data tables in the
+    main database's layout, and register it. Returns the filename."""
+    path = filename(_database(connection), name)
+    hitcount = "uint32" if _packed(connection) else "table"
+    tables = (
+        [schema.HITCOUNT_PACKED if hitcount != "table" else schema.HITCOUNT] +
+        [schema.PULSEHEIGHT, schema.HOUSEKEEPING]
+    )
+    partition = sqlite3.connect(path)
+    try:
+        existing = {
+            r[0] for r in partition.execute("SELECT name FROM sqlite_master")
+        }
+        journal_mode = connection.execute("PRAGMA main.journal_mode").fetchone()[0]
+        partition.execute("PRAGMA journal_mode = {}".format(journal_mode))
+        for table in tables:
+            if table.name not in existing:
+                partition.execute(table.create_sql(foreign_keys = False))
+        for kind, object_name, sql in schema.objects(hitcount):
+            if object_name in existing:
+                continue
+            if kind == "view" or (
+                kind == "index" and sql.split(" ON ")[1].split()[0] in
+                [t.name for t in tables]
+            ):
+                partition.execute(sql)
+        partition.commit()
+    finally:
+        partition.close()
+    connection.execute(
+        "INSERT OR IGNORE INTO data_partition (name, filename) VALUES (?, ?)",
+        (name, path)
+    )
+    connection.commit()
+    return path
+
+
+def partitions(connection, begin: int = None, end: int = None) -> list:
+    """Registered, not retired partitions with rows in [begin, end[."""
+    return [s[0] for s in spans(connection, begin, end)]
+
+
+def spans(connection, begin: int = None, end: int = None) -> list:
+    """(name, earliest, latest) of partitions(); empty if the database has
+    no partition registry."""
+    if not connection.execute(
+        "SELECT 1 FROM main.sqlite_master WHERE name = 'data_partition'"
+    ).fetchone():
+        return []
+    sql = """
+        SELECT  name, earliest, latest
+        FROM    data_partition
+        WHERE   retired IS NULL AND earliest IS NOT NULL
+        """
+    binds = []
+    if begin is not None:
+        sql += " AND latest >= ?"
+        binds.append(begin)
+    if end is not None:
+        sql += " AND earliest < ?"
+        binds.append(end)
+    return connection.execute(sql + " ORDER BY earliest", binds).fetchall()
+
+
+class Router:
+    """Attaches partitions on demand; see module header."""
+    def __init__(self, connection, scheme: str = None):
+        self.connection = connection
+        self.scheme     = scheme or Config.scheme
+        self.attached   = collections.OrderedDict()     # name: alias, LRU order
+        self.tables     = (
+            ("hitcount_packed", "hitcount") if _packed(connection) else ("hitcount",)
+        ) + DATA_TABLES[1:]
+        if self.scheme not in SCHEMES:
+            raise ValueError("Unsupported partition scheme '{}'".format(self.scheme))
+        self._sync()
+
+    def _sync(self):
+        """Follow partitions attached and detached by other Routers of the
+        connection."""
+        schemas = {r[1] for r in self.connection.execute("PRAGMA database_list")}
+        for name in [n for n in self.attached if self.attached[n] not in schemas]:
+            del self.attached[name]
+        for (name,) in self.connection.execute(
+            "SELECT name FROM data_partition ORDER BY name"
+        ):
+            if alias(name) in schemas and name not in self.attached:
+                self.attached[name] = alias(name)
+
+    def attach(self, names: list):
+        """Attach (and create missing) partitions; detaches least recently
+        used ones beyond Config.max_attached. Not within a transaction."""
+        if len(names) > Config.max_attached:
+            raise ValueError(
+                "{} partitions requested, at most {} can be attached".format(
+                    len(names), Config.max_attached
+                )
+            )
+        self._sync()
+        for name in names:
+            if name in self.attached:
+                self.attached.move_to_end(name)
+                continue
+            while len(self.attached) >= Config.max_attached:
+                evicted = next(n for n in self.attached if n not in names)
+                self.detach(evicted)
+            row = self.connection.execute(
+                "SELECT filename, retired FROM data_partition WHERE name = ?", (name,)
+            ).fetchone()
+            if row and row[1]:
+                raise ValueError("Partition '{}' has been retired".format(name))
+            path = row[0] if row else create(self.connection, name)
+            self.connection.execute(
+                "ATTACH DATABASE ? AS {}".format(alias(name)), (path,)
+            )
+            self.attached[name] = alias(name)
+
+    def detach(self, name: str):
+        self._sync()
+        if self.attached.pop(name, None):
+            # Views referring to the partition would break every query
+            for table in self.tables:
+                self.connection.execute("DROP VIEW IF EXISTS temp.{}_all".format(table))
+            self.connection.execute("DETACH DATABASE {}".format(alias(name)))
+
+    def detach_all(self):
+        for name in list(self.attached):
+            self.detach(name)
+
+    def prepare(self, rows: list):
+        """Attach the partitions of rows [timestamp, session_id, ...]."""
+        self.attach(sorted({key(self.scheme, r[0], r[1]) for r in rows}))
+
+    def insert(self, table: schema.Table, rows: list) -> int:
+        """Insert rows [timestamp, session_id, ...] into their partitions and
+        update the registry time spans. Does not commit."""
+        groups = collections.defaultdict(list)
+        for row in rows:
+            groups[key(self.scheme, row[0], row[1])].append(row)
+        for name, group in groups.items():
+            self.connection.executemany(
+                "INSERT INTO {}.{}".format(
+                    self.attached[name], table.insert[len("INSERT INTO "):]
+                ),
+                group
+            )
+            timestamps = [r[0] for r in group]
+            self.connection.execute(
+                """
+                UPDATE  data_partition
+                SET     earliest = MIN(IFNULL(earliest, :first), :first),
+                        latest = MAX(IFNULL(latest, :last), :last)
+                WHERE   name = :name
+                """,
+                {"name": name, "first": min(timestamps), "last": max(timestamps)}
+            )
+        return len(rows)
+
+    def route(self, begin: int = None, end: int = None, names: list = None) -> list:
+        """Attach the partitions with rows in [begin, end[ (or 'names') and
+        recreate the '<table>_all' TEMP views over them, unless they already
+        are. Returns partition names."""
+        if names is None:
+            names = partitions(self.connection, begin, end)
+        self.attach(names)
+        views = dict(
+            self.connection.execute(
+                "SELECT name, sql FROM temp.sqlite_master WHERE type = 'view'"
+            ).fetchall()
+        )
+        for table in self.tables:
+            select = "SELECT * FROM main.{0}{1}".format(
+                table,
+                "".join(
+                    " UNION ALL SELECT * FROM {}.{}".format(self.attached[n], table)
+                    for n in names
+                )
+            )
+            if views.get(table + "_all", "").endswith(" AS " + select):
+                continue
+            self.connection.execute("DROP VIEW IF EXISTS temp.{}_all".format(table))
+            self.connection.execute(
+                "CREATE TEMP VIEW {}_all AS {}".format(table, select)
+            )
+        return names
+
+    def windows(self, begin: int, end: int) -> list:
+        """Split [begin, end[ into consecutive [begin, end[ ranges that each
+        touch at most Config.max_attached partitions."""
+        spans = self.connection.execute(
+            """
+            SELECT  earliest, latest
+            FROM    data_partition
+            WHERE   retired IS NULL AND latest >= ? AND earliest < ?
+            ORDER BY earliest
+            """,
+            (begin, end)
+        ).fetchall()
+        result = []
+        while True:
+            touched = [s for s in spans if s[1] >= begin]
+            if len(touched) <= Config.max_attached:
+                result.append((begin, end))
+                return result
+            # Partitions are in 'earliest' order; cut before the first one
+            # that does not fit
+            cut = touched[Config.max_attached][0]
+            if cut <= begin:
+                raise ValueError(
+                    "More than {} partitions have rows at {}".format(
+                        Config.max_attached, begin
+                    )
+                )
+            result.append((begin, cut))
+            begin = cut
+
+    def query(self, table: str, begin: int, end: int, columns: str = "*"):
+        """Yield rows of 'table' in [begin, end[, in timestamp order; see
+        windows()."""
+        for first, last in self.windows(begin, end):
+            self.route(first, last)
+            yield from self.connection.execute(
+                "SELECT {} FROM {}_all WHERE timestamp >= ? AND timestamp < ? ORDER BY timestamp".format(
+                    columns, table
+                ),
+                (first, last)
+            )
+
+
+def _holds(connection, name: str, table: str, session_id: int) -> bool:
+    """True if partition 'name' has rows of the session in 'table'."""
+    path = connection.execute(
+        "SELECT filename FROM data_partition WHERE name = ?", (name,)
+    ).fetchone()[0]
+    if not os.path.exists(path):
+        return False
+    partition = sqlite3.connect(path)
+    try:
+        return partition.execute(
+            "SELECT 1 FROM {} WHERE session_id = ? LIMIT 1".format(table),
+            (session_id,)
+        ).fetchone() is not None
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        partition.close()
+
+
+def holding(connection, names: list, table: str, session_id: int) -> list:
+    """Partitions of 'names' that have rows of the session in 'table'. Opens
+    each partition file; readers that ask repeatedly should remember the
+    result (see blockcache.py)."""
+    return [n for n in names if _holds(connection, n, table, session_id)]
+
+
+def relation(
+    connection,
+    table: str,
+    session_id: int = None,
+    begin: int = None,
+    end: int = None
+) -> str:
+    """Name to read the rows of data table 'table' in [begin, end[ from:
+    'table' itself if no partition has any, otherwise the '<table>_all' view
+    of a Router over the partitions that do (only those with rows of
+    'session_id', if given). The partitions stay attached; call outside of
+    a transaction, or after an earlier call for the same rows. Raises
+    ValueError if more than Config.max_attached partitions have rows."""
+    names = partitions(connection, begin, end)
+    if session_id is not None:
+        names = holding(connection, names, table, session_id)
+    if not names:
+        return table
+    Router(connection).route(names = names)
+    return table + "_all"
+
+
+def recover(connection) -> list:
+    """Recompute the registry time spans of active partitions from their
+    files (see module header). Returns names of the partitions whose span
+    changed."""
+    changed = []
+    for name, path, earliest, latest in connection.execute(
+        "SELECT name, filename, earliest, latest FROM data_partition WHERE retired IS NULL"
+    ).fetchall():
+        spans = []
+        if os.path.exists(path):
+            partition = sqlite3.connect(path)
+            try:
+                existing = {
+                    r[0] for r in partition.execute(
+                        "SELECT name FROM sqlite_master WHERE type = 'table'"
+                    )
+                }
+                for table in ("hitcount", "hitcount_packed") + DATA_TABLES[1:]:
+                    if table in existing:
+                        spans.append(
+                            partition.execute(
+                                "SELECT MIN(timestamp), MAX(timestamp) FROM {}".format(table)
+                            ).fetchone()
+                        )
+            finally:
+                partition.close()
+        spans = [s for s in spans if s[0] is not None]
+        span = (
+            (min(s[0] for s in spans), max(s[1] for s in spans)) if spans else (None, None)
+        )
+        if span != (earliest, latest):
+            connection.execute(
+                "UPDATE data_partition SET earliest = ?, latest = ? WHERE name = ?",
+                span + (name,)
+            )
+            changed.append(name)
+    connection.commit()
+    return changed
+
+
+def retire(connection, name: str, directory: str, router: Router = None) -> str:
+    """Detach partition 'name' and move its file into 'directory'. Other
+    processes must not have it attached. Returns the new filename."""
+    if router:
+        router.detach(name)
+    row = connection.execute(
+        "SELECT filename FROM data_partition WHERE name = ? AND retired IS NULL",
+        (name,)
+    ).fetchone()
+    if not row:
+        raise ValueError("No active partition '{}'".format(name))
+    os.makedirs(directory, exist_ok = True)
+    target = os.path.join(directory, os.path.basename(row[0]))
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(row[0] + suffix):
+            shutil.move(row[0] + suffix, target + suffix)
+    connection.execute(
+        "UPDATE data_partition SET retired = CURRENT_TIMESTAMP, filename = ? WHERE name = ?",
+        (target, name)
+    )
+    connection.commit()
+    return target
+
+
+##############################################################################
+#
+# MAIN
+#
+##############################################################################
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description = "List or retire PATE Monitor data partitions."
+    )
+    parser.add_argument(
+        '-d',
+        '--database',
+        help    = "Database file. Default: '/srv/patemon.sqlite3'",
+        dest    = "database",
+        default = "/srv/patemon.sqlite3"
+    )
+    parser.add_argument(
+        '--retire',
+        help    = "Partition to retire (for example '2026-01').",
+        dest    = "retire",
+        metavar = "NAME"
+    )
+    parser.add_argument(
+        '--to',
+        help    = "Directory for retired partition files.",
+        dest    = "directory"
+    )
+    parser.add_argument(
+        '--recover',
+        help    = "Recompute partition time spans after an unclean shutdown.",
+        action  = 'store_true'
+    )
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(args.database)
+    if args.recover:
+        for name in recover(connection):
+            print("'{}' time span corrected".format(name))
+    if args.retire:
+        if not args.directory:
+            parser.error("--retire requires --to DIRECTORY")
+        print("'{}' moved into '{}'".format(
+                args.retire, retire(connection, args.retire, args.directory)
+            )
+        )
+    for name, path, earliest, latest, retired in connection.execute(
+        "SELECT name, filename, earliest, latest, retired FROM data_partition ORDER BY name"
+    ):
+        print("{:<14} {:<20} {:<20} {:<10} {}".format(
+                name,
+                time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(earliest)) if earliest else "-",
+                time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(latest)) if latest else "-",
+                "retired" if retired else "active",
+                path
+            )
+        )
+    connection.close()
+
+
+# EOF
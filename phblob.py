@@ -0,0 +1,418 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Compressed chunk storage for pulseheight events.
+#
+# phblob.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Optional alternative to one 'pulseheight' row per event. Blocks of (at
+#   most CHUNK_EVENTS) events are stored as single BLOBs into table
+#   'pulseheight_chunk', keyed by session and the timestamp of the first
+#   event. Encoding of a block:
+#
+#       1.  Columns (timestamp, ac1, ..., ac2) as int64. Timestamps are
+#           delta encoded (small, near constant increments).
+#       2.  Zigzag mapping (0, -1, 1, -2, ... -> 0, 1, 2, 3, ...), so that
+#           small negative values also have few significant bytes.
+#       3.  Each column is truncated to the bytes its largest value needs,
+#           and stored byte plane by byte plane (all low bytes, then all
+#           second bytes, ...), which groups the similar bytes together.
+#       4.  zlib (FORMAT_ZLIB, fast) or lzma (FORMAT_LZMA, smaller).
+#
+#   BLOB layout: header '<I' event count + one width byte per column,
+#   followed by the compressed planes.
+#
+#   Table 'pulseheight' remains the storage for live, single event inserts.
+#   iter_events() reads both, lazily, one block at a time; compact() moves
+#   row events of a session into chunks. Chunks of a session do not
+#   overlap, and row events may fall within a chunk span but never repeat
+#   the timestamp of a chunk event; write() rejects events that would
+#   break this, so iter_events() returns each event once.
+#
+#   iter_events() and count_events() include the row events in partition
+#   files (see partition.relation()); chunks, write() and compact() are in
+#   the main database only.
+#
+#   Usage:
+#       python3 phblob.py -s SESSION [--compact] [--format zlib|lzma]
+#
+import lzma
+import zlib
+import numpy
+import struct
+import sqlite3
+import argparse
+
+import schema
+import partition
+
+
+FORMAT_ZLIB     = 1
+FORMAT_LZMA     = 2
+FORMATS         = {"zlib": FORMAT_ZLIB, "lzma": FORMAT_LZMA}
+CHUNK_EVENTS    = 4096
+COLUMNS         = schema.PULSEHEIGHT.data
+NCOLUMNS        = len(COLUMNS) + 1              # + timestamp
+HEADER          = struct.Struct("<I{}B".format(NCOLUMNS))
+
+
+##############################################################################
+#
+# Encode / decode
+#
+##############################################################################
+
+def _compress(data: bytes, fmt: int) -> bytes:
+    if fmt == FORMAT_ZLIB:
+        return zlib.compress(data, 6)
+    elif fmt == FORMAT_LZMA:
+        return lzma.compress(data, preset = 6)
+    raise ValueError("Unknown pulseheight BLOB format {}".format(fmt))
+
+
+def _decompress(data: bytes, fmt: int) -> bytes:
+    if fmt == FORMAT_ZLIB:
+        return zlib.decompress(data)
+    elif fmt == FORMAT_LZMA:
+        return lzma.decompress(data)
+    raise ValueError("Unknown pulseheight BLOB format {}".format(fmt))
+
+
+def encode(timestamps, adc, fmt: int = FORMAT_ZLIB) -> bytes:
+    """Encode a block of events (timestamps and (n, 8) ADC values, in
+    timestamp order) into a BLOB."""
+    values = numpy.empty((len(timestamps), NCOLUMNS), dtype = numpy.int64)
+    values[:, 0] = timestamps
+    values[:, 1:] = adc
+    values[1:, 0] = numpy.diff(values[:, 0])
+    zigzag = ((values << 1) ^ (values >> 63)).view(numpy.uint64)
+    widths = []
+    planes = []
+    for column in zigzag.T:
+        width = (int(column.max()).bit_length() + 7) // 8 if len(column) else 0
+        planes.append(
+            numpy.ascontiguousarray(column, dtype = '<u8').view(numpy.uint8)
+            .reshape(-1, 8)[:, :width].T.tobytes()
+        )
+        widths.append(width)
+    return HEADER.pack(len(values), *widths) + _compress(b"".join(planes), fmt)
+
+
+def decode(blob: bytes, fmt: int = FORMAT_ZLIB) -> tuple:
+    """Returns (timestamps, adc) of a block; int64 vector and (n, 8) int32
+    array."""
+    count, *widths = HEADER.unpack_from(blob)
+    data = numpy.frombuffer(_decompress(blob[HEADER.size:], fmt), dtype = numpy.uint8)
+    zigzag = numpy.zeros((count, 8), dtype = numpy.uint8)
+    values = numpy.empty((count, NCOLUMNS), dtype = numpy.int64)
+    offset = 0
+    for i, width in enumerate(widths):
+        zigzag[:, width:] = 0
+        zigzag[:, :width] = data[offset:offset + width * count].reshape(width, count).T
+        offset += width * count
+        column = zigzag.view('<u8')[:, 0].astype(numpy.int64)
+        values[:, i] = (column >> 1) ^ -(column & 1)
+    return numpy.cumsum(values[:, 0]), values[:, 1:].astype(numpy.int32)
+
+
+##############################################################################
+#
+# Database
+#
+##############################################################################
+
+def storage(connection) -> bool:
+    """True if the database has table 'pulseheight_chunk'."""
+    return connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = ?",
+        (schema.PULSEHEIGHT_CHUNK.name,)
+    ).fetchone() is not None
+
+
+def block_rows(
+    session_id: int,
+    timestamps,
+    adc,
+    fmt: int = FORMAT_ZLIB,
+    chunk_events: int = CHUNK_EVENTS
+):
+    """Yield schema.PULSEHEIGHT_CHUNK.insert parameter tuples for events in
+    timestamp order."""
+    timestamps = numpy.asarray(timestamps, dtype = numpy.int64)
+    for first in range(0, len(timestamps), chunk_events):
+        ts = timestamps[first:first + chunk_events]
+        yield (
+            session_id,
+            int(ts[0]),
+            int(ts[-1]),
+            len(ts),
+            fmt,
+            encode(ts, adc[first:first + chunk_events], fmt)
+        )
+
+
+def write(
+    connection,
+    session_id: int,
+    timestamps,
+    adc,
+    fmt: int = FORMAT_ZLIB,
+    chunk_events: int = CHUNK_EVENTS
+) -> int:
+    """Insert events as chunks. Does not commit. Returns number of events.
+    Raises ValueError, before anything is written, if a timestamp repeats,
+    or a chunk would overlap a chunk of the session or contain the
+    timestamp of one of its row events."""
+    timestamps = numpy.asarray(timestamps, dtype = numpy.int64)
+    adc = numpy.asarray(adc)
+    if len(timestamps) > 1 and (numpy.diff(timestamps) < 0).any():
+        order = numpy.argsort(timestamps, kind = 'stable')
+        timestamps, adc = timestamps[order], adc[order]
+    if len(timestamps) > 1 and (numpy.diff(timestamps) == 0).any():
+        raise ValueError("Events repeat a timestamp")
+    for start in range(0, len(timestamps), chunk_events):
+        block = timestamps[start:start + chunk_events]
+        first, latest = int(block[0]), int(block[-1])
+        # Chunks do not overlap; only the last one starting before 'latest' can
+        row = connection.execute(
+            """
+            SELECT  timestamp, latest
+            FROM    pulseheight_chunk
+            WHERE   session_id = ? AND timestamp <= ?
+            ORDER BY timestamp DESC
+            LIMIT   1
+            """,
+            (session_id, latest)
+        ).fetchone()
+        if row and row[1] >= first:
+            raise ValueError(
+                "Events {} - {} overlap chunk {} - {} of session {}".format(
+                    first, latest, row[0], row[1], session_id
+                )
+            )
+        existing = connection.execute(
+            """
+            SELECT  timestamp
+            FROM    pulseheight
+            WHERE   session_id = ? AND timestamp >= ? AND timestamp <= ?
+            """,
+            (session_id, first, latest)
+        ).fetchall()
+        if existing and numpy.isin(block, [r[0] for r in existing]).any():
+            raise ValueError(
+                "Events {} - {} repeat row events of session {}".format(
+                    first, latest, session_id
+                )
+            )
+    connection.executemany(
+        schema.PULSEHEIGHT_CHUNK.insert,
+        block_rows(session_id, timestamps, adc, fmt, chunk_events)
+    )
+    return len(timestamps)
+
+
+def _rows(
+    connection,
+    session_id: int,
+    begin,
+    end,
+    chunk_rows: int,
+    table: str = "pulseheight"
+):
+    """Yield (timestamps, adc) from 'table' (pulseheight rows) in [begin, end]."""
+    sql = "SELECT timestamp, {} FROM {} WHERE session_id = ?".format(
+        ", ".join(COLUMNS), table
+    )
+    binds = [session_id]
+    if begin is not None:
+        sql += " AND timestamp >= ?"
+        binds.append(begin)
+    if end is not None:
+        sql += " AND timestamp <= ?"
+        binds.append(end)
+    cursor = connection.execute(sql + " ORDER BY timestamp", binds)
+    while True:
+        rows = cursor.fetchmany(chunk_rows)
+        if not rows:
+            return
+        data = numpy.array(rows, dtype = numpy.int64)
+        yield data[:, 0], data[:, 1:].astype(numpy.int32)
+
+
+def iter_events(
+    connection,
+    session_id: int,
+    begin: int = None,
+    end: int = None,
+    chunk_rows: int = CHUNK_EVENTS
+):
+    """Yield (timestamps, adc) blocks of session events in [begin, end[, in
+    timestamp order, from both chunk and row storage. Chunks are decoded
+    one at a time, as the generator advances."""
+    last = None if end is None else end - 1
+    table = partition.relation(connection, "pulseheight", session_id, begin, end)
+    if not storage(connection):
+        yield from _rows(connection, session_id, begin, last, chunk_rows, table)
+        return
+    sql = "SELECT timestamp, latest, format, data FROM pulseheight_chunk WHERE session_id = ?"
+    binds = [session_id]
+    if begin is not None:
+        sql += " AND latest >= ?"
+        binds.append(begin)
+    if end is not None:
+        sql += " AND timestamp < ?"
+        binds.append(end)
+    position = begin
+    for first, latest, fmt, blob in connection.execute(sql + " ORDER BY timestamp", binds):
+        # Row events before this chunk
+        yield from _rows(connection, session_id, position, first - 1, chunk_rows, table)
+        timestamps, adc = decode(blob, fmt)
+        extra = list(_rows(connection, session_id, first, latest, chunk_rows, table))
+        if extra:
+            timestamps = numpy.concatenate([timestamps] + [e[0] for e in extra])
+            adc = numpy.concatenate([adc] + [e[1] for e in extra])
+            order = numpy.argsort(timestamps, kind = 'stable')
+            timestamps, adc = timestamps[order], adc[order]
+        if begin is not None or end is not None:
+            mask = numpy.ones(len(timestamps), dtype = bool)
+            if begin is not None:
+                mask &= timestamps >= begin
+            if end is not None:
+                mask &= timestamps < end
+            timestamps, adc = timestamps[mask], adc[mask]
+        if len(timestamps):
+            yield timestamps, adc
+        position = latest + 1
+    yield from _rows(connection, session_id, position, last, chunk_rows, table)
+
+
+def count_events(connection, session_id: int) -> int:
+    """Number of session events in both storages."""
+    count = connection.execute(
+        "SELECT COUNT(*) FROM {} WHERE session_id = ?".format(
+            partition.relation(connection, "pulseheight", session_id)
+        ),
+        (session_id,)
+    ).fetchone()[0]
+    if storage(connection):
+        count += connection.execute(
+            "SELECT IFNULL(SUM(events), 0) FROM pulseheight_chunk WHERE session_id = ?",
+            (session_id,)
+        ).fetchone()[0]
+    return count
+
+
+def compact(
+    connection,
+    session_id: int,
+    fmt: int = FORMAT_ZLIB,
+    chunk_events: int = CHUNK_EVENTS
+) -> int:
+    """Move row events of a session into chunks, one transaction per chunk.
+    Chunks that the row events fall into are rewritten together with them,
+    so that chunks do not overlap. Can be interrupted and rerun. Returns
+    number of events moved."""
+    moved = 0
+    while True:
+        block = next(_rows(connection, session_id, None, None, chunk_events), None)
+        if block is None:
+            return moved
+        timestamps, adc = block
+        span = (session_id, int(timestamps[0]), int(timestamps[-1]))
+        connection.execute(
+            "DELETE FROM pulseheight WHERE session_id = ? AND timestamp >= ? AND timestamp <= ?",
+            span
+        )
+        merged = [(timestamps, adc)]
+        for first, chunk_format, blob in connection.execute(
+            """
+            SELECT  timestamp, format, data
+            FROM    pulseheight_chunk
+            WHERE   session_id = ? AND latest >= ? AND timestamp <= ?
+            """,
+            (session_id, span[1], span[2])
+        ).fetchall():
+            merged.append(decode(blob, chunk_format))
+            connection.execute(
+                "DELETE FROM pulseheight_chunk WHERE session_id = ? AND timestamp = ?",
+                (session_id, first)
+            )
+        write(
+            connection,
+            session_id,
+            numpy.concatenate([m[0] for m in merged]),
+            numpy.concatenate([m[1] for m in merged]),
+            fmt,
+            chunk_events
+        )
+        connection.commit()
+        moved += len(timestamps)
+
+
+##############################################################################
+#
+# MAIN
+#
+##############################################################################
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description = "Compact or inspect PATE Monitor pulseheight chunk storage."
+    )
+    parser.add_argument(
+        '-s',
+        '--session',
+        help    = "testing_session.id to process.",
+        dest    = "session_id",
+        required = True,
+        type    = int
+    )
+    parser.add_argument(
+        '-d',
+        '--database',
+        help    = "Database file. Default: '/srv/patemon.sqlite3'",
+        dest    = "database",
+        default = "/srv/patemon.sqlite3"
+    )
+    parser.add_argument(
+        '--compact',
+        help    = "Move row events of the session into compressed chunks.",
+        action  = 'store_true'
+    )
+    parser.add_argument(
+        '--format',
+        help    = "Chunk compression (zlib|lzma). Default: 'zlib'",
+        dest    = "format",
+        choices = list(FORMATS),
+        default = "zlib"
+    )
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(args.database)
+    if args.compact:
+        print("{} events moved into chunks".format(
+                compact(connection, args.session_id, FORMATS[args.format])
+            )
+        )
+    chunks, events, size = connection.execute(
+        """
+        SELECT  COUNT(*), IFNULL(SUM(events), 0), IFNULL(SUM(LENGTH(data)), 0)
+        FROM    pulseheight_chunk
+        WHERE   session_id = ?
+        """,
+        (args.session_id,)
+    ).fetchone()
+    print("{} events in rows, {} events in {} chunks ({} bytes)".format(
+            count_events(connection, args.session_id) - events,
+            events,
+            chunks,
+            size
+        )
+    )
+    connection.close()
+
+
+# EOF
@@ -0,0 +1,221 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Incremental pulseheight histograms.
+#
+# phhist.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Table 'pulseheight_histogram' (see schema.py) holds, per session and
+#   detector (ac1, d1a, ..., ac2), the event counts of ADC value bins. Only
+#   non-empty bins are stored; a bin is identified by its width and lower
+#   edge (value // width * width).
+#
+#   Bin layout is a bin width per detector; Config.layout unless a writer
+#   is given one. csvimport.py, csvbulk.py, ingest.py and this script take
+#   it as option '--bins' (see parse_layout()). Histograms can be queried
+#   in any multiple of the stored width (bins are summed), so the stored
+#   width should be the finest one needed. After a change of layout, a
+#   session may hold events at more than one width; they are combined in
+#   any common multiple of the stored widths, until rebuild().
+#
+#   Writers call update() with the events they have just inserted (in the
+#   same transaction); csvimport.py and ingest.py do. rebuild() recreates
+#   the histograms of a session from its events (both storages, see
+#   phblob.py), for example after a change of layout.
+#
+#   Usage:
+#       python3 phhist.py -s SESSION [--rebuild [--bins 4,ac1=16]]
+#                         [--detector d1a] [--width 32]
+#
+import numpy
+import sqlite3
+import argparse
+
+import schema
+import phblob
+import partition
+
+
+DETECTORS       = schema.PULSEHEIGHT.data
+
+
+class Config:
+    layout          = {detector: 8 for detector in DETECTORS}   # bin widths
+
+
+def parse_layout(text: str) -> dict:
+    """Layout from a comma separated list of widths; 'detector=width' for
+    one detector, a bare width for the rest. Example: '4,ac1=16,ac2=16'."""
+    layout = dict(Config.layout)
+    widths = {}
+    for item in text.split(","):
+        detector, _, width = item.strip().rpartition("=")
+        if detector and detector not in DETECTORS:
+            raise ValueError("Unknown detector '{}'".format(detector))
+        try:
+            width = int(width)
+        except ValueError:
+            width = 0
+        if width < 1:
+            raise ValueError("Invalid bin width in '{}'".format(item))
+        widths[detector] = width
+    if "" in widths:
+        layout = dict.fromkeys(DETECTORS, widths.pop(""))
+    layout.update(widths)
+    return layout
+
+
+def aggregate(values: numpy.ndarray, width: int) -> tuple:
+    """Returns (bins, counts) of values; lower bin edges and event counts."""
+    bins, counts = numpy.unique(
+        numpy.floor_divide(values, width) * width, return_counts = True
+    )
+    return bins, counts
+
+
+def update(connection, session_id: int, adc: numpy.ndarray, layout: dict = None):
+    """Add events ((n, 8) ADC values in DETECTORS order) into the session
+    histograms. Does not commit."""
+    adc = numpy.asarray(adc)
+    if not len(adc):
+        return
+    layout = layout or Config.layout
+    rows = []
+    for i, detector in enumerate(DETECTORS):
+        width = layout[detector]
+        bins, counts = aggregate(adc[:, i], width)
+        rows.extend(
+            (session_id, detector, width, int(b), int(c))
+            for b, c in zip(bins, counts)
+        )
+    connection.executemany(
+        """
+        INSERT INTO pulseheight_histogram (session_id, detector, width, bin, count)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (session_id, detector, width, bin)
+        DO UPDATE SET count = count + excluded.count
+        """,
+        rows
+    )
+
+
+def rebuild(connection, session_id: int, layout: dict = None) -> int:
+    """Recreate histograms of a session from its events. Returns events."""
+    # Partitions cannot be attached once the DELETE has begun a transaction
+    partition.relation(connection, "pulseheight", session_id)
+    connection.execute(
+        "DELETE FROM pulseheight_histogram WHERE session_id = ?",
+        (session_id,)
+    )
+    count = 0
+    for timestamps, adc in phblob.iter_events(connection, session_id):
+        update(connection, session_id, adc, layout)
+        count += len(timestamps)
+    connection.commit()
+    return count
+
+
+def query(connection, session_id: int, detector: str, width: int = None) -> tuple:
+    """Returns (bins, counts) of a session detector histogram; lower bin
+    edges and event counts as int64 vectors. 'width' must be a multiple of
+    every stored width (default: their least common multiple, which is the
+    finest stored width unless the session has several)."""
+    if detector not in DETECTORS:
+        raise ValueError("Unknown detector '{}'".format(detector))
+    stored = [
+        r[0] for r in connection.execute(
+            """
+            SELECT DISTINCT width FROM pulseheight_histogram
+            WHERE session_id = ? AND detector = ?
+            ORDER BY width
+            """,
+            (session_id, detector)
+        )
+    ]
+    if not stored:
+        return numpy.empty(0, dtype = numpy.int64), numpy.empty(0, dtype = numpy.int64)
+    width = width or int(numpy.lcm.reduce(stored))
+    if any(width % w for w in stored):
+        # Events stored in other widths would be left out
+        raise ValueError(
+            "Width {} is not a multiple of stored widths {}".format(width, stored)
+        )
+    rows = connection.execute(
+        """
+        SELECT  bin, count
+        FROM    pulseheight_histogram
+        WHERE   session_id = ? AND detector = ?
+        """,
+        (session_id, detector)
+    ).fetchall()
+    data = numpy.array(rows, dtype = numpy.int64).reshape(-1, 2)
+    bins = numpy.floor_divide(data[:, 0], width) * width
+    edges, index = numpy.unique(bins, return_inverse = True)
+    return edges, numpy.bincount(index, weights = data[:, 1]).astype(numpy.int64)
+
+
+##############################################################################
+#
+# MAIN
+#
+##############################################################################
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description = "Rebuild or print PATE Monitor pulseheight histograms."
+    )
+    parser.add_argument(
+        '-s',
+        '--session',
+        help    = "testing_session.id to process.",
+        dest    = "session_id",
+        required = True,
+        type    = int
+    )
+    parser.add_argument(
+        '-d',
+        '--database',
+        help    = "Database file. Default: '/srv/patemon.sqlite3'",
+        dest    = "database",
+        default = "/srv/patemon.sqlite3"
+    )
+    parser.add_argument(
+        '--rebuild',
+        help    = "Recreate the session histograms from its events.",
+        action  = 'store_true'
+    )
+    parser.add_argument(
+        '--detector',
+        help    = "Detector to print. Default: all",
+        choices = DETECTORS
+    )
+    parser.add_argument(
+        '--width',
+        help    = "Bin width to print (multiple of the stored widths).",
+        type    = int
+    )
+    parser.add_argument(
+        '--bins',
+        help    = "Bin widths for --rebuild, e.g. '4,ac1=16'. Default: {}".format(
+            Config.layout[DETECTORS[0]]
+        ),
+        dest    = "layout",
+        type    = parse_layout
+    )
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(args.database)
+    if args.rebuild:
+        print("{} events".format(rebuild(connection, args.session_id, args.layout)))
+    for detector in ([args.detector] if args.detector else DETECTORS):
+        bins, counts = query(connection, args.session_id, detector, args.width)
+        print("{}: {} bins, {} events".format(detector, len(bins), counts.sum()))
+        for b, c in zip(bins, counts):
+            print("    {:>8} {:>10}".format(b, c))
+    connection.close()
+
+
+# EOF
@@ -0,0 +1,141 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Database PRAGMA profiles.
+#
+# profiles.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Each instance mode (DEV/UAT/PRD) has a named tuning profile. Values can
+#   be overridden in '/boot/install.config', section [Database], using the
+#   PRAGMA names as keys (for example 'cache_size = -32768').
+#
+#   Creation-time settings (page_size, auto_vacuum and journal_mode) are
+#   persistent in the database file and have to be set before the first
+#   table is created. Runtime settings are per-connection; setup.py records
+#   them into table 'connection_pragma' and every process applies them
+#   after connecting:
+#
+#       import profiles
+#       connection = sqlite3.connect("/srv/patemon.sqlite3")
+#       profiles.apply(connection)
+#
+#   hitcount rows are wide (~3.8 kB as a flat row), which is why the
+#   profiles use 16 kB pages instead of SQLite's default 4 kB; rows then
+#   no longer spill into overflow pages.
+#
+#   UAT and PRD instances run walmaint.py, which does the WAL checkpoints
+#   and incremental vacuuming. Their connections checkpoint only as a
+#   backstop, once the WAL has grown to walmaint.Config.backstop pages
+#   (~160 MB), far beyond what walmaint lets it reach; if walmaint is not
+#   running, the WAL still stays bounded. DEV instances need not run it
+#   and checkpoint at SQLite's default 1000 pages.
+#
+CREATION    = ("page_size", "auto_vacuum", "journal_mode")
+RUNTIME     = (
+    "synchronous",
+    "cache_size",
+    "mmap_size",
+    "wal_autocheckpoint",
+    "temp_store",
+    "foreign_keys"
+)
+
+PROFILES = {
+    # Development; throw-away data, fast dev content generation
+    "DEV": {
+        "page_size":            16384,
+        "auto_vacuum":          "NONE",
+        "journal_mode":         "WAL",
+        "synchronous":          "OFF",
+        "cache_size":           -65536,         # KiB
+        "mmap_size":            268435456,
+        "wal_autocheckpoint":   1000,
+        "temp_store":           "MEMORY",
+        "foreign_keys":         1
+    },
+    # User acceptance testing; as production
+    "UAT": {
+        "page_size":            16384,
+        "auto_vacuum":          "INCREMENTAL",
+        "journal_mode":         "WAL",
+        "synchronous":          "NORMAL",
+        "cache_size":           -16384,
+        "mmap_size":            134217728,
+        "wal_autocheckpoint":   10000,          # backstop; walmaint.py
+        "temp_store":           "MEMORY",
+        "foreign_keys":         1
+    },
+    # Production; WAL + NORMAL cannot corrupt, may lose last commits on power loss
+    "PRD": {
+        "page_size":            16384,
+        "auto_vacuum":          "INCREMENTAL",
+        "journal_mode":         "WAL",
+        "synchronous":          "NORMAL",
+        "cache_size":           -16384,
+        "mmap_size":            134217728,
+        "wal_autocheckpoint":   10000,          # backstop; walmaint.py
+        "temp_store":           "MEMORY",
+        "foreign_keys":         1
+    }
+}
+
+
+def _value(name: str, value) -> str:
+    """Validate PRAGMA name and value (they cannot be bound parameters)."""
+    if name not in CREATION + RUNTIME:
+        raise ValueError("Unsupported PRAGMA '{}'".format(name))
+    value = str(value).strip()
+    if not (value.lstrip("-").isdigit() or value.isalpha()):
+        raise ValueError("Invalid value '{}' for PRAGMA '{}'".format(value, name))
+    return value
+
+
+def profile(mode: str, overrides: dict = None) -> dict:
+    """Returns settings of a mode profile, with overrides applied."""
+    settings = dict(PROFILES[mode])
+    for name, value in (overrides or {}).items():
+        settings[name] = _value(name, value)
+    return settings
+
+
+def create(connection, settings: dict):
+    """Apply creation-time and runtime settings into a new, empty database."""
+    if connection.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0]:
+        raise ValueError("Creation-time settings require an empty database")
+    for name in CREATION + RUNTIME:
+        if name in settings:
+            connection.execute(
+                "PRAGMA {} = {}".format(name, _value(name, settings[name]))
+            )
+
+
+def record(connection, settings: dict):
+    """Store runtime settings into 'connection_pragma'."""
+    connection.executemany(
+        "INSERT OR REPLACE INTO connection_pragma (name, value) VALUES (?, ?)",
+        [
+            (name, _value(name, settings[name]))
+            for name in RUNTIME if name in settings
+        ]
+    )
+    connection.commit()
+
+
+def apply(connection) -> dict:
+    """Apply recorded runtime settings into a connection. Returns them.
+    Databases created before profiles existed have no settings to apply."""
+    if not connection.execute(
+        "SELECT name FROM sqlite_master WHERE name = 'connection_pragma'"
+    ).fetchone():
+        return {}
+    settings = dict(
+        connection.execute("SELECT name, value FROM connection_pragma").fetchall()
+    )
+    for name, value in settings.items():
+        connection.execute("PRAGMA {} = {}".format(name, _value(name, value)))
+    return settings
+
+
+# EOF
@@ -0,0 +1,184 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# PSU status publishing.
+#
+# psustatus.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Table 'psu' has a single row, which 'psud' updates about twice a
+#   second. publish() writes the row in one statement, including the
+#   'modified' column, and does not depend on trigger 'psu_ari': the
+#   trigger is kept (guarded, see schema.py) only for writers that do not
+#   set 'modified' themselves, and it does nothing for publish()'s writes.
+#   If the values did not change, and the row was written less than
+#   HEARTBEAT seconds ago, it only reads the row; no write lock is taken
+#   and nothing is committed.
+#   While 'psud' runs, 'modified' is therefore at most HEARTBEAT seconds
+#   (plus one reading) old, and still tells readers that 'psud' is alive.
+#
+#   Each reading is also published into a small memory-mapped status file
+#   (on tmpfs, by default), which readers (web UI) can map and poll without
+#   touching the database. The file is guarded by a sequence counter
+#   (seqlock); the writer makes the counter odd while it updates the file
+#   and readers retry, after a short and growing sleep, if they see an odd
+#   or changed counter.
+#
+#   Mirror file layout (little-endian, 48 bytes):
+#       uint32  sequence
+#       uint32  power           (1 = 'ON', 0 = 'OFF')
+#       double  published       (time.time() of the reading)
+#       double  voltage_setting
+#       double  current_limit
+#       double  measured_current
+#       double  measured_voltage
+#
+import os
+import mmap
+import time
+import struct
+import collections
+
+
+MIRROR_FILE     = "/dev/shm/patemon.psu"
+MIRROR_MODE     = 0o644
+HEARTBEAT       = 10            # seconds; rewrite unchanged row this often
+RETRY_SLEEP     = (50e-6, 5e-3) # seconds; first and longest reader retry sleep
+_HEADER         = struct.Struct("<I")
+_PAYLOAD        = struct.Struct("<I5d")
+MIRROR_SIZE     = _HEADER.size + _PAYLOAD.size
+
+PSUStatus = collections.namedtuple(
+    "PSUStatus",
+    [
+        "power",
+        "voltage_setting",
+        "current_limit",
+        "measured_current",
+        "measured_voltage",
+        "published"
+    ]
+)
+
+
+def publish(
+    connection,
+    power: str,
+    voltage_setting: float,
+    current_limit: float,
+    measured_current: float,
+    measured_voltage: float,
+    mirror = None
+) -> bool:
+    """Write PSU status into table 'psu' (and 'mirror', if given).
+    Returns True if the database row was written, False if unchanged and
+    written less than HEARTBEAT seconds ago."""
+    values = (power, voltage_setting, current_limit, measured_current, measured_voltage)
+    if mirror:
+        mirror.write(*values)
+    row = connection.execute(
+        """
+        SELECT  (power, voltage_setting, current_limit, measured_current, measured_voltage)
+                IS (?, ?, ?, ?, ?)
+        AND     modified > datetime('now', ?)
+        FROM    psu
+        WHERE   id = 0
+        """,
+        values + ("-{} seconds".format(HEARTBEAT),)
+    ).fetchone()
+    if row and row[0]:
+        return False
+    connection.execute(
+        """
+        INSERT INTO psu
+        (
+            id,
+            power,
+            voltage_setting,
+            current_limit,
+            measured_current,
+            measured_voltage,
+            modified
+        )
+        VALUES (0, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT (id) DO UPDATE
+        SET     power               = excluded.power,
+                voltage_setting     = excluded.voltage_setting,
+                current_limit       = excluded.current_limit,
+                measured_current    = excluded.measured_current,
+                measured_voltage    = excluded.measured_voltage,
+                modified            = excluded.modified
+        """,
+        values
+    )
+    connection.commit()
+    return True
+
+
+class StatusMirror:
+    """Writer side of the memory-mapped PSU status file."""
+    def __init__(self, filename: str = MIRROR_FILE, mode: int = MIRROR_MODE):
+        fd = os.open(filename, os.O_RDWR | os.O_CREAT, mode)
+        try:
+            os.ftruncate(fd, MIRROR_SIZE)
+            self.map = mmap.mmap(fd, MIRROR_SIZE)
+        finally:
+            os.close(fd)
+        self.sequence = _HEADER.unpack_from(self.map)[0] & ~1
+
+    def write(
+        self,
+        power: str,
+        voltage_setting: float,
+        current_limit: float,
+        measured_current: float,
+        measured_voltage: float
+    ):
+        self.sequence += 1
+        _HEADER.pack_into(self.map, 0, self.sequence)
+        _PAYLOAD.pack_into(
+            self.map,
+            _HEADER.size,
+            power == 'ON',
+            time.time(),
+            voltage_setting,
+            current_limit,
+            measured_current,
+            measured_voltage
+        )
+        self.sequence += 1
+        _HEADER.pack_into(self.map, 0, self.sequence)
+
+    def close(self):
+        self.map.close()
+
+
+class StatusReader:
+    """Reader side of the memory-mapped PSU status file."""
+    def __init__(self, filename: str = MIRROR_FILE):
+        with open(filename, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), MIRROR_SIZE, access = mmap.ACCESS_READ)
+
+    def read(self, retries: int = 100) -> PSUStatus:
+        """Returns latest PSUStatus, or None if nothing has been published."""
+        delay = RETRY_SLEEP[0]
+        for _ in range(retries):
+            before = _HEADER.unpack_from(self.map)[0]
+            if not before & 1:
+                payload = _PAYLOAD.unpack_from(self.map, _HEADER.size)
+                if _HEADER.unpack_from(self.map)[0] == before:
+                    if before == 0:
+                        return None
+                    power, published, *values = payload
+                    return PSUStatus('ON' if power else 'OFF', *values, published)
+            # Writer is updating the file; let it finish
+            time.sleep(delay)
+            delay = min(delay * 2, RETRY_SLEEP[1])
+        raise TimeoutError("PSU status file is being updated continuously")
+
+    def close(self):
+        self.map.close()
+
+
+# EOF
@@ -0,0 +1,239 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Hitcount rollups (per minute / hour / day).
+#
+# rollup.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Table 'hitcount_rollup' (see schema.py) holds, per session and time resolution, one row
+#   per time bucket with the number of rotations and the per-counter sums,
+#   minimums and maximums. Three values for each of the ~760 counters would
+#   exceed SQLite's column limit, so they are stored as little-endian NumPy
+#   arrays in BLOBs (sums int64, mins and maxs uint32, in hitcount column
+#   order; see hitblob.COLUMNS).
+#
+#   Writers call update() with the rotations they have just inserted (in
+#   the same transaction). rebuild() recreates the rollups of a session
+#   from the stored rotations. query() selects the coarsest resolution that
+#   still provides at least one bucket per pixel for the requested span.
+#
+import numpy
+import sqlite3
+import argparse
+import collections
+
+import hitblob
+import partition
+
+
+RESOLUTIONS     = (60, 3600, 86400)     # seconds; minute, hour, day
+SUM             = numpy.dtype('<i8')
+MINMAX          = numpy.dtype('<u4')
+
+Rollup = collections.namedtuple(
+    "Rollup",
+    ["resolution", "timestamps", "rotations", "sums", "mins", "maxs"]
+)
+
+
+def aggregate(timestamps: numpy.ndarray, counters: numpy.ndarray, resolution: int) -> tuple:
+    """Returns (buckets, rotations, sums, mins, maxs) of rotations grouped
+    into 'resolution' second buckets."""
+    buckets = timestamps // resolution * resolution
+    order = numpy.argsort(buckets, kind = 'stable')
+    buckets, counters = buckets[order], counters[order]
+    starts = numpy.flatnonzero(numpy.r_[True, buckets[1:] != buckets[:-1]])
+    return (
+        buckets[starts],
+        numpy.diff(numpy.r_[starts, len(buckets)]),
+        numpy.add.reduceat(counters.astype(SUM), starts, axis = 0),
+        numpy.minimum.reduceat(counters, starts, axis = 0).astype(MINMAX),
+        numpy.maximum.reduceat(counters, starts, axis = 0).astype(MINMAX)
+    )
+
+
+def update(connection, session_id: int, timestamps: numpy.ndarray, counters: numpy.ndarray):
+    """Merge new rotations into the rollups of all resolutions. Does not commit."""
+    if not len(timestamps):
+        return
+    timestamps = numpy.asarray(timestamps, dtype = numpy.int64)
+    counters = numpy.asarray(counters)
+    for resolution in RESOLUTIONS:
+        merge(
+            connection,
+            session_id,
+            resolution,
+            *aggregate(timestamps, counters, resolution)
+        )
+
+
+def merge(
+    connection,
+    session_id: int,
+    resolution: int,
+    buckets: numpy.ndarray,
+    rotations: numpy.ndarray,
+    sums: numpy.ndarray,
+    mins: numpy.ndarray,
+    maxs: numpy.ndarray
+):
+    """Merge aggregated buckets (see aggregate(); sorted, arrays are modified)
+    into the stored rollups of a resolution. Does not commit."""
+    if not len(buckets):
+        return
+    index = {int(b): i for i, b in enumerate(buckets)}
+    existing = connection.execute(
+        """
+        SELECT  bucket, rotations, sums, mins, maxs
+        FROM    hitcount_rollup
+        WHERE   session_id = ?
+                AND resolution = ?
+                AND bucket BETWEEN ? AND ?
+        """,
+        (session_id, resolution, int(buckets[0]), int(buckets[-1]))
+    ).fetchall()
+    for bucket, count, s, lo, hi in existing:
+        i = index.get(bucket)
+        if i is None:
+            continue
+        rotations[i] += count
+        sums[i] += numpy.frombuffer(s, dtype = SUM)
+        numpy.minimum(mins[i], numpy.frombuffer(lo, dtype = MINMAX), out = mins[i])
+        numpy.maximum(maxs[i], numpy.frombuffer(hi, dtype = MINMAX), out = maxs[i])
+    connection.executemany(
+        """
+        INSERT OR REPLACE INTO hitcount_rollup
+        (session_id, resolution, bucket, rotations, sums, mins, maxs)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (
+                session_id,
+                resolution,
+                int(buckets[i]),
+                int(rotations[i]),
+                sums[i].tobytes(),
+                mins[i].tobytes(),
+                maxs[i].tobytes()
+            )
+            for i in range(len(buckets))
+        ]
+    )
+
+
+def rebuild(connection, session_id: int, chunk_rows: int = 5760) -> int:
+    """Recreate rollups of a session from its rotations. Returns rotations."""
+    # Partitions cannot be attached once the DELETE has begun a transaction
+    partition.relation(
+        connection,
+        "hitcount_packed" if hitblob.storage(connection) == "packed" else "hitcount",
+        session_id
+    )
+    connection.execute(
+        "DELETE FROM hitcount_rollup WHERE session_id = ?",
+        (session_id,)
+    )
+    count = 0
+    for timestamps, counters in hitblob.iter_rotations(
+        connection, session_id, chunk_rows = chunk_rows
+    ):
+        update(connection, session_id, timestamps, counters)
+        count += len(timestamps)
+    connection.commit()
+    return count
+
+
+def choose_resolution(begin: int, end: int, pixels: int) -> int:
+    """Coarsest resolution giving at least 'pixels' buckets over [begin, end[.
+    Returns None if even the finest rollup is too coarse (use rotations)."""
+    for resolution in reversed(RESOLUTIONS):
+        if (end - begin) / resolution >= pixels:
+            return resolution
+    return None
+
+
+def query(connection, session_id: int, begin: int, end: int, pixels: int) -> Rollup:
+    """Return session data over [begin, end[ at a resolution suitable for
+    plotting it 'pixels' wide. Arrays are (n, NCOUNTERS), in hitcount column
+    order. Resolution None means raw rotations (rotations == 1)."""
+    resolution = choose_resolution(begin, end, pixels)
+    if resolution is None:
+        chunks = list(hitblob.iter_rotations(connection, session_id, begin, end))
+        if chunks:
+            timestamps = numpy.concatenate([c[0] for c in chunks])
+            counters = numpy.concatenate([c[1] for c in chunks])
+        else:
+            timestamps = numpy.empty(0, dtype = numpy.int64)
+            counters = numpy.empty((0, hitblob.NCOUNTERS), dtype = MINMAX)
+        return Rollup(
+            None,
+            timestamps,
+            numpy.ones(len(timestamps), dtype = numpy.int64),
+            counters.astype(SUM),
+            counters,
+            counters
+        )
+    rows = connection.execute(
+        """
+        SELECT  bucket, rotations, sums, mins, maxs
+        FROM    hitcount_rollup
+        WHERE   session_id = ?
+                AND resolution = ?
+                AND bucket >= ?
+                AND bucket < ?
+        ORDER BY bucket
+        """,
+        (session_id, resolution, begin // resolution * resolution, end)
+    ).fetchall()
+    n = len(rows)
+    return Rollup(
+        resolution,
+        numpy.fromiter((r[0] for r in rows), dtype = numpy.int64, count = n),
+        numpy.fromiter((r[1] for r in rows), dtype = numpy.int64, count = n),
+        numpy.frombuffer(b"".join(r[2] for r in rows), dtype = SUM).reshape(n, hitblob.NCOUNTERS),
+        numpy.frombuffer(b"".join(r[3] for r in rows), dtype = MINMAX).reshape(n, hitblob.NCOUNTERS),
+        numpy.frombuffer(b"".join(r[4] for r in rows), dtype = MINMAX).reshape(n, hitblob.NCOUNTERS)
+    )
+
+
+##############################################################################
+#
+# MAIN
+#
+##############################################################################
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description = "Rebuild hitcount rollups."
+    )
+    parser.add_argument(
+        '-s',
+        '--session',
+        help    = "testing_session.id to rebuild. Default: all sessions",
+        dest    = "session_id",
+        type    = int
+    )
+    parser.add_argument(
+        '-d',
+        '--database',
+        help    = "Database file. Default: '/srv/patemon.sqlite3'",
+        dest    = "database",
+        default = "/srv/patemon.sqlite3"
+    )
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(args.database)
+    if args.session_id is None:
+        sessions = [r[0] for r in connection.execute("SELECT id FROM testing_session")]
+    else:
+        sessions = [args.session_id]
+    for session_id in sessions:
+        print("Session {}...".format(session_id), end = "", flush = True)
+        print("{} rotations".format(rebuild(connection, session_id)))
+    connection.close()
+
+
+# EOF
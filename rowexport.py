@@ -0,0 +1,304 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Keyset-paginated streaming table export (CSV, JSON).
+#
+# rowexport.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Web UI table exports. Rows are read in pages of 'page_rows', each page
+#   continuing after the key (first column; 'timestamp' or 'id') of the
+#   previous one:
+#
+#       SELECT ... WHERE session_id = ? AND timestamp > ? ORDER BY timestamp LIMIT ?
+#
+#   Each page is an index seek, so it costs the same at any depth, unlike
+#   LIMIT ... OFFSET, which steps over all the preceding rows. Only one page
+#   is in memory at a time. Every page is its own statement and read
+#   transaction; an export does not hold back WAL checkpoints, and rows
+#   appended meanwhile are included.
+#
+#   Rows are tuples in schema.py column order, from either hitcount layout
+#   (packed rotations are decoded) and both pulseheight storages (the
+#   events of sessions with chunks are decoded and merged by timestamp).
+#   Rows in partition files are included (see partition.relation()); a
+#   page that touches more than partition.Config.max_attached partitions
+#   raises ValueError, so exports of partitioned data need a session or a
+#   time range.
+#
+#   page() serves one page to the UI (the key of its last row is the
+#   'after' of the next), iter_rows() all of them, and stream() serializes
+#   them into CSV or JSON text chunks for a streaming response:
+#
+#       return Response(rowexport.stream(connection, "hitcount", "csv", session_id = 1))
+#
+#   Usage:
+#       python3 rowexport.py -t housekeeping [-s 1] [--format json] > out.json
+#
+import io
+import csv
+import sys
+import json
+import sqlite3
+import argparse
+
+import schema
+import hitblob
+import phblob
+import partition
+
+
+TABLES      = ("hitcount", "pulseheight", "housekeeping", "note", "command")
+TIMESTAMPED = ("hitcount", "pulseheight", "housekeeping")
+FORMATS     = ("csv", "json")
+PAGE_ROWS   = 1000
+
+
+def columns(table: str) -> tuple:
+    """Exported column names, in table order."""
+    return schema.TABLES[table].names
+
+
+def _where(key: str, session_id, after, begin, end) -> tuple:
+    """(SQL conditions, binds) of a page query."""
+    conditions = []
+    binds = []
+    for condition, value in (
+        ("session_id = ?",  session_id),
+        (key + " > ?",      after),
+        ("timestamp >= ?",  begin),
+        ("timestamp < ?",   end)
+    ):
+        if value is not None:
+            conditions.append(condition)
+            binds.append(value)
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), binds
+
+
+def _relation(connection, table: str, session_id, after, begin, end) -> str:
+    """Table, or view over it and its partition files, to read a page from
+    (see partition.relation())."""
+    if after is not None:
+        begin = after + 1 if begin is None else max(begin, after + 1)
+    return partition.relation(connection, table, session_id, begin, end)
+
+
+def _chunked(connection, session_id) -> bool:
+    """True if (session) pulseheight events are in chunk storage."""
+    if not phblob.storage(connection):
+        return False
+    sql = "SELECT 1 FROM pulseheight_chunk"
+    if session_id is None:
+        return connection.execute(sql + " LIMIT 1").fetchone() is not None
+    return connection.execute(
+        sql + " WHERE session_id = ? LIMIT 1", (session_id,)
+    ).fetchone() is not None
+
+
+def _session_events(connection, session_id: int, limit: int, begin, end) -> list:
+    rows = []
+    events = phblob.iter_events(connection, session_id, begin, end)
+    for timestamps, adc in events:
+        rows.extend(
+            (t, session_id) + tuple(a)
+            for t, a in zip(timestamps.tolist(), adc.tolist())
+        )
+        if len(rows) >= limit:
+            break
+    events.close()
+    return rows[:limit]
+
+
+def _pulseheight_chunks(connection, session_id, after, limit, begin, end) -> list:
+    """Page of pulseheight events from both storages (phblob.py). Without
+    'session_id', the row events of sessions that have no chunks and the
+    events of each session that has are merged by timestamp."""
+    if after is not None:
+        begin = after + 1 if begin is None else max(begin, after + 1)
+    if session_id is not None:
+        return _session_events(connection, session_id, limit, begin, end)
+    where, binds = _where("timestamp", None, None, begin, end)
+    where += (" AND " if where else " WHERE ") + \
+        "session_id NOT IN (SELECT session_id FROM pulseheight_chunk)"
+    rows = connection.execute(
+        "SELECT {} FROM {}{} ORDER BY timestamp LIMIT ?".format(
+            ", ".join(columns("pulseheight")),
+            partition.relation(connection, "pulseheight", None, begin, end),
+            where
+        ),
+        binds + [limit]
+    ).fetchall()
+    for (chunked,) in connection.execute(
+        "SELECT DISTINCT session_id FROM pulseheight_chunk"
+    ).fetchall():
+        rows.extend(_session_events(connection, chunked, limit, begin, end))
+    rows.sort()
+    return rows[:limit]
+
+
+def page(
+    connection,
+    table: str,
+    session_id: int = None,
+    after = None,
+    limit: int = PAGE_ROWS,
+    begin: int = None,
+    end: int = None
+) -> list:
+    """Up to 'limit' rows following key 'after' (None: from the first row),
+    in key order. 'begin' and 'end' limit the timestamps, [begin, end[
+    (data tables only)."""
+    if table not in TABLES:
+        raise ValueError("Table '{}' cannot be exported".format(table))
+    if table not in TIMESTAMPED and (begin is not None or end is not None):
+        raise ValueError("Table '{}' has no timestamps".format(table))
+    key = columns(table)[0]
+    if table == "pulseheight" and _chunked(connection, session_id):
+        return _pulseheight_chunks(connection, session_id, after, limit, begin, end)
+    if table == "hitcount" and hitblob.storage(connection) == "packed":
+        where, binds = _where(key, session_id, after, begin, end)
+        cursor = connection.execute(
+            "SELECT timestamp, session_id, format, counters FROM {}{} "
+            "ORDER BY timestamp LIMIT ?".format(
+                _relation(connection, "hitcount_packed", session_id, after, begin, end),
+                where
+            ),
+            binds + [limit]
+        )
+        return [
+            (r[0], r[1]) + tuple(hitblob.decode(r[3], r[2]).tolist())
+            for r in cursor
+        ]
+    where, binds = _where(key, session_id, after, begin, end)
+    source = table
+    if table in TIMESTAMPED:
+        source = _relation(connection, table, session_id, after, begin, end)
+    return connection.execute(
+        "SELECT {} FROM {}{} ORDER BY {} LIMIT ?".format(
+            ", ".join(columns(table)), source, where, key
+        ),
+        binds + [limit]
+    ).fetchall()
+
+
+def iter_pages(connection, table: str, *args, page_rows: int = PAGE_ROWS, **kwargs):
+    """Yield all pages (lists of rows); arguments as in page(), except
+    'after' and 'limit'."""
+    after = None
+    while True:
+        rows = page(connection, table, *args, after = after, limit = page_rows, **kwargs)
+        if not rows:
+            return
+        yield rows
+        if len(rows) < page_rows:
+            return
+        after = rows[-1][0]
+
+
+def iter_rows(connection, table: str, *args, **kwargs):
+    """Yield all rows; see iter_pages()."""
+    for rows in iter_pages(connection, table, *args, **kwargs):
+        yield from rows
+
+
+def stream(connection, table: str, fmt: str = "csv", *args, **kwargs):
+    """Yield the export as text chunks, one per page; CSV with a header
+    line, or JSON {"table": ..., "columns": [...], "rows": [[...], ...]}.
+    Other arguments as in iter_pages()."""
+    if fmt not in FORMATS:
+        raise ValueError("Unsupported format '{}'".format(fmt))
+    pages = iter_pages(connection, table, *args, **kwargs)
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator = "\n")
+        writer.writerow(columns(table))
+        for rows in pages:
+            writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+        return
+    yield '{{"table": {}, "columns": {}, "rows": ['.format(
+        json.dumps(table), json.dumps(columns(table))
+    )
+    separator = "\n"
+    for rows in pages:
+        yield separator + ",\n".join(json.dumps(row) for row in rows)
+        separator = ",\n"
+    yield "\n]}\n"
+
+
+##############################################################################
+#
+# MAIN
+#
+##############################################################################
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description = "Export a PATE Monitor table as CSV or JSON (stdout)."
+    )
+    parser.add_argument(
+        '-t',
+        '--table',
+        help    = "Table to export.",
+        choices = TABLES,
+        required = True
+    )
+    parser.add_argument(
+        '-s',
+        '--session',
+        help    = "testing_session.id to export. Default: all",
+        dest    = "session_id",
+        type    = int
+    )
+    parser.add_argument(
+        '--format',
+        help    = "Output format (csv|json). Default: 'csv'",
+        choices = FORMATS,
+        default = "csv"
+    )
+    parser.add_argument(
+        '--begin',
+        help    = "First timestamp (unix time).",
+        type    = int
+    )
+    parser.add_argument(
+        '--end',
+        help    = "End of range (unix time, exclusive).",
+        type    = int
+    )
+    parser.add_argument(
+        '--page',
+        help    = "Rows per page. Default: {}".format(PAGE_ROWS),
+        dest    = "page_rows",
+        default = PAGE_ROWS,
+        type    = int
+    )
+    parser.add_argument(
+        '-d',
+        '--database',
+        help    = "Database file. Default: '/srv/patemon.sqlite3'",
+        dest    = "database",
+        default = "/srv/patemon.sqlite3"
+    )
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(args.database)
+    for text in stream(
+        connection,
+        args.table,
+        args.format,
+        args.session_id,
+        begin       = args.begin,
+        end         = args.end,
+        page_rows   = args.page_rows
+    ):
+        sys.stdout.write(text)
+    connection.close()
+
+
+# EOF
@@ -0,0 +1,686 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# PATE Monitor database schema.
+#
+# schema.py
+#   0.1.0   2026.10.16  Initial version (table definitions from setup.py).
+#   0.2.0   2026.10.16  Schema VERSION 2; table data_partition.
+#   0.3.0   2026.10.16  Schema VERSION 3; table pulseheight_chunk.
+#   0.4.0   2026.10.16  Schema VERSION 4; table pulseheight_histogram.
+#   0.5.0   2026.10.16  Schema VERSION 5; table csv_import.
+#
+#   Every table is declared once, as a Table object. From the declaration,
+#   the following are prepared when this module is imported:
+#
+#       Table.ddl       CREATE TABLE statement
+#       Table.names     column names, in table order
+#       Table.keys      leading key columns ('timestamp', 'session_id', ...)
+#       Table.data      the rest of the columns
+#       Table.insert    "INSERT INTO table (all columns) VALUES (?, ...)"
+#       Table.select    "SELECT all columns FROM table"
+#       Table.dtype     NumPy structured dtype (NumPy imported on first use)
+#       Table.struct    struct.Struct for one row (numeric tables only)
+#
+#   Writers use these directly; no introspection queries or SQL string
+#   building are needed at runtime. create() creates the whole schema and
+#   stamps it with VERSION (PRAGMA user_version). Existing databases are
+#   upgraded with migrate.py.
+#
+import struct
+import collections
+
+
+Column = collections.namedtuple(
+    "Column",
+    ["name", "type", "constraint", "dtype"],
+    defaults = ["INTEGER", "NOT NULL", None]
+)
+
+# Schema version, stored as PRAGMA user_version. Increment it together with
+# a new migration in migrate.py.
+VERSION = 5
+
+# Data table primary key. The default is never used; an INTEGER PRIMARY KEY
+# column takes the next rowid when no value is given.
+TIMESTAMP_KEY = "NOT NULL DEFAULT CURRENT_TIME PRIMARY KEY"
+
+# Default NumPy / struct types per SQL type; None = not a fixed size type
+_DTYPES = {"INTEGER": "<i8", "REAL": "<f8"}
+_STRUCT = {"<i8": "q", "<u4": "I", "<f8": "d"}
+
+
+class Table:
+    """Declarative table; see module header for the prepared attributes."""
+    def __init__(
+        self,
+        name: str,
+        columns: list,
+        constraints: list = (),
+        keys: tuple = (),
+        options: str = ""
+    ):
+        self.name        = name
+        self.columns     = tuple(columns)
+        self.names       = tuple(c.name for c in self.columns)
+        self.keys        = tuple(keys)
+        self.data        = tuple(n for n in self.names if n not in self.keys)
+        self.constraints = tuple(constraints)
+        self.options     = options
+        self.ddl         = self.create_sql()
+        self.insert = "INSERT INTO {} ({}) VALUES ({})".format(
+            name,
+            ", ".join(self.names),
+            ", ".join("?" * len(self.names))
+        )
+        self.select = "SELECT {} FROM {}".format(", ".join(self.names), name)
+        self._dtype  = None
+        self._struct = False
+
+    def create_sql(self, name: str = None, foreign_keys: bool = True) -> str:
+        """CREATE TABLE statement, optionally for another table name and
+        without the FOREIGN KEY constraints (for other database files)."""
+        return "CREATE TABLE {}\n(\n    {}\n) {}".format(
+            name or self.name,
+            ",\n    ".join(
+                ["{:<20}{:<10}{}".format(*c[:3]).rstrip() for c in self.columns] +
+                [
+                    c for c in self.constraints
+                    if foreign_keys or not c.startswith("FOREIGN KEY")
+                ]
+            ),
+            self.options
+        ).rstrip()
+
+    def column_dtype(self, column: Column) -> str:
+        return column.dtype or _DTYPES.get(column.type)
+
+    @property
+    def dtype(self):
+        """NumPy structured dtype of a row. Non-numeric columns are objects."""
+        if self._dtype is None:
+            import numpy
+            self._dtype = numpy.dtype(
+                [(c.name, self.column_dtype(c) or 'O') for c in self.columns]
+            )
+        return self._dtype
+
+    @property
+    def struct(self) -> struct.Struct:
+        """Packed little-endian row struct, or None if not all numeric."""
+        if self._struct is False:
+            codes = [_STRUCT.get(self.column_dtype(c)) for c in self.columns]
+            self._struct = None if None in codes else struct.Struct("<" + "".join(codes))
+        return self._struct
+
+    def __repr__(self):
+        return "Table('{}', {} columns)".format(self.name, len(self.columns))
+
+
+##############################################################################
+#
+# Tables
+#
+##############################################################################
+
+#
+#   pate
+#
+#       PATE instruments shall be identified via (specified) ADC channel
+#       that has a unique resistor, giving the unit a unique reading on
+#       that channel. Columns id_min and id_max define the range in
+#       which the value needs to be, in order for the unit to be
+#       identified as the one defined by the row.
+#
+PATE = Table(
+    "pate",
+    [
+        Column("id",            "INTEGER",  "NOT NULL PRIMARY KEY AUTOINCREMENT"),
+        Column("id_min"),
+        Column("id_max"),
+        Column("label",         "TEXT")
+    ],
+    keys = ("id",)
+)
+
+
+#
+# connection_pragma
+#
+#       Runtime PRAGMA values of the instance profile, which every
+#       process applies after connecting (see profiles.py).
+#
+CONNECTION_PRAGMA = Table(
+    "connection_pragma",
+    [
+        Column("name",          "TEXT",     "NOT NULL PRIMARY KEY"),
+        Column("value",         "TEXT")
+    ],
+    keys = ("name",)
+)
+
+
+#
+# testing_session
+#
+#       PATE firmware may change between sessions. It shall be queried
+#       from the instrument and recorded into the testing session.
+#
+TESTING_SESSION = Table(
+    "testing_session",
+    [
+        Column("id",            "INTEGER",  "NOT NULL PRIMARY KEY AUTOINCREMENT"),
+        Column("started",       "DATETIME", ""),
+        Column("pate_id"),
+        Column("pate_firmware", "TEXT")
+    ],
+    ["FOREIGN KEY (pate_id) REFERENCES pate (id)"],
+    keys = ("id",)
+)
+
+
+#
+# hitcount
+#
+#       Science data (energy-classified particle hits) is collected in
+#       units of "rotations", as the satellite rorates over its axis.
+#       Each rotation is divided into 10 degree (36) sectors and each
+#       has the same collection of hit counts (12 + 8). In addition,
+#       there is "37th sector", which is in fact, the sun-pointing
+#       telescope.
+#
+#       Each sector has;
+#           10  Primary Proton energy classes (channels)
+#            7  Primary Electron energy classes
+#            2  Secondary Proton energy classes
+#            1  Secondary Electron energy class
+#
+#       Sector naming; sc[00..36], where sector zero is sun-pointing.
+#
+#       Both telescopes also collect other hit counters;
+#
+#            2  AC classes
+#            4  D1 classes
+#            1  D2 class
+#            2  trash classes
+#
+#       Telescopes
+#           st = Sun-pointing Telescope
+#           rt = Rotating Telescope
+#
+#       Design decision has been made to lay all these in a flat table,
+#       even though this generates more than a thousand columns.
+#
+#       Each row is identified by datetime value (named 'rotation')
+#       which designates the beginning of the measurement rotation.
+#       The start of each sector measurement is calculated based on
+#       'rotation' timestamp and the rotation interval (HITCOUNT_INTERVAL).
+#
+#       Sector zero (0) is the sun-pointing telescope, other indeces are
+#       naturally ordered with the rotational direction. (index 1 is
+#       measured first and index 36 last).
+#
+#       NOTE: Default limit for number of columns in SQLite is 2000
+#
+#       Optionally, rotations are stored as packed BLOBs into
+#       'hitcount_packed' and 'hitcount' is created as a compatibility
+#       view over it (see hitblob.py).
+#
+SECTORS             = 37        # sector 0 is the sun-pointing telescope
+HITCOUNT_INTERVAL   = 15        # seconds; one rotation per row
+PROTON_CHANNELS     = 12
+ELECTRON_CHANNELS   = 8
+TELESCOPES          = ('st', 'rt')
+
+
+def hitcount_columns() -> list:
+    """Counter columns of the flat hitcount table, in table order."""
+    cols = []
+    # Sector specific counters
+    for sector in range(0, SECTORS):
+        for proton in range(1, PROTON_CHANNELS + 1):
+            cols.append("s{:02}p{:02}".format(sector, proton))
+        for electron in range(1, ELECTRON_CHANNELS + 1):
+            cols.append("s{:02}e{:02}".format(sector, electron))
+    # Telescope specfic counters
+    for telescope in TELESCOPES:
+        for ac in range(1, 3):
+            cols.append("{}ac{}".format(telescope, ac))
+        # D1 hit patterns
+        for d1 in range(1, 5):
+            cols.append("{}d1p{:01}".format(telescope, d1))
+        # D2 hit pattern
+        cols.append("{}d2p1".format(telescope))
+        for trash in range(1, 3):
+            cols.append("{}trash{:01}".format(telescope, trash))
+    return cols
+
+
+HITCOUNT = Table(
+    "hitcount",
+    [
+        Column("timestamp",     "INTEGER",  TIMESTAMP_KEY),
+        Column("session_id")
+    ] + [
+        Column(name, dtype = "<u4") for name in hitcount_columns()
+    ],
+    ["FOREIGN KEY (session_id) REFERENCES testing_session (id)"],
+    keys = ("timestamp", "session_id")
+)
+
+
+HITCOUNT_PACKED = Table(
+    "hitcount_packed",
+    [
+        Column("timestamp",     "INTEGER",  TIMESTAMP_KEY),
+        Column("session_id"),
+        Column("format"),
+        Column("counters",      "BLOB")
+    ],
+    ["FOREIGN KEY (session_id) REFERENCES testing_session (id)"],
+    keys = ("timestamp", "session_id")
+)
+
+#
+# View 'hitcount' over 'hitcount_packed' (hitblob.py), for readers of the
+# flat table. Its columns are computed by SQL function hitcount_counter(),
+# which is not built into SQLite: it has to be registered into each
+# connection with register() (dbconn.connect() and snapshot.py do), so
+# the view cannot be used from the sqlite3 shell or other languages. A
+# view of plain SQL byte arithmetic would not need it, but its ~260 kB
+# definition would be parsed on every connection open (~30 ms).
+#
+HITCOUNT_VIEW = "CREATE VIEW hitcount AS SELECT timestamp, session_id, {} FROM hitcount_packed".format(
+    ", ".join(
+        "hitcount_counter(counters, format, {}) AS {}".format(i, name)
+        for i, name in enumerate(HITCOUNT.data)
+    )
+)
+
+# hitcount_packed.format values
+HITCOUNT_UINT32     = 1         # little-endian uint32 per counter
+HITCOUNT_PACKED21   = 2         # counters bit-packed to 21 bits
+
+
+def hitcount_counter(blob: bytes, fmt: int, index: int) -> int:
+    """SQL function hitcount_counter(counters, format, index); counter
+    'index' of a hitcount_packed BLOB."""
+    if blob is None:
+        return None
+    if fmt == HITCOUNT_UINT32:
+        return int.from_bytes(blob[index * 4:index * 4 + 4], 'little')
+    bit  = index * 21
+    word = int.from_bytes(blob[bit // 8:bit // 8 + 4], 'little')
+    return (word >> (bit % 8)) & 0x1FFFFF
+
+
+def register(connection):
+    """Register SQL functions used by the schema (view 'hitcount')."""
+    connection.create_function(
+        "hitcount_counter", 3, hitcount_counter, deterministic = True
+    )
+
+
+#
+# hitcount_rollup
+#
+#       Per minute / hour / day aggregates (rotations, sum, min, max)
+#       of each hitcount counter, for plotting long time spans.
+#       Maintained by the writers (see rollup.py).
+#
+HITCOUNT_ROLLUP = Table(
+    "hitcount_rollup",
+    [
+        Column("session_id"),
+        Column("resolution"),
+        Column("bucket"),
+        Column("rotations"),
+        Column("sums",          "BLOB"),
+        Column("mins",          "BLOB"),
+        Column("maxs",          "BLOB")
+    ],
+    [
+        "PRIMARY KEY (session_id, resolution, bucket)",
+        "FOREIGN KEY (session_id) REFERENCES testing_session (id)"
+    ],
+    keys = ("session_id", "resolution", "bucket"),
+    options = "WITHOUT ROWID"
+)
+
+
+#
+# pulseheight
+#
+#       Calibration data is raw hit detection data from detector disks,
+#       containing ADC values that indicate the pulse heights.
+#
+#       Sample data contained an 8-bit hit mask. DOES THIS EXIST IN THE
+#       ACTUAL CALIBRATION DATA?
+#
+PULSEHEIGHT = Table(
+    "pulseheight",
+    [
+        Column("timestamp",     "INTEGER",  TIMESTAMP_KEY),
+        Column("session_id")
+    ] + [
+        Column(name, dtype = "<i4")
+        for name in ("ac1", "d1a", "d1b", "d1c", "d2a", "d2b", "d3", "ac2")
+    ],
+    ["FOREIGN KEY (session_id) REFERENCES testing_session (id)"],
+    keys = ("timestamp", "session_id")
+)
+
+
+#
+# pulseheight_chunk
+#
+#       Alternative, compressed storage for pulseheight events; blocks of
+#       events (delta encoded, zlib or lzma compressed), keyed by session
+#       and the timestamp of the first event (see phblob.py).
+#
+PULSEHEIGHT_CHUNK = Table(
+    "pulseheight_chunk",
+    [
+        Column("session_id"),
+        Column("timestamp"),
+        Column("latest"),
+        Column("events"),
+        Column("format"),
+        Column("data",          "BLOB")
+    ],
+    [
+        "PRIMARY KEY (session_id, timestamp)",
+        "FOREIGN KEY (session_id) REFERENCES testing_session (id)"
+    ],
+    keys = ("session_id", "timestamp")
+)
+
+
+#
+# pulseheight_histogram
+#
+#       Per session and detector (ac1 ... ac2) pulse height histograms, one
+#       row per non-empty bin ('bin' is the lower edge, 'width' the bin
+#       width). Maintained by the writers (see phhist.py).
+#
+PULSEHEIGHT_HISTOGRAM = Table(
+    "pulseheight_histogram",
+    [
+        Column("session_id"),
+        Column("detector",      "TEXT"),
+        Column("width"),
+        Column("bin"),
+        Column("count")
+    ],
+    [
+        "PRIMARY KEY (session_id, detector, width, bin)",
+        "FOREIGN KEY (session_id) REFERENCES testing_session (id)"
+    ],
+    keys = ("session_id", "detector", "width", "bin"),
+    options = "WITHOUT ROWID"
+)
+
+
+#
+# register
+#
+#       PATE Registers. Assumably, this table will get populated when
+#       a testing session begins, allowing UI to display these values
+#       without issuing (high-delay) commands to PATE for reading the
+#       values.
+#
+#       NOTE: Just a placeholder for now...
+#
+REGISTER = Table(
+    "register",
+    [
+        Column("pate_id"),
+        Column("retrieved",     "DATETIME"),
+        Column("reg01"),
+        Column("reg02")
+    ],
+    ["FOREIGN KEY (pate_id) REFERENCES pate (id)"]
+)
+
+
+#
+# note
+#
+#       Store operator issued notes during a testing session.
+#       (remove for mission-time EGSE)
+#
+#       TODO: make id into a timestamp with ms accuracy
+#
+NOTE = Table(
+    "note",
+    [
+        Column("id",            "INTEGER",  "NOT NULL PRIMARY KEY AUTOINCREMENT"),
+        Column("session_id"),
+        Column("text",          "TEXT",     "NULL"),
+        Column("created",       "INTEGER",  "NOT NULL DEFAULT (strftime('%s', 'now'))")
+    ],
+    ["FOREIGN KEY (session_id) REFERENCES testing_session (id)"],
+    keys = ("id", "session_id")
+)
+
+
+#
+# command
+#
+#       Work queue from the web UI to the instrument daemons; rows where
+#       'handled' is NULL are pending (see cmdqueue.py).
+#
+COMMAND = Table(
+    "command",
+    [
+        Column("id",            "INTEGER",  "NOT NULL PRIMARY KEY AUTOINCREMENT"),
+        Column("session_id"),
+        Column("interface",     "TEXT"),
+        Column("command",       "TEXT"),
+        Column("value",         "TEXT"),
+        Column("created",       "TIMESTAMP", "NOT NULL DEFAULT CURRENT_TIMESTAMP"),
+        Column("handled",       "DATETIME", "NULL"),
+        Column("result",        "TEXT",     "NULL")
+    ],
+    ["FOREIGN KEY (session_id) REFERENCES testing_session (id)"],
+    keys = ("id", "session_id")
+)
+
+
+#
+# PSU (this table is supposed to have only zero or one rows)
+#
+#       Updated by 'psud' about twice a second. Writers should set
+#       'modified' in the same statement (see psustatus.publish()).
+#       Trigger 'psu_ari' (see TRIGGERS) refreshes it for writers that
+#       do not, such as a plain UPDATE from an external 'psud'.
+#
+PSU = Table(
+    "psu",
+    [
+        Column("id",                "INTEGER",  "NOT NULL DEFAULT 0 PRIMARY KEY"),
+        Column("power",             "TEXT"),
+        Column("voltage_setting",   "REAL"),
+        Column("current_limit",     "REAL"),
+        Column("measured_current",  "REAL"),
+        Column("measured_voltage",  "REAL"),
+        Column("modified",          "INTEGER",  "NOT NULL DEFAULT CURRENT_TIMESTAMP")
+    ],
+    [
+        "CONSTRAINT          single_row_chk  CHECK (id = 0)",
+        "CONSTRAINT          power_chk       CHECK (power IN ('ON', 'OFF'))"
+    ],
+    keys = ("id",)
+)
+
+
+#
+# Housekeeping
+#
+#       Dummy columns, for now. S: Sun-pointing, R: Rotating.
+#
+HOUSEKEEPING = Table(
+    "housekeeping",
+    [
+        Column("timestamp",     "INTEGER",  TIMESTAMP_KEY),
+        Column("session_id")
+    ] + [
+        Column("{}_c{:02}".format(telescope, c), dtype = "<i4")
+        for c in range(0, 37)
+        for telescope in ("s", "r")
+    ],
+    ["FOREIGN KEY (session_id) REFERENCES testing_session (id)"],
+    keys = ("timestamp", "session_id")
+)
+
+
+#
+# data_partition
+#
+#       Registry of the partition files that hold science data outside
+#       the main database file, with the time span of their rows
+#       (see partition.py).
+#
+DATA_PARTITION = Table(
+    "data_partition",
+    [
+        Column("name",          "TEXT",     "NOT NULL PRIMARY KEY"),
+        Column("filename",      "TEXT"),
+        Column("earliest",      "INTEGER",  "NULL"),
+        Column("latest",        "INTEGER",  "NULL"),
+        Column("retired",       "DATETIME", "NULL")
+    ],
+    keys = ("name",)
+)
+
+
+#
+# csv_import
+#
+#       Ledger of imported calibration CSV files, by SHA-256 of the file
+#       content. Events get timestamps 'start' + n * 'interval'; 'imported'
+#       counts the events committed so far, of 'total'. 'completed' is set
+#       once all of them are (see csvbulk.py).
+#
+CSV_IMPORT = Table(
+    "csv_import",
+    [
+        Column("sha256",        "TEXT",     "NOT NULL PRIMARY KEY"),
+        Column("filename",      "TEXT"),
+        Column("session_id"),
+        Column("start"),
+        Column("interval"),
+        Column("total"),
+        Column("imported"),
+        Column("completed",     "DATETIME", "NULL")
+    ],
+    ["FOREIGN KEY (session_id) REFERENCES testing_session (id)"],
+    keys = ("sha256",)
+)
+
+
+TABLES = collections.OrderedDict(
+    (t.name, t) for t in (
+        PATE,
+        CONNECTION_PRAGMA,
+        TESTING_SESSION,
+        HITCOUNT,
+        HITCOUNT_PACKED,
+        HITCOUNT_ROLLUP,
+        PULSEHEIGHT,
+        PULSEHEIGHT_CHUNK,
+        PULSEHEIGHT_HISTOGRAM,
+        REGISTER,
+        NOTE,
+        COMMAND,
+        PSU,
+        HOUSEKEEPING,
+        DATA_PARTITION,
+        CSV_IMPORT
+    )
+)
+
+
+#
+# Indexes
+#
+#       All session data is queried by session_id, in time order.
+#       Primary keys (timestamp, id) do not serve these queries.
+#
+#       Table 'command' is a work queue for daemons, which poll for
+#       rows that have not been handled. Partial index contains only
+#       the pending rows, keeping the poll cost independent of the
+#       length of the command history (see cmdqueue.py).
+#
+INDEXES = collections.OrderedDict([
+    ("hitcount_session_idx",        "hitcount (session_id, timestamp)"),
+    ("pulseheight_session_idx",     "pulseheight (session_id, timestamp)"),
+    ("housekeeping_session_idx",    "housekeeping (session_id, timestamp)"),
+    ("note_session_idx",            "note (session_id)"),
+    ("command_session_idx",         "command (session_id)"),
+    ("command_pending_idx",         "command (id) WHERE handled IS NULL")
+])
+
+
+#
+# Triggers
+#
+#       psu_ari sets 'psu.modified' on UPDATEs that leave it unchanged.
+#       Updates that set it themselves (psustatus.publish()) are not
+#       written twice, and readings that publish() does not write at all
+#       are not touched. Two publish() calls within the same second leave
+#       'modified' unchanged, too; the trigger skips rows whose 'modified'
+#       already is CURRENT_TIMESTAMP, as writing it again would change
+#       nothing.
+#
+TRIGGERS = collections.OrderedDict([
+    ("psu_ari", """
+        CREATE TRIGGER psu_ari
+        AFTER UPDATE ON psu
+        FOR EACH ROW
+        WHEN NEW.modified IS OLD.modified
+        AND  OLD.modified IS NOT CURRENT_TIMESTAMP
+        BEGIN
+            UPDATE psu SET modified = CURRENT_TIMESTAMP WHERE id = NEW.id;
+        END
+        """)
+])
+
+
+def objects(hitcount: str = "table") -> list:
+    """Schema objects as (type, name, sql) in creation order. Argument
+    'hitcount' selects the hitcount storage ('table', 'uint32', 'packed21')."""
+    packed = hitcount != "table"
+    result = []
+    for table in TABLES.values():
+        if table is HITCOUNT and packed:
+            continue
+        if table is HITCOUNT_PACKED:
+            if not packed:
+                continue
+            result.append(("table", table.name, table.ddl))
+            result.append(("view", "hitcount", HITCOUNT_VIEW))
+            continue
+        result.append(("table", table.name, table.ddl))
+    for name, definition in INDEXES.items():
+        if packed and definition.startswith("hitcount "):
+            definition = "hitcount_packed" + definition[len("hitcount"):]
+        result.append(
+            ("index", name, "CREATE INDEX {} ON {}".format(name, definition))
+        )
+    for name, sql in TRIGGERS.items():
+        result.append(("trigger", name, sql))
+    return result
+
+
+def create(connection, hitcount: str = "table", verbose: bool = False):
+    """Create all tables, views and indexes."""
+    for kind, name, sql in objects(hitcount):
+        connection.execute(sql)
+        if verbose:
+            print("{} '{}' created".format(kind.capitalize(), name))
+    connection.execute("PRAGMA user_version = {}".format(VERSION))
+
+
+# EOF
@@ -14,8 +14,19 @@
 #   0.3.1   2018.11.27  Slight output/print changes.
 #   0.4.0   2019.01.24  Column psu.state removed.
 #   0.4.1   2019.11.11  Read /boot/install.config for DEV/UAT/PRD.
-#
-#   TODO: 'setup.log' gets no content currently (just unimplemented...)
+#   0.5.0   2026.10.16  Batched NumPy dev-data generation (devdata.py).
+#   0.5.1   2026.10.16  Streaming pulseheight CSV import (csvimport.py).
+#   0.5.2   2026.10.16  Optional packed BLOB hitcount storage (hitblob.py).
+#   0.5.3   2026.10.16  Session indexes, pending command index (cmdqueue.py).
+#   0.5.4   2026.10.16  Trigger psu_ari guarded (psustatus.py).
+#   0.5.5   2026.10.16  Table hitcount_rollup added (rollup.py).
+#   0.6.0   2026.10.16  Per-mode PRAGMA profiles (profiles.py).
+#   0.6.1   2026.10.16  Table definitions moved into schema.py.
+#   0.7.0   2026.10.16  Schema versioning, '--upgrade' (migrate.py).
+#   0.7.1   2026.10.16  Parallel sharded DEV content build (devshard.py).
+#   0.7.2   2026.10.16  Compressed pulseheight chunk storage (phblob.py).
+#   0.7.3   2026.10.16  Instrumented connection (dbconn.py); phase timings
+#                       and statement statistics into 'setup.log'.
 #
 import os
 import getpass
@@ -26,9 +37,13 @@ import argparse
 import subprocess
 import configparser
 
+import schema
+import dbconn
+import profiles
+
 
 # PEP 396 -- Module Version Numbers https://www.python.org/dev/peps/pep-0396/
-__version__ = "0.4.1"
+__version__ = "0.7.3"
 __author__  = "Jani Tammi <jasata@utu.fi>"
 VERSION = __version__
 HEADER  = """
@@ -45,6 +60,7 @@ Version {}, 2019 {}
 class Config:
     log_level       = "DEBUG"
     log_file        = "setup.log"
+    stats_file      = "setup.stats.json"    # statement statistics (dbconn.py)
     config_file     = "/boot/install.config"
     version         = __version__
     class Mode:
@@ -58,7 +74,16 @@ class Config:
         file_name   = "/srv/patemon.sqlite3"
         file_owner  = "patemon.patemon"
         dir_owner   = "patemon.www-data"
+        hitcount    = "table"   # table | uint32 | packed21 (see hitblob.py)
+        pulseheight = "rows"    # rows | zlib | lzma (see phblob.py)
+        pragmas     = {}        # profile overrides, see profiles.py
+    class Dev:
+        rotations   = 5760      # 5760 equals one day of data
+        samples     = 1000      # housekeeping samples
+        seed        = None      # None = non-reproducible dataset
+        workers     = 1         # >1 = sharded build in a process pool
     force           = False
+    upgrade         = False
     # to-be obsoleted
 #    dbfile          = "/srv/patemon.sqlite3"
 #    dbfile_owner    = "patemon.patemon"
@@ -130,6 +155,11 @@ def read_config(cfgfile: str):
     except Exception as e:
         print(e)
         os._exit(-1)
+    #
+    # Section "Database" (optional) - PRAGMA profile overrides
+    #
+    if cfg.has_section("Database"):
+        Config.DB.pragmas.update(cfg["Database"])
 
 
 
@@ -177,6 +207,11 @@ if __name__ == '__main__':
         help    = 'Delete existing database file and recreate.',
         action  = 'store_true'
     )
+    parser.add_argument(
+        '--upgrade',
+        help    = 'Upgrade existing database schema in place (keeps data).',
+        action  = 'store_true'
+    )
     parser.add_argument(
         '-m',
         '--mode',
@@ -190,10 +225,68 @@ if __name__ == '__main__':
         type    = str.upper,
         metavar = "MODE"
     )
+    parser.add_argument(
+        '--rotations',
+        help    = "DEV mode hitcount rotations. Default: {}".format(
+            Config.Dev.rotations
+        ),
+        dest    = "rotations",
+        default = Config.Dev.rotations,
+        type    = int,
+        metavar = "N"
+    )
+    parser.add_argument(
+        '--seed',
+        help    = "DEV mode random seed for a reproducible dataset.",
+        dest    = "seed",
+        default = Config.Dev.seed,
+        type    = int,
+        metavar = "N"
+    )
+    parser.add_argument(
+        '--workers',
+        help    = "DEV mode content build processes (sharded when >1). Default: {}".format(
+            Config.Dev.workers
+        ),
+        dest    = "workers",
+        default = Config.Dev.workers,
+        type    = int,
+        metavar = "N"
+    )
+    parser.add_argument(
+        '--hitcount-storage',
+        help    = "Hitcount storage layout (table|uint32|packed21). Default: '{}'".format(
+            Config.DB.hitcount
+        ),
+        choices = ["table", "uint32", "packed21"],
+        dest    = "hitcount",
+        default = Config.DB.hitcount,
+        type    = str.lower,
+        metavar = "LAYOUT"
+    )
+    parser.add_argument(
+        '--pulseheight-storage',
+        help    = "Pulseheight event storage (rows|zlib|lzma). Default: '{}'".format(
+            Config.DB.pulseheight
+        ),
+        choices = ["rows", "zlib", "lzma"],
+        dest    = "pulseheight",
+        default = Config.DB.pulseheight,
+        type    = str.lower,
+        metavar = "STORAGE"
+    )
     args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
     Config.log_level = getattr(logging, args.log_level)
     Config.Mode.selected = args.mode
     Config.force = args.force
+    Config.upgrade = args.upgrade
+    Config.Dev.rotations = args.rotations
+    Config.Dev.seed = args.seed
+    Config.Dev.workers = args.workers
+    Config.DB.hitcount = args.hitcount
+    Config.DB.pulseheight = args.pulseheight
 
 
     #
@@ -206,6 +299,9 @@ if __name__ == '__main__':
         datefmt     = "%H:%M:%S"
     )
     log = logging.getLogger()
+    dbconn.Config.dump_file = Config.stats_file
+    dbconn.Config.interval  = float("inf")      # one summary, at the end
+    dbconn.Config.trace     = False             # expands every bulk insert row
 
 
     #
@@ -219,6 +315,34 @@ if __name__ == '__main__':
         flush=True
     )
     if os.path.exists(Config.DB.file_name):
+        if Config.upgrade and not Config.force:
+            print("exists, upgrading schema")
+            import migrate
+            try:
+                connection = dbconn.connect(
+                    Config.DB.file_name,
+                    isolation_level = None
+                )
+                with dbconn.STATISTICS.phase("upgrade"):
+                    migrate.upgrade(connection)
+                # Databases from before profiles get the selected mode's settings
+                if not connection.execute(
+                    "SELECT COUNT(*) FROM connection_pragma"
+                ).fetchone()[0]:
+                    profiles.record(
+                        connection,
+                        profiles.profile(Config.Mode.selected, Config.DB.pragmas)
+                    )
+                connection.close()
+                dbconn.STATISTICS.report()
+            except Exception as e:
+                print("Upgrade failed!")
+                print(e)
+                os._exit(-1)
+            print(
+                "Database schema upgraded to version {}".format(schema.VERSION)
+            )
+            os._exit(0)
         if Config.force:
             try:
                 os.remove(Config.DB.file_name)
@@ -226,7 +350,10 @@ if __name__ == '__main__':
                 print("Previous database file exists and could not be removed!")
                 os._exit(-1)
         else:
-            print("Database file already exists! (use '--force' to remove)")
+            print(
+                "Database file already exists! "
+                "(use '--upgrade' to migrate, '--force' to remove)"
+            )
             os._exit(-1)
     print("OK!")
 
@@ -245,315 +372,29 @@ if __name__ == '__main__':
     #
     # Start actual database creation
     #
-    print("Connecting...", end="", flush=True)
-    connection = sqlite3.connect(Config.DB.file_name)
-    connection.execute('PRAGMA journal_mode=wal')
-    connection.execute("PRAGMA foreign_keys = 1")
+    print(
+        "Connecting (profile '{}')...".format(Config.Mode.selected),
+        end="",
+        flush=True
+    )
+    try:
+        settings = profiles.profile(Config.Mode.selected, Config.DB.pragmas)
+        # New, empty database; profile is created below, not applied
+        connection = dbconn.connect(Config.DB.file_name, profile = False)
+        profiles.create(connection, settings)
+    except Exception as e:
+        print(e)
+        os._exit(-1)
     print("OK!")
 
     print("Creating new tables...")
     try:
-        #
-        #   pate
-        #
-        #       PATE instruments shall be identified via (specified) ADC channel
-        #       that has a unique resistor, giving the unit a unique reading on
-        #       that channel. Columns id_min and id_max define the range in
-        #       which the value needs to be, in order for the unit to be
-        #       identified as the one defined by the row.
-        #
-        sql = """
-        CREATE TABLE pate
-        (
-            id          INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
-            id_min      INTEGER NOT NULL,
-            id_max      INTEGER NOT NULL,
-            label       TEXT NOT NULL
-        )
-        """
-        connection.execute(sql)
-        print("Table 'pate' created")
-
-
-        #
-        # testing_session
-        #
-        #       PATE firmware may change between sessions. It shall be queried
-        #       from the instrument and recorded into the testing session.
-        #
-        sql = """
-        CREATE TABLE testing_session
-        (
-            id              INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
-            started         DATETIME,
-            pate_id         INTEGER NOT NULL,
-            pate_firmware   TEXT NOT NULL,
-            FOREIGN KEY (pate_id) REFERENCES pate (id)
-        )
-        """
-        connection.execute(sql)
-        print("Table 'testing_session' created")
-
-
-        #
-        # hitcount
-        #
-        #       Science data (energy-classified particle hits) is collected in
-        #       units of "rotations", as the satellite rorates over its axis.
-        #       Each rotation is divided into 10 degree (36) sectors and each
-        #       has the same collection of hit counts (12 + 8). In addition,
-        #       there is "37th sector", which is in fact, the sun-pointing
-        #       telescope.
-        #
-        #       Each sector has;
-        #           10  Primary Proton energy classes (channels)
-        #            7  Primary Electron energy classes
-        #            2  Secondary Proton energy classes
-        #            1  Secondary Electron energy class
-        #
-        #       Sector naming; sc[00..36], where sector zero is sun-pointing.
-        #
-        #       Both telescopes also collect other hit counters;
-        #
-        #            2  AC classes
-        #            4  D1 classes
-        #            1  D2 class
-        #            2  trash classes
-        #
-        #       Telescopes
-        #           st = Sun-pointing Telescope
-        #           rt = Rotating Telescope
-        #
-        #       Design decision has been made to lay all these in a flat table,
-        #       even though this generates more than a thousand columns.
-        #
-        #       Each row is identified by datetime value (named 'rotation')
-        #       which designates the beginning of the measurement rotation.
-        #       The start of each sector measurement is calculated based on
-        #       'rotation' timestamp and the rotation interval.
-        #
-        #       Sector zero (0) is the sun-pointing telescope, other indeces are
-        #       naturally ordered with the rotational direction. (index 1 is
-        #       measured first and index 36 last).
-        #
-        #       NOTE: Default limit for number of columns in SQLite is 2000
-        #
-        sql = """
-        CREATE TABLE hitcount
-        (
-            timestamp       INTEGER NOT NULL DEFAULT CURRENT_TIME PRIMARY KEY,
-            session_id      INTEGER NOT NULL,
-        """
-        cols = []
-        # Sector specific counters
-        for sector in range(0,37):
-            for proton in range(1,13):
-                cols.append("s{:02}p{:02} INTEGER NOT NULL, ".format(
-                        sector,
-                        proton
-                    )
-                )
-            for electron in range(1,9):
-                cols.append("s{:02}e{:02} INTEGER NOT NULL, ".format(
-                        sector,
-                        electron
-                    )
-                )
-        # Telescope specfic counters
-        for telescope in ('st', 'rt'):
-            for ac in range(1, 3):
-                cols.append("{}ac{} INTEGER NOT NULL, ".format(
-                        telescope,
-                        ac
-                    )
-                )
-            # D1 hit patterns
-            for d1 in range(1,5):
-                cols.append("{}d1p{:01} INTEGER NOT NULL, ".format(
-                        telescope,
-                        d1
-                    )
-                )
-            # D2 hit pattern
-            cols.append("{}d2p1 INTEGER NOT NULL, ".format(
-                    telescope
-                )
-            )
-            for trash in range(1,3):
-                cols.append("{}trash{:01} INTEGER NOT NULL, ".format(
-                        telescope,
-                        trash
-                    )
-                )
-        sql += "".join(cols)
-        sql += " FOREIGN KEY (session_id) REFERENCES testing_session (id) )"
-        connection.execute(sql)
-        print("Table 'hitcount' created")
-
-
-        #
-        # pulseheight
-        #
-        #       Calibration data is raw hit detection data from detector disks,
-        #       containing ADC values that indicate the pulse heights.
-        #
-        #       Sample data contained an 8-bit hit mask. DOES THIS EXIST IN THE
-        #       ACTUAL CALIBRATION DATA?
-        #
-        sql = """
-        CREATE TABLE pulseheight
-        (
-            timestamp       INTEGER NOT NULL DEFAULT CURRENT_TIME PRIMARY KEY,
-            session_id      INTEGER NOT NULL,
-            ac1             INTEGER NOT NULL,
-            d1a             INTEGER NOT NULL,
-            d1b             INTEGER NOT NULL,
-            d1c             INTEGER NOT NULL,
-            d2a             INTEGER NOT NULL,
-            d2b             INTEGER NOT NULL,
-            d3              INTEGER NOT NULL,
-            ac2             INTEGER NOT NULL,
-            FOREIGN KEY (session_id) REFERENCES testing_session (id)
-        )
-        """
-        connection.execute(sql)
-        print("Table 'pulseheight' created")
-
-
-        #
-        # register
-        #
-        #       PATE Registers. Assumably, this table will get populated when
-        #       a testing session begins, allowing UI to display these values
-        #       without issuing (high-delay) commands to PATE for reading the
-        #       values.
-        #
-        #       NOTE: Just a placeholder for now...
-        #
-        sql = """
-        CREATE TABLE register
-        (
-            pate_id         INTEGER NOT NULL,
-            retrieved       DATETIME NOT NULL,
-            reg01           INTEGER NOT NULL,
-            reg02           INTEGER NOT NULL,
-            FOREIGN KEY (pate_id) REFERENCES pate (id)
-        )
-        """
-        connection.execute(sql)
-        print("Table 'register' created")
-
-
-        #
-        # note
-        #
-        #       Store operator issued notes during a testing session.
-        #       (remove for mission-time EGSE)
-        #
-        sql = """
-        CREATE TABLE note
-        (
-            id              INTEGER     NOT NULL PRIMARY KEY AUTOINCREMENT,
-            session_id      INTEGER     NOT NULL,
-            text            TEXT            NULL,
-            created         INTEGER     NOT NULL DEFAULT (strftime('%s', 'now')),
-            FOREIGN KEY (session_id) REFERENCES testing_session (id)
-        )
-        """
-        connection.execute(sql)
-        print("Table 'note' created")
-
-        sql = """ -- make id into a timestamp with ms accuracy
-        CREATE TABLE note2
-        (
-            id              INTEGER     NOT NULL PRIMARY KEY AUTOINCREMENT,
-            session_id      INTEGER     NOT NULL,
-            text            TEXT            NULL,
-            created         INTEGER     NOT NULL DEFAULT (strftime('%s', 'now')),
-            FOREIGN KEY (session_id) REFERENCES testing_session (id)
-        )
-        """
-
-
-
-        #
-        # command
-        #
-        sql = """
-        CREATE TABLE command
-        (
-            id              INTEGER         NOT NULL PRIMARY KEY AUTOINCREMENT,
-            session_id      INTEGER         NOT NULL,
-            interface       TEXT            NOT NULL,
-            command         TEXT            NOT NULL,
-            value           TEXT            NOT NULL,
-            created         TIMESTAMP       NOT NULL DEFAULT CURRENT_TIMESTAMP,
-            handled         DATETIME            NULL,
-            result          TEXT                NULL,
-            FOREIGN KEY (session_id) REFERENCES testing_session (id)
-        )
-        """
-        connection.execute(sql)
-        print("Table 'command' created")
-
-
-        #
-        # PSU (this table is supposed to have only zero or one rows)
-        #
-        sql = """
-        CREATE TABLE psu
-        (
-            id                  INTEGER         NOT NULL DEFAULT 0 PRIMARY KEY,
-            power               TEXT            NOT NULL,
-            voltage_setting     REAL            NOT NULL,
-            current_limit       REAL            NOT NULL,
-            measured_current    REAL            NOT NULL,
-            measured_voltage    REAL            NOT NULL,
-            modified            INTEGER         NOT NULL DEFAULT CURRENT_TIMESTAMP,
-            CONSTRAINT          single_row_chk  CHECK (id = 0),
-            CONSTRAINT          power_chk       CHECK (power IN ('ON', 'OFF'))
-        )
-        """
-        connection.execute(sql)
-        print("Table 'psu' created")
-        # SQLite doesn't have "CREATE OR REPLACE"
-        trg = """
-        CREATE TRIGGER psu_ari
-        AFTER UPDATE ON psu
-        FOR EACH ROW
-        BEGIN
-            UPDATE psu
-            SET    modified = CURRENT_TIMESTAMP
-            WHERE  id = old.id;
-        END;
-        """
-        connection.execute(trg)
-        print("Trigger 'psu_ari' created")
-
-
-        #
-        # Housekeeping
-        #
-        sql = """
-        CREATE TABLE housekeeping
-        (
-            timestamp       INTEGER NOT NULL DEFAULT CURRENT_TIME PRIMARY KEY,
-            session_id      INTEGER NOT NULL,
-        """
-        cols = []
-        # dummy columns
-        for c in range(0,37):
-            cols.append("s_c{:02} INTEGER NOT NULL, ".format(c))    # S: Sun-pointing
-            cols.append("r_c{:02} INTEGER NOT NULL, ".format(c))    # R: Rotating
-        sql += "".join(cols)
-        sql += " FOREIGN KEY (session_id) REFERENCES testing_session (id) )"
-        connection.execute(sql)
-        print("Table 'housekeeping' created")
-
-
-    except:
+        with dbconn.STATISTICS.phase("DDL"):
+            schema.create(connection, Config.DB.hitcount, verbose = True)
+            profiles.record(connection, settings)
+    except Exception as e:
         print("Database creation failed!")
-        print(sql)
+        print(e)
         os._exit(-1)
     else:
         print("Database creation successful!")
@@ -586,6 +427,7 @@ if __name__ == '__main__':
     #
     if Config.Mode.selected != "DEV":
         connection.close()
+        dbconn.STATISTICS.report()
         print("Module 'pmdatabase' setup completed!\n")
         os._exit(0)
     else:
@@ -597,19 +439,19 @@ if __name__ == '__main__':
     # Development Content Creation
     #
     ###########################################################################
-    import csv
     import time
-    import random
+    import devdata
+    import hitblob
+    import rollup
+    import csvimport
 
     # Configurations
-    HITCOUNT_ROTATIONS      = 5760      # 5760 equals one day of data
-    HITCOUNT_INTERVAL       = 15        # one rotation per 15 seconds
-    HITCOUNT_MAXHITS        = 2**21     # Full 21-bit register
+    HITCOUNT_ROTATIONS      = Config.Dev.rotations
+    HITCOUNT_INTERVAL       = schema.HITCOUNT_INTERVAL
     PULSEHEIGHT_CSVFILE     = "sample.csv"
     PULSEHEIGHT_INTERVAL    = 15        # data every 15 seconds
-    HOUSEKEEPING_INTERVAL   = 60
-    HOUSEKEEPING_SAMPLES    = 1000
-    HOUSEKEEPING_MAXVAL     = 255
+    HOUSEKEEPING_INTERVAL   = devdata.HOUSEKEEPING_INTERVAL
+    HOUSEKEEPING_SAMPLES    = Config.Dev.samples
 
 
     def get_session(cursor):
@@ -643,89 +485,6 @@ if __name__ == '__main__':
         return cursor.lastrowid
 
 
-    def get_column_list(cursor, table, exclude = []):
-        """Method that compiles a list of data columns from a table"""
-        if not exclude:
-            exclude = []
-        sql = "SELECT * FROM {} LIMIT 1".format(table)
-        cursor.execute(sql)
-        # Ignore query result and use cursor.description instead
-        return [key[0] for key in cursor.description if key[0] not in exclude]
-
-    def generate_hitcount_insert_sql(cursor):
-        sql1 = "INSERT INTO hitcount (timestamp, session_id, "
-        sql2 = ") VALUES (?, ?, "
-        cols = get_column_list(cursor, "hitcount", ['timestamp', 'session_id'])
-        sql_binds = ""
-        for col in cols:
-            sql_binds += "?, "
-        return sql1 + ",".join(cols) + sql2 + sql_binds[:-2] + ")"
-
-    def generate_hitcount_packet(session_id, cursor, interval=15):
-        """Generate tuple"""
-        # Timestamp
-        try:
-            (generate_hitcount_packet.timestamp)
-        except:
-            generate_hitcount_packet.timestamp = int(time.time())
-        else:
-            generate_hitcount_packet.timestamp += interval
-        # Number of columns to provide data for
-        try:
-            (generate_hitcount_packet.nvars)
-        except:
-            generate_hitcount_packet.nvars = len(get_column_list(
-                cursor,
-                "hitcount",
-                ['timestamp', 'session_id']
-            ))
-        nvars = generate_hitcount_packet.nvars
-        lst = [random.randint(0, HITCOUNT_MAXHITS) for x in range(0, nvars)]
-        lst.insert(0, session_id)
-        lst.insert(0, generate_hitcount_packet.timestamp)
-        return tuple(lst)
-
-    def generate_housekeeping_sql(cursor):
-        sql1 = "INSERT INTO housekeeping (timestamp, session_id, "
-        sql2 = ") VALUES (?, ?, "
-        cols = get_column_list(
-            cursor,
-            "housekeeping",
-            ['timestamp', 'session_id']
-        )
-        sql_binds = ""
-        for col in cols:
-            sql_binds += "?, "
-        return sql1 + ",".join(cols) + sql2 + sql_binds[:-2] + ")"
-
-    def generate_housekeeping_packet(session_id, cursor, interval=60):
-        """Generate tuple"""
-        # Timestamp
-        try:
-            (generate_housekeeping_packet.timestamp)
-        except:
-            generate_housekeeping_packet.timestamp = time.time()
-        else:
-            generate_housekeeping_packet.timestamp += interval
-        # Number of columns to provide data for
-        try:
-            (generate_housekeeping_packet.nvars)
-        except:
-            generate_housekeeping_packet.nvars = len(get_column_list(
-                cursor,
-                "housekeeping",
-                ['timestamp', 'session_id']
-            ))
-        nvars = generate_housekeeping_packet.nvars
-        lst = [random.randint(0, HOUSEKEEPING_MAXVAL) for x in range(0, nvars)]
-        lst.insert(0, session_id)
-        lst.insert(0, int(generate_housekeeping_packet.timestamp))
-        return tuple(lst)
-
-
-
-
-
     cursor = connection.cursor()
     #
     # table 'hitcount' content
@@ -736,120 +495,99 @@ if __name__ == '__main__':
     # cursor.execute("DELETE FROM {}".format(Config.table_name))
     # connection.commit()
 
-    # SQL
-    sql = generate_hitcount_insert_sql(cursor)
-    # Generate sci data rotations
-    print("Creating {} rotations of hitcount data...".format(
-            HITCOUNT_ROTATIONS
-        )
-    )
-    try:
-        for i in range(0, HITCOUNT_ROTATIONS):
-            print("\r{:>6.2f} % ...".format(
-                    (100*i)/HITCOUNT_ROTATIONS
-                ),
-                end=''
+    if Config.Dev.workers > 1:
+        import tempfile
+        import devshard
+        print(
+            "Creating {} rotations of hitcount and {} samples of housekeeping data ({} workers)...".format(
+                HITCOUNT_ROTATIONS,
+                HOUSEKEEPING_SAMPLES,
+                Config.Dev.workers
             )
-            cursor.execute(
-                sql,
-                generate_hitcount_packet(
-                    session_id,
-                    cursor,
-                    HITCOUNT_INTERVAL
+        )
+        connection.commit()
+        try:
+            # Shards next to the database; /tmp may be a RAM disk
+            with tempfile.TemporaryDirectory(
+                dir = os.path.dirname(Config.DB.file_name)
+            ) as directory, dbconn.STATISTICS.phase("hitcount + housekeeping (sharded)"):
+                devshard.build(
+                    connection,
+                    devshard.tasks(
+                        directory,
+                        session_id,
+                        Config.DB.hitcount,
+                        HITCOUNT_ROTATIONS,
+                        HOUSEKEEPING_SAMPLES,
+                        Config.Dev.workers,
+                        seed = Config.Dev.seed
+                    ),
+                    Config.Dev.workers
                 )
+        except Exception as e:
+            print("Sharded content generation failed!")
+            print(e)
+            os._exit(-1)
+    else:
+        # SQL
+        ncols = len(schema.HITCOUNT.data)
+        if Config.DB.hitcount == "table":
+            sql = schema.HITCOUNT.insert
+            transform = None
+        else:
+            fmt = hitblob.FORMATS[Config.DB.hitcount]
+            sql = schema.HITCOUNT_PACKED.insert
+            transform = lambda block: hitblob.block_rows(block, fmt)
+        # Generate sci data rotations
+        print("Creating {} rotations of hitcount data...".format(
+                HITCOUNT_ROTATIONS
             )
-    except:
-        print("hitcount table content generation failed!")
-        print(sql)
-        os._exit(-1)
-    print("\r100.00 %      ")
-    connection.commit()
+        )
+        try:
+            with dbconn.STATISTICS.phase("hitcount"):
+                devdata.populate(
+                    connection,
+                    sql,
+                    devdata.generate_hitcount_packets(
+                        session_id,
+                        ncols,
+                        HITCOUNT_ROTATIONS,
+                        interval    = HITCOUNT_INTERVAL,
+                        seed        = Config.Dev.seed
+                    ),
+                    HITCOUNT_ROTATIONS,
+                    transform = transform
+                )
+        except:
+            print("hitcount table content generation failed!")
+            print(sql)
+            os._exit(-1)
+
+        print("Building hitcount rollups...", end="", flush=True)
+        with dbconn.STATISTICS.phase("hitcount rollups"):
+            rollup.rebuild(connection, session_id)
+        print("done!")
 
 
 
     #
     # Table 'pulseheight' content
     #
-    class excel_finnish(csv.Dialect):
-        """Describe the properties of Finnish locale Excel-generated CSV files."""
-        delimiter = ';'
-        quotechar = '"'
-        doublequote = True
-        skipinitialspace = False
-        lineterminator = '\r\n'
-        quoting = csv.QUOTE_MINIMAL
-
-    csv.register_dialect("excel-finnish", excel_finnish)
-
-    # # First clear out existing data - not needed. Always new datafile
-    # try:
-    #     cursor.execute("DELETE FROM pulseheight")
-    # except sqlite3.Error as e:
-    #     print(str(e))
-    #     os._exit(-1)
-
     session_id = get_session(cursor)
 
-    sql = """
-        INSERT INTO pulseheight (
-            timestamp,
-            session_id,
-            ac1,
-            d1a,
-            d1b,
-            d1c,
-            d2a,
-            d2b,
-            d3,
-            ac2
-        )
-        VALUES (
-            ?,
-            ?,
-            ?,
-            ?,
-            ?,
-            ?,
-            ?,
-            ?,
-            ?,
-            ?
-        )
-    """
-
-    print("Importing sample pulseheight data...", end="", flush=True)
-    with open(PULSEHEIGHT_CSVFILE, 'r') as csvfile:
-        reader = csv.reader(csvfile, dialect='excel-finnish')
-
-        # Skip two first rows
-        header = next(reader, None)
-        header = next(reader, None)
-
-        # Selected columns 20 - 28, range() is [a, b[ 
-        included_cols = [x for x in range(20,29)]
-
-        ts_first = time.time()
-        for index, row in enumerate(reader):
-            # import pdb; pdb.set_trace()
-            content = list(int(row[i], 2) if i == 20 else int(row[i]) for i in included_cols)
-
-            cursor.execute(
-                sql,
-                (
-                    int(ts_first + index * PULSEHEIGHT_INTERVAL),
-                    session_id,
-                    content[1],
-                    content[2],
-                    content[3],
-                    content[4],
-                    content[5],
-                    content[6],
-                    content[7],
-                    content[8]
-                )
+    print("Importing sample pulseheight data...")
+    try:
+        with dbconn.STATISTICS.phase("pulseheight"):
+            csvimport.import_pulseheight(
+                connection,
+                PULSEHEIGHT_CSVFILE,
+                session_id,
+                interval = PULSEHEIGHT_INTERVAL,
+                storage  = Config.DB.pulseheight
             )
-    connection.commit()
-    print("done!")
+    except:
+        print("pulseheight sample data import failed!")
+        os._exit(-1)
 
 
 
@@ -863,42 +601,43 @@ if __name__ == '__main__':
     # cursor.execute("DELETE FROM {}".format(Config.table_name))
     # connection.commit()
 
-    # SQL
-    sql = generate_housekeeping_sql(cursor)
-    # Generate sci data samples
-    print(
-        "Creating {} samples of housekeeping data...".format(
-            HOUSEKEEPING_SAMPLES
-        )
-    )
-    try:
-        for i in range(0, HOUSEKEEPING_SAMPLES):
-            print(
-                "\r{:>6.2f} % ...".format((100*i)/HOUSEKEEPING_SAMPLES),
-                end='',
-                flush=True
+    # Sharded build (above) includes housekeeping
+    if Config.Dev.workers <= 1:
+        # SQL
+        sql = schema.HOUSEKEEPING.insert
+        ncols = len(schema.HOUSEKEEPING.data)
+        # Generate sci data samples
+        print(
+            "Creating {} samples of housekeeping data...".format(
+                HOUSEKEEPING_SAMPLES
             )
-            cursor.execute(
-                sql,
-                generate_housekeeping_packet(
-                    session_id,
-                    cursor,
-                    HOUSEKEEPING_INTERVAL
+        )
+        try:
+            with dbconn.STATISTICS.phase("housekeeping"):
+                devdata.populate(
+                    connection,
+                    sql,
+                    devdata.generate_housekeeping_packets(
+                        session_id,
+                        ncols,
+                        HOUSEKEEPING_SAMPLES,
+                        interval    = HOUSEKEEPING_INTERVAL,
+                        seed        = None if Config.Dev.seed is None else Config.Dev.seed + 1
+                    ),
+                    HOUSEKEEPING_SAMPLES
                 )
-            )
-    except:
-        print("Housekeeping dev content generation failed!")
-        print(sql)
-        os._exit(-1)
-    else:
-        print("\r100.00 %      ")
-    finally:
-        connection.commit()
+        except:
+            print("Housekeeping dev content generation failed!")
+            print(sql)
+            os._exit(-1)
+        finally:
+            connection.commit()
 
 
 
     connection.commit()
     connection.close()
+    dbconn.STATISTICS.report()
     print("Module 'pmdatabase' setup completed!\n")
 
 
@@ -0,0 +1,394 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Online backup and snapshot service.
+#
+# snapshot.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Copying the database file is not safe while it is in use (WAL content
+#   is missed, pages change mid-copy). This service copies it with the
+#   SQLite online backup API, 'pages' pages per step and 'sleep' seconds
+#   between the steps, so the writers are never held up for long.
+#
+#   In WAL mode, the whole copy is made within one read transaction. The
+#   backup is then a consistent snapshot of that moment and writers are
+#   not blocked at all (checkpoints cannot go past the snapshot until the
+#   copy finishes). In rollback journal modes a read lock would block the
+#   writers, so it is taken for each step only. A write between two steps
+#   then restarts the copy from the beginning. After 'max_restarts'
+#   restarts the backup gives up.
+#
+#   Snapshots are written into 'directory' as
+#   '<database>.YYYYmmdd-HHMMSS.sqlite3' every 'interval' seconds, and the
+#   newest 'keep' files are retained. Optionally, the latest snapshot is
+#   also published as a read-only file ('readonly') for heavy historical
+#   queries, which the web UI should open with connect_readonly().
+#
+#   Copies are written into '<filename>.partial' first and renamed once
+#   complete, in journal mode DELETE.
+#
+#   Partitioned databases (see partition.py). The active partition files
+#   listed in the copied 'data_partition' registry are backed up next to
+#   the snapshot (partition.filename() of the snapshot file), and the
+#   registry of the copy is rewritten to point at them before the copy is
+#   renamed into place; a snapshot never attaches the live files. Retired
+#   partitions are left out and keep their registry entries. Each partition
+#   is copied after the main file, in a backup of its own: rows committed
+#   in between may be in a partition copy without being counted in the
+#   snapshot's rollups and histograms. rotate() removes the partition
+#   copies with their snapshot, and publish() copies them along.
+#
+#   Usage:
+#       python3 snapshot.py [--once] [--directory /srv/backup] [--keep 24]
+#                           [--readonly /srv/patemon.snapshot.sqlite3]
+#
+import os
+import re
+import glob
+import time
+import shutil
+import signal
+import sqlite3
+import logging
+import argparse
+import threading
+import collections
+
+import schema
+import partition
+
+
+class Config:
+    log_level       = "INFO"
+    log_file        = None          # None = stderr
+    database        = "/srv/patemon.sqlite3"
+    directory       = "/srv/backup"
+    readonly        = None          # e.g. "/srv/patemon.snapshot.sqlite3"
+    interval        = 3600.0        # seconds between snapshots
+    keep            = 24            # snapshots retained
+    pages           = 256           # pages per backup step
+    sleep           = 0.05          # seconds between backup steps
+    max_restarts    = 10
+    busy_timeout    = 5.0           # seconds
+
+
+log = logging.getLogger("snapshot")
+
+
+Result = collections.namedtuple(
+    "Result",
+    ["filename", "bytes", "seconds", "restarts", "partitions"]
+)
+
+
+def _copy(database: str, partial: str, pages: int, sleep: float) -> tuple:
+    """Copy 'database' into 'partial' with the online backup API. Returns
+    (bytes, seconds, restarts)."""
+    if os.path.exists(partial):
+        os.remove(partial)
+    restarts = 0
+    remaining = None
+    def progress(status, left, total):
+        nonlocal restarts, remaining
+        if remaining is not None and left > remaining:
+            restarts += 1
+            if restarts > Config.max_restarts:
+                raise RuntimeError(
+                    "Backup restarted {} times; database is written too often".format(
+                        restarts
+                    )
+                )
+        remaining = left
+        if left:
+            # backup() itself sleeps only when the source is busy
+            time.sleep(sleep)
+    source = sqlite3.connect(
+        database, timeout = Config.busy_timeout, isolation_level = None
+    )
+    target = sqlite3.connect(partial)
+    start = time.perf_counter()
+    try:
+        wal = source.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        if wal:
+            # Copy from one read transaction (snapshot); see module header
+            source.execute("BEGIN")
+            source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        source.backup(target, pages = pages, progress = progress)
+        if wal:
+            source.execute("COMMIT")
+        seconds = time.perf_counter() - start
+        target.execute("PRAGMA journal_mode = DELETE")
+        size = (
+            target.execute("PRAGMA page_count").fetchone()[0] *
+            target.execute("PRAGMA page_size").fetchone()[0]
+        )
+    except:
+        target.close()
+        os.remove(partial)
+        raise
+    finally:
+        source.close()
+    target.close()
+    return size, seconds, restarts
+
+
+def _relocate(copy: str, filename: str, copier) -> list:
+    """Copy the active partitions registered in database file 'copy' with
+    copier(source, target) next to 'filename', and point the registry of
+    'copy' at them. Returns the copier() results."""
+    results = []
+    connection = sqlite3.connect(copy)
+    try:
+        if not connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'data_partition'"
+        ).fetchone():
+            return results
+        for name, path in connection.execute(
+            "SELECT name, filename FROM data_partition WHERE retired IS NULL"
+        ).fetchall():
+            target = partition.filename(filename, name)
+            if os.path.exists(path):
+                results.append(copier(path, target + ".partial"))
+                os.replace(target + ".partial", target)
+            connection.execute(
+                "UPDATE data_partition SET filename = ? WHERE name = ?",
+                (target, name)
+            )
+        connection.commit()
+    finally:
+        connection.close()
+    return results
+
+
+def backup(
+    database: str,
+    filename: str,
+    pages: int = None,
+    sleep: float = None
+) -> Result:
+    """Copy 'database' and its active partitions into 'filename' (and its
+    partition files) with the online backup API."""
+    pages = pages or Config.pages
+    sleep = Config.sleep if sleep is None else sleep
+    partial = filename + ".partial"
+    size, seconds, restarts = _copy(database, partial, pages, sleep)
+    def copier(path, target):
+        return (target[:-len(".partial")],) + _copy(path, target, pages, sleep)
+    try:
+        copies = _relocate(partial, filename, copier)
+    except:
+        os.remove(partial)
+        raise
+    os.replace(partial, filename)
+    return Result(
+        filename,
+        size + sum(c[1] for c in copies),
+        seconds + sum(c[2] for c in copies),
+        restarts + sum(c[3] for c in copies),
+        [c[0] for c in copies]
+    )
+
+
+def snapshots(database: str, directory: str) -> list:
+    """Snapshot files of 'database' in 'directory', oldest first (not their
+    partition files)."""
+    base, ext = os.path.splitext(os.path.basename(database))
+    pattern = re.compile(re.escape(base) + r"\.\d{8}-\d{6}" + re.escape(ext) + "$")
+    return sorted(
+        filename
+        for filename in glob.glob(os.path.join(directory, "{}.*{}".format(base, ext)))
+        if pattern.match(os.path.basename(filename))
+    )
+
+
+def rotate(database: str, directory: str, keep: int) -> list:
+    """Remove all but the newest 'keep' snapshots, with their partition
+    files. Returns removed snapshot files."""
+    removed = snapshots(database, directory)[:-keep or None]
+    for filename in removed:
+        for path in glob.glob(partition.filename(glob.escape(filename), "*")):
+            os.remove(path)
+        os.remove(filename)
+    return removed
+
+
+def _readonly(source: str, target: str):
+    shutil.copyfile(source, target)
+    os.chmod(target, 0o444)
+
+
+def publish(filename: str, readonly: str):
+    """Replace 'readonly' (and its partition files) with a read-only copy of
+    a finished snapshot. Connections to the previous file keep reading it
+    until they reconnect."""
+    shutil.copyfile(filename, readonly + ".partial")
+    _relocate(readonly + ".partial", readonly, _readonly)
+    os.chmod(readonly + ".partial", 0o444)
+    os.replace(readonly + ".partial", readonly)
+
+
+def connect_readonly(filename: str = None):
+    """Connect to the read-only snapshot. The file never changes in place,
+    so SQLite can skip all locking (immutable)."""
+    connection = sqlite3.connect(
+        "file:{}?immutable=1".format(filename or Config.readonly), uri = True
+    )
+    schema.register(connection)
+    return connection
+
+
+class Service:
+    """Snapshot scheduler. Call run() to loop until stop() is called."""
+    def __init__(self, database: str):
+        self.database   = database
+        self.stopped    = threading.Event()
+        self.restarts   = 0         # total, all snapshots
+        self.failures   = 0
+
+    def step(self) -> Result:
+        """Take one snapshot, rotate and publish it."""
+        if Config.directory:
+            os.makedirs(Config.directory, exist_ok = True)
+            base, ext = os.path.splitext(os.path.basename(self.database))
+            filename = os.path.join(
+                Config.directory,
+                "{}.{}{}".format(base, time.strftime("%Y%m%d-%H%M%S"), ext)
+            )
+        else:
+            filename = Config.readonly
+        result = backup(self.database, filename)
+        self.restarts += result.restarts
+        log.info(
+            "Snapshot '{}': {:.1f} MB in {:.1f} s ({:.1f} MB/s), {} restarts".format(
+                result.filename,
+                result.bytes / 2**20,
+                result.seconds,
+                result.bytes / 2**20 / max(result.seconds, 1e-6),
+                result.restarts
+            )
+        )
+        if not Config.directory:
+            for path in [filename] + result.partitions:
+                os.chmod(path, 0o444)
+        else:
+            for removed in rotate(self.database, Config.directory, Config.keep):
+                log.info("Snapshot '{}' removed".format(removed))
+            if Config.readonly:
+                publish(filename, Config.readonly)
+        if Config.readonly:
+            log.info("Read-only snapshot '{}' updated".format(Config.readonly))
+        return result
+
+    def run(self, once: bool = False):
+        while not self.stopped.is_set():
+            try:
+                self.step()
+            except (sqlite3.Error, RuntimeError, OSError) as e:
+                self.failures += 1
+                log.error("Snapshot failed: {}".format(e))
+            if once:
+                break
+            self.stopped.wait(Config.interval)
+
+    def stop(self, *args):
+        self.stopped.set()
+
+
+##############################################################################
+#
+# MAIN
+#
+##############################################################################
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description = "PATE Monitor database online backup and snapshot service."
+    )
+    parser.add_argument(
+        '-l',
+        '--log',
+        help    = "Set logging level. Default: '{}'".format(Config.log_level),
+        choices = ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
+        dest    = "log_level",
+        default = Config.log_level,
+        type    = str.upper,
+        metavar = "LEVEL"
+    )
+    parser.add_argument(
+        '-d',
+        '--database',
+        help    = "Database file. Default: '{}'".format(Config.database),
+        dest    = "database",
+        default = Config.database
+    )
+    parser.add_argument(
+        '--directory',
+        help    = "Snapshot directory ('' for none). Default: '{}'".format(
+            Config.directory
+        ),
+        default = Config.directory
+    )
+    parser.add_argument(
+        '--keep',
+        help    = "Snapshots to retain. Default: {}".format(Config.keep),
+        default = Config.keep,
+        type    = int
+    )
+    parser.add_argument(
+        '--interval',
+        help    = "Seconds between snapshots. Default: {}".format(Config.interval),
+        default = Config.interval,
+        type    = float
+    )
+    parser.add_argument(
+        '--readonly',
+        help    = "Also publish the latest snapshot as this read-only file.",
+        default = Config.readonly
+    )
+    parser.add_argument(
+        '--pages',
+        help    = "Pages per backup step. Default: {}".format(Config.pages),
+        default = Config.pages,
+        type    = int
+    )
+    parser.add_argument(
+        '--sleep',
+        help    = "Seconds between backup steps. Default: {}".format(Config.sleep),
+        default = Config.sleep,
+        type    = float
+    )
+    parser.add_argument(
+        '--once',
+        help    = "Take one snapshot and exit.",
+        action  = 'store_true'
+    )
+    args = parser.parse_args()
+    Config.directory    = args.directory
+    Config.keep         = args.keep
+    Config.interval     = args.interval
+    Config.readonly     = args.readonly
+    Config.pages        = args.pages
+    Config.sleep        = args.sleep
+    if not Config.directory and not Config.readonly:
+        parser.error("Nothing to do; give --directory and/or --readonly")
+
+    logging.basicConfig(
+        level       = getattr(logging, args.log_level),
+        filename    = Config.log_file,
+        format      = "%(asctime)s.%(msecs)03d %(levelname)s: %(message)s",
+        datefmt     = "%H:%M:%S"
+    )
+
+    service = Service(args.database)
+    signal.signal(signal.SIGTERM, service.stop)
+    signal.signal(signal.SIGINT, service.stop)
+    log.info("Taking snapshots of '{}'".format(args.database))
+    service.run(args.once)
+    if service.failures and args.once:
+        os._exit(1)
+
+
+# EOF
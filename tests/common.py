@@ -0,0 +1,34 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Shared setup for the regression tests.
+#
+# tests/common.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Test modules import this before the modules under test; it puts the
+#   repository root on sys.path:
+#
+#       import common
+#       import schema
+#
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import schema
+
+
+def database(connection, sessions: int = 1, hitcount: str = "table"):
+    """Create the schema, one PATE and 'sessions' testing sessions."""
+    schema.create(connection, hitcount)
+    connection.execute("INSERT INTO pate (id_min, id_max, label) VALUES (0, 1, 'test')")
+    for _ in range(sessions):
+        connection.execute(
+            "INSERT INTO testing_session (started, pate_id, pate_firmware) VALUES ('', 1, '')"
+        )
+
+
+# EOF
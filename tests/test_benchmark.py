@@ -0,0 +1,94 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Smoke test for the workload replay benchmark.
+#
+# tests/test_benchmark.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Run from the repository root:
+#       python3 -m unittest discover -s tests
+#
+import os
+import json
+import sqlite3
+import logging
+import tempfile
+import unittest
+import contextlib
+
+import common
+import profiles
+import benchmark
+
+
+class SmokeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.config = (benchmark.Config.duration, benchmark.Config.speedup)
+        benchmark.Config.duration = 1.0
+        benchmark.Config.speedup  = 20.0
+        logging.disable(logging.INFO)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        benchmark.Config.duration, benchmark.Config.speedup = self.config
+        self.directory.cleanup()
+
+    def test_tiny_matrix(self):
+        settings = list(benchmark.matrix(["wal"], ["NORMAL"], ["walmaint"]))
+        self.assertEqual(len(settings), 1)
+        results = [benchmark.run(s) for s in settings]
+        with open(os.devnull, "w") as null, contextlib.redirect_stdout(null):
+            benchmark.report(results[0])
+        with open(benchmark.write(results, self.directory.name)) as file:
+            data = json.load(file)
+        self.assertEqual(
+            set(data), {"created", "sqlite_version", "python_version", "runs"}
+        )
+        run, = data["runs"]
+        self.assertEqual(set(run), {"settings", "wal_size", "errors", "operations"})
+        self.assertEqual(run["errors"], [])
+        self.assertEqual(run["settings"]["profile"], benchmark.Config.profile)
+        # Sampled before walmaint's final TRUNCATE checkpoint
+        self.assertGreater(run["wal_size"], 0)
+        self.assertEqual(
+            set(run["operations"]),
+            {
+                "psu_update", "command_claim", "hitcount_insert",
+                "pulseheight_insert", "dashboard_read", "command_insert"
+            }
+        )
+        for op, values in run["operations"].items():
+            with self.subTest(op = op):
+                self.assertEqual(
+                    set(values),
+                    {
+                        "count", "busy", "throughput", "mean_ms",
+                        "p50_ms", "p95_ms", "p99_ms", "max_ms"
+                    }
+                )
+                self.assertGreater(values["count"], 0)
+
+    def test_database_has_the_profile(self):
+        filename = os.path.join(self.directory.name, "patemon.sqlite3")
+        settings = next(benchmark.matrix(["delete"], ["FULL"], ["auto"]))
+        benchmark.create_database(filename, settings)
+        connection = sqlite3.connect(filename)
+        applied = profiles.apply(connection)
+        self.assertEqual(applied["synchronous"], "FULL")
+        self.assertEqual(
+            applied["cache_size"], str(profiles.PROFILES["PRD"]["cache_size"])
+        )
+        self.assertEqual(connection.execute("PRAGMA journal_mode").fetchone()[0], "delete")
+        self.assertEqual(connection.execute("PRAGMA page_size").fetchone()[0], 16384)
+        connection.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# EOF
@@ -0,0 +1,101 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Regression tests for the range read block cache.
+#
+# tests/test_blockcache.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Run from the repository root:
+#       python3 -m unittest discover -s tests
+#
+import time
+import sqlite3
+import unittest
+
+import common
+import schema
+import blockcache
+
+
+DAY = blockcache.BLOCK_SECONDS["housekeeping"]
+
+
+class InvalidateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = sqlite3.connect(":memory:")
+        common.database(self.connection)
+        self.cache = blockcache.BlockCache()
+        # Past, closed block and today's open block
+        self.past = (int(time.time()) // DAY - 10) * DAY
+        self.today = int(time.time()) // DAY * DAY
+        self.insert(self.past + 600, self.past + 1200, self.today)
+
+    def tearDown(self):
+        self.connection.close()
+
+    def insert(self, *timestamps):
+        self.connection.executemany(
+            schema.HOUSEKEEPING.insert,
+            [(t, 1) + (0,) * len(schema.HOUSEKEEPING.data) for t in timestamps]
+        )
+        self.connection.commit()
+
+    def timestamps(self, begin: int) -> list:
+        timestamps, data = self.cache.query(
+            self.connection, "housekeeping", 1, begin, begin + DAY
+        )
+        return timestamps.tolist()
+
+    def values(self, begin: int) -> list:
+        timestamps, data = self.cache.query(
+            self.connection, "housekeeping", 1, begin, begin + DAY
+        )
+        return data[:, 0].tolist()
+
+    def test_past_block_is_revalidated(self):
+        self.assertEqual(self.timestamps(self.past), [self.past + 600, self.past + 1200])
+        self.assertEqual(self.timestamps(self.past), [self.past + 600, self.past + 1200])
+        # Imported into the past, by another process
+        self.insert(self.past + 900)
+        self.assertEqual(
+            self.timestamps(self.past), [self.past + 600, self.past + 900, self.past + 1200]
+        )
+        self.assertEqual(
+            (self.cache.stats["misses"], self.cache.stats["hits"], self.cache.stats["reloads"]),
+            (1, 1, 1)
+        )
+
+    def test_invalidate(self):
+        self.timestamps(self.past)
+        self.connection.execute(
+            "UPDATE housekeeping SET {} = 1 WHERE timestamp = ?".format(
+                schema.HOUSEKEEPING.data[0]
+            ),
+            (self.past + 600,)
+        )
+        self.connection.commit()
+        self.assertEqual(self.values(self.past), [0, 0])
+        # Other sessions and blocks are left as they are
+        self.cache.invalidate("housekeeping", 2, self.past + 600)
+        self.cache.invalidate("housekeeping", 1, self.past + DAY)
+        self.assertEqual(self.values(self.past), [0, 0])
+        self.cache.invalidate("housekeeping", 1, self.past + 600)
+        self.assertEqual(self.values(self.past), [1, 0])
+        self.assertEqual(self.cache.stats["misses"], 2)
+
+    def test_open_block_is_revalidated(self):
+        self.assertEqual(self.timestamps(self.today), [self.today])
+        self.assertEqual(self.timestamps(self.today), [self.today])
+        self.assertEqual(self.cache.stats["hits"], 1)
+        self.insert(self.today + 1)
+        self.assertEqual(self.timestamps(self.today), [self.today, self.today + 1])
+        self.assertEqual(self.cache.stats["reloads"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# EOF
@@ -0,0 +1,142 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Regression tests for the command queue and its notifications.
+#
+# tests/test_cmdqueue.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Run from the repository root:
+#       python3 -m unittest discover -s tests
+#
+import os
+import grp
+import stat
+import socket
+import sqlite3
+import tempfile
+import unittest
+
+import common
+import cmdqueue
+
+
+class DirectoryTest(unittest.TestCase):
+    """Listener sockets in a temporary directory, group of the test user."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.config = (cmdqueue.Config.directory, cmdqueue.Config.group)
+        cmdqueue.Config.directory = os.path.join(self.directory.name, "command")
+        cmdqueue.Config.group = grp.getgrgid(os.getgid()).gr_name
+
+    def tearDown(self):
+        cmdqueue.Config.directory, cmdqueue.Config.group = self.config
+        self.directory.cleanup()
+
+
+class ListenerTest(DirectoryTest):
+
+    def test_directory_and_socket_are_shared_with_group(self):
+        with cmdqueue.Listener("PSU") as listener:
+            st = os.stat(cmdqueue.Config.directory)
+            self.assertEqual(stat.S_IMODE(st.st_mode), cmdqueue.Config.directory_mode)
+            self.assertEqual(st.st_gid, os.getgid())
+            st = os.stat(listener.path)
+            self.assertEqual(stat.S_IMODE(st.st_mode), cmdqueue.Config.mode)
+            self.assertEqual(cmdqueue.notify("PSU"), 1)
+            self.assertTrue(listener.wait(1.0))
+
+    def test_submit_wakes_listeners_of_the_interface(self):
+        connection = sqlite3.connect(":memory:")
+        common.database(connection)
+        with cmdqueue.Listener("PSU") as psu, cmdqueue.Listener("UI") as ui, \
+             cmdqueue.Listener() as wildcard:
+            cmdqueue.submit(connection, 1, "PSU", "SET VOLTAGE", "5.0")
+            self.assertTrue(psu.wait(1.0))
+            self.assertTrue(wildcard.wait(1.0))
+            self.assertFalse(ui.wait(0.1))
+            # Notifications are consumed
+            self.assertFalse(psu.wait(0.1))
+        connection.close()
+
+    def test_two_listeners_of_one_interface(self):
+        with cmdqueue.Listener("PSU") as first:
+            with cmdqueue.Listener("PSU") as second:
+                self.assertNotEqual(first.path, second.path)
+                self.assertEqual(cmdqueue.notify("PSU"), 2)
+                self.assertTrue(first.wait(1.0))
+                self.assertTrue(second.wait(1.0))
+            # Closing one leaves the other listening
+            self.assertTrue(os.path.exists(first.path))
+            self.assertEqual(cmdqueue.notify("PSU"), 1)
+            self.assertTrue(first.wait(1.0))
+
+    def test_stale_socket_is_removed(self):
+        path = os.path.join(cmdqueue.Config.directory, "PSU.1.sock")
+        with cmdqueue.Listener("PSU") as listener:
+            stale = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            stale.bind(path)
+            stale.close()
+            self.assertEqual(cmdqueue.notify("PSU"), 1)
+            self.assertFalse(os.path.exists(path))
+            self.assertTrue(os.path.exists(listener.path))
+
+
+class ClaimTest(DirectoryTest):
+
+    def setUp(self):
+        super().setUp()
+        self.connection = sqlite3.connect(":memory:")
+        common.database(self.connection)
+        self.ids = [
+            cmdqueue.submit(self.connection, 1, interface, command)
+            for interface, command in (("PSU", "ON"), ("UI", "RESET"), ("PSU", "OFF"))
+        ]
+        self.returning = cmdqueue._RETURNING
+
+    def tearDown(self):
+        cmdqueue._RETURNING = self.returning
+        self.connection.close()
+        super().tearDown()
+
+    def claims(self, interface: str = None) -> list:
+        claimed = []
+        while True:
+            row = cmdqueue.claim(self.connection, interface)
+            if row is None:
+                return claimed
+            claimed.append(dict(zip(cmdqueue.COLUMNS, row)))
+
+    def test_oldest_first_per_interface(self):
+        for returning in (True, False):
+            if returning and not self.returning:
+                continue
+            with self.subTest(returning = returning):
+                cmdqueue._RETURNING = returning
+                self.connection.execute("UPDATE command SET handled = NULL")
+                self.connection.commit()
+                psu = self.claims("PSU")
+                self.assertEqual([c["id"] for c in psu], [self.ids[0], self.ids[2]])
+                self.assertEqual([c["command"] for c in psu], ["ON", "OFF"])
+                self.assertEqual([c["value"] for c in psu], ["", ""])
+                self.assertEqual([c["id"] for c in self.claims()], [self.ids[1]])
+                self.assertIsNone(cmdqueue.claim(self.connection))
+
+    def test_complete_records_result(self):
+        command = cmdqueue.claim(self.connection, "UI")
+        cmdqueue.complete(self.connection, command[0], "OK")
+        self.assertEqual(
+            self.connection.execute(
+                "SELECT id, result FROM command WHERE handled IS NOT NULL"
+            ).fetchall(),
+            [(self.ids[1], "OK")]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# EOF
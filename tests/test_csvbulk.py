@@ -0,0 +1,203 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Regression tests for calibration CSV bulk import.
+#
+# tests/test_csvbulk.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Run from the repository root:
+#       python3 -m unittest discover -s tests
+#
+import os
+import time
+import queue
+import hashlib
+import numpy
+import sqlite3
+import tempfile
+import unittest
+import contextlib
+import multiprocessing
+
+import common
+import schema
+import csvbulk
+import csvimport
+import phhist
+import partition
+
+
+INTERVAL = 15
+
+
+class AllotTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "calibration.csv")
+        open(self.filename, "w").close()
+        self.mtime = int(time.time()) - 3600
+        os.utime(self.filename, (self.mtime, self.mtime))
+        self.connection = sqlite3.connect(":memory:")
+        common.database(self.connection)
+        # Live data around the file modification time
+        self.live = list(range(self.mtime - 20 * INTERVAL, self.mtime + 20 * INTERVAL, INTERVAL))
+        self.connection.executemany(
+            schema.PULSEHEIGHT.insert, [(t, 1) + (0,) * 8 for t in self.live]
+        )
+        self.connection.commit()
+        self.importer = csvbulk.Importer(self.connection, interval = INTERVAL, log = lambda text: None)
+
+    def tearDown(self):
+        self.connection.close()
+        self.directory.cleanup()
+
+    def test_chunks_are_binned_in_the_importer_layout(self):
+        importer = csvbulk.Importer(
+            self.connection,
+            interval = INTERVAL,
+            layout = phhist.parse_layout("2"),
+            log = lambda text: None
+        )
+        entry = csvbulk._File(self.filename, "0" * 64)
+        importer.begin(entry, 5)
+        importer.chunk(entry, 0, numpy.ones((5, len(phhist.DETECTORS)), dtype = numpy.int64))
+        self.assertEqual(
+            self.connection.execute(
+                """
+                SELECT DISTINCT width, bin, count FROM pulseheight_histogram
+                WHERE session_id = ?
+                """,
+                (entry.session_id,)
+            ).fetchall(),
+            [(2, 0, 5)]
+        )
+
+    def test_spans_are_in_the_past_and_free(self):
+        spans = []
+        for sha256 in ("a", "b"):
+            entry = csvbulk._File(self.filename, sha256)
+            self.importer.begin(entry, 50)
+            self.importer.chunk(entry, 0, numpy.ones((50, 8), dtype = numpy.int64))
+            spans.append((entry.start, entry.start + 49 * INTERVAL))
+        self.assertLess(spans[0][1], self.live[0])
+        self.assertLess(spans[1][1], spans[0][0])
+        self.assertEqual(
+            self.connection.execute("SELECT COUNT(*) FROM pulseheight").fetchone()[0],
+            len(self.live) + 100
+        )
+
+    def test_partitioned_rows_are_occupied(self):
+        # Partition files are created next to the database file
+        self.connection.close()
+        self.connection = sqlite3.connect(os.path.join(self.directory.name, "test.sqlite3"))
+        common.database(self.connection)
+        self.connection.commit()
+        self.importer = csvbulk.Importer(self.connection, interval = INTERVAL, log = lambda text: None)
+        self.connection.isolation_level = None
+        router = partition.Router(self.connection, "month")
+        rows = [[self.live[0] - 100 * INTERVAL, 1] + [0] * 8]
+        router.prepare(rows)
+        self.connection.execute("BEGIN")
+        router.insert(schema.PULSEHEIGHT, rows)
+        self.connection.execute("COMMIT")
+        self.connection.isolation_level = ""
+        start = self.importer._allot(self.live[0] - 1, 200)
+        self.assertLess(start + 199 * INTERVAL, rows[0][0])
+        router.detach_all()
+
+
+class ParseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "calibration.csv")
+        row = ";" * csvimport.CSV_STATUS_COLUMN + "10000000;1;2;3;4;5;6;7;8\r\n"
+        # Second event has a quoted note with a line break
+        self.data = (
+            "header\r\n" * csvimport.CSV_HEADER_ROWS + row +
+            '"two\r\nlines"' + row + row
+        ).encode()
+        with open(self.filename, "wb") as file:
+            file.write(self.data)
+        self.messages = queue.Queue()
+        self.ledger = {}
+        csvbulk._initialize(self.messages, self.ledger, [0])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def parse(self) -> list:
+        csvbulk._parse(csvbulk.Task(0, self.filename, 2))
+        messages = []
+        while not self.messages.empty():
+            messages.append(self.messages.get())
+        return messages
+
+    def test_hash_and_events(self):
+        messages = self.parse()
+        sha256 = hashlib.sha256(self.data).hexdigest()
+        self.assertEqual(messages[0], ("begin", 0, sha256, 3))
+        self.assertEqual([m[2] for m in messages[1:-1]], [0, 2])
+        self.assertEqual(
+            sum(len(m[3]) for m in messages[1:-1]),
+            sum(len(chunk) for chunk in csvimport.read_chunks(self.filename))
+        )
+        self.assertEqual(messages[-1], ("end", 0))
+
+    def test_resume_and_skip(self):
+        sha256 = hashlib.sha256(self.data).hexdigest()
+        self.ledger[sha256] = (2, False)
+        messages = self.parse()
+        self.assertEqual([m[:3] for m in messages[1:-1]], [("chunk", 0, 2)])
+        self.ledger[sha256] = (3, True)
+        self.assertEqual(self.parse(), [("skip", 0, sha256)])
+
+
+def _die(chunk):
+    # Flush the "begin" message first; exiting while the queue feeder
+    # thread writes it would leave a partial message in the pipe
+    csvbulk._queue.close()
+    csvbulk._queue.join_thread()
+    os._exit(1)
+
+
+@unittest.skipUnless(
+    multiprocessing.get_start_method() == "fork", "workers must inherit the patched parser"
+)
+class RunTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filenames = []
+        for name, rows in (("crash.csv", 3), ("header.csv", 0)):
+            filename = os.path.join(self.directory.name, name)
+            with open(filename, "w") as file:
+                file.write("header\n" * csvimport.CSV_HEADER_ROWS)
+                file.write("0;1;2;3;4;5;6;7;8;9;10;11;12\n" * rows)
+            self.filenames.append(filename)
+        self.connection = sqlite3.connect(":memory:")
+        common.database(self.connection)
+        self.parse_chunk = csvimport.parse_chunk
+        csvimport.parse_chunk = _die
+
+    def tearDown(self):
+        csvimport.parse_chunk = self.parse_chunk
+        self.connection.close()
+        self.directory.cleanup()
+
+    def test_worker_that_dies_fails_its_file(self):
+        with open(os.devnull, "w") as null, contextlib.redirect_stdout(null):
+            result = csvbulk.run(
+                self.connection, self.filenames, workers = 2, log = lambda text: None
+            )
+        self.assertEqual((result.files, result.imported, result.failed), (2, 1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# EOF
@@ -0,0 +1,57 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Regression tests for calibration CSV parsing.
+#
+# tests/test_csvimport.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Run from the repository root:
+#       python3 -m unittest discover -s tests
+#
+import numpy
+import unittest
+
+import common
+import csvimport
+
+
+def _row(status: str, adc: list) -> list:
+    return [""] * csvimport.CSV_STATUS_COLUMN + [status] + adc
+
+
+class ParseTest(unittest.TestCase):
+
+    def test_binary(self):
+        values = numpy.array(["10000000", "1", "0", "101"])
+        self.assertEqual(csvimport.parse_binary(values).tolist(), [128, 1, 0, 5])
+
+    def test_binary_rejects_other_characters(self):
+        for value in ("102", "1 1", "-1", "10a", "1,0"):
+            with self.assertRaises(ValueError):
+                csvimport.parse_binary(numpy.array(["1", value]))
+
+    def test_binary_rejects_empty_values(self):
+        for value in ("", " ", "\t"):
+            with self.assertRaises(ValueError):
+                csvimport.parse_binary(numpy.array(["1", value]))
+
+    def test_decimal_comma(self):
+        values = numpy.array(["689,1", "0,5", "-2,6", "12"])
+        self.assertEqual(csvimport.parse_decimal(values).tolist(), [689, 0, -3, 12])
+
+    def test_chunk(self):
+        status, adc = csvimport.parse_chunk([
+            _row("11", ["1,2", "2", "3", "4", "5", "6", "7", "8,7"]),
+            _row("0", ["0"] * 8)
+        ])
+        self.assertEqual(status.tolist(), [3, 0])
+        self.assertEqual(adc.tolist(), [[1, 2, 3, 4, 5, 6, 7, 9], [0] * 8])
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# EOF
@@ -0,0 +1,98 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Regression tests for SQLITE_BUSY handling of instrumented connections.
+#
+# tests/test_dbconn.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Run from the repository root:
+#       python3 -m unittest discover -s tests
+#
+import os
+import time
+import sqlite3
+import tempfile
+import unittest
+import threading
+
+import common
+import dbconn
+
+
+class BusyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.directory.name, "test.sqlite3")
+        self.other = sqlite3.connect(
+            self.database, isolation_level = None, check_same_thread = False
+        )
+        self.other.execute("PRAGMA journal_mode = WAL")
+        self.other.execute("CREATE TABLE t (id INTEGER PRIMARY KEY)")
+        self.connection = dbconn.connect(
+            self.database,
+            busy_timeout    = 2.0,
+            profile         = False,
+            statistics      = dbconn.Statistics(),
+            isolation_level = None
+        )
+
+    def tearDown(self):
+        self.connection.close()
+        self.other.close()
+        self.directory.cleanup()
+
+    def test_transaction_start_waits_for_lock(self):
+        self.other.execute("BEGIN IMMEDIATE")
+        timer = threading.Timer(0.2, self.other.execute, ("COMMIT",))
+        timer.start()
+        self.connection.execute("BEGIN IMMEDIATE")
+        self.connection.execute("INSERT INTO t VALUES (1)")
+        self.connection.execute("COMMIT")
+        timer.join()
+        self.assertEqual(self.connection.execute("SELECT COUNT(*) FROM t").fetchone()[0], 1)
+
+    def test_stale_snapshot_is_not_retried(self):
+        self.connection.execute("BEGIN")
+        self.connection.execute("SELECT COUNT(*) FROM t").fetchall()
+        self.other.execute("INSERT INTO t VALUES (1)")
+        start = time.perf_counter()
+        with self.assertRaises(sqlite3.OperationalError):
+            self.connection.execute("INSERT INTO t VALUES (2)")
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.connection.execute("ROLLBACK")
+
+    def test_timeout_is_the_busy_timeout(self):
+        connection = dbconn.connect(
+            self.database, timeout = 0.2, profile = False, isolation_level = None
+        )
+        self.assertEqual(connection.busy_timeout, 0.2)
+        self.other.execute("BEGIN IMMEDIATE")
+        start = time.perf_counter()
+        with self.assertRaises(sqlite3.OperationalError):
+            connection.execute("BEGIN IMMEDIATE")
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.other.execute("ROLLBACK")
+        connection.close()
+
+    def test_fetches_are_recorded_per_statement(self):
+        self.connection.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(10)])
+        statistics = self.connection.statistics
+        sql = "SELECT id FROM t"
+        self.assertEqual(len(list(self.connection.execute(sql))), 10)
+        cursor = self.connection.execute(sql)
+        self.assertEqual(len(cursor.fetchmany(4)), 4)
+        self.assertEqual(statistics.shapes[sql].rows, 10)
+        cursor.fetchmany(4)
+        cursor.fetchmany(4)
+        self.assertEqual(statistics.shapes[sql].rows, 20)
+        self.assertEqual(statistics.shapes[sql].calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# EOF
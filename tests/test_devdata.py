@@ -0,0 +1,119 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Regression tests for the development content generator.
+#
+# tests/test_devdata.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Run from the repository root:
+#       python3 -m unittest discover -s tests
+#
+import os
+import numpy
+import sqlite3
+import unittest
+import contextlib
+
+import common
+import schema
+import devdata
+
+
+class CommitCounter(sqlite3.Connection):
+    """Connection that remembers total_changes at each commit."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.commits = []
+
+    def commit(self):
+        if self.in_transaction:
+            self.commits.append(self.total_changes)
+        super().commit()
+
+
+class GenerateTest(unittest.TestCase):
+
+    def blocks(self, seed: int) -> list:
+        return list(
+            devdata.generate_hitcount_packets(
+                3, len(schema.HITCOUNT.data), 2500, start = 1000, seed = seed
+            )
+        )
+
+    def test_seeded_blocks_are_reproducible(self):
+        blocks = self.blocks(7)
+        self.assertEqual(
+            [b.shape for b in blocks],
+            [(1024, 2 + len(schema.HITCOUNT.data))] * 2 +
+            [(452, 2 + len(schema.HITCOUNT.data))]
+        )
+        for block, again in zip(blocks, self.blocks(7)):
+            numpy.testing.assert_array_equal(block, again)
+        self.assertFalse(numpy.array_equal(blocks[0], self.blocks(8)[0]))
+        data = numpy.concatenate(blocks)
+        self.assertEqual(data.dtype, numpy.int64)
+        self.assertEqual(
+            data[:, 0].tolist(),
+            list(range(1000, 1000 + 2500 * devdata.HITCOUNT_INTERVAL, devdata.HITCOUNT_INTERVAL))
+        )
+        self.assertTrue((data[:, 1] == 3).all())
+        self.assertGreaterEqual(data[:, 2:].min(), 0)
+        self.assertLess(data[:, 2:].max(), devdata.HITCOUNT_MAXHITS)
+        # 21-bit counters are actually used
+        self.assertGreater(data[:, 2:].max(), 2**20)
+
+    def test_housekeeping_values(self):
+        data = numpy.concatenate(
+            list(
+                devdata.generate_housekeeping_packets(
+                    1, len(schema.HOUSEKEEPING.data), 100, start = 0, seed = 1
+                )
+            )
+        )
+        self.assertEqual(data.shape, (100, 2 + len(schema.HOUSEKEEPING.data)))
+        self.assertEqual(data[1, 0] - data[0, 0], devdata.HOUSEKEEPING_INTERVAL)
+        self.assertEqual(data[:, 2:].min(), 0)
+        self.assertEqual(data[:, 2:].max(), devdata.HOUSEKEEPING_MAXVAL)
+
+
+class PopulateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = sqlite3.connect(":memory:", factory = CommitCounter)
+        common.database(self.connection)
+        self.connection.commit()
+        self.connection.commits.clear()
+        self.changes = self.connection.total_changes
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_rows_and_transactions(self):
+        rows = 2 * devdata.COMMIT_ROWS + 480
+        with open(os.devnull, "w") as null, contextlib.redirect_stdout(null):
+            devdata.populate(
+                self.connection,
+                schema.HOUSEKEEPING.insert,
+                devdata.generate_housekeeping_packets(
+                    1, len(schema.HOUSEKEEPING.data), rows, start = 0, seed = 1
+                ),
+                rows
+            )
+        self.assertEqual(
+            self.connection.execute("SELECT COUNT(*) FROM housekeeping").fetchone()[0],
+            rows
+        )
+        self.assertFalse(self.connection.in_transaction)
+        self.assertEqual(
+            [changes - self.changes for changes in self.connection.commits],
+            [devdata.COMMIT_ROWS, 2 * devdata.COMMIT_ROWS, rows]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# EOF
@@ -0,0 +1,81 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Regression tests for the sharded DEV content build.
+#
+# tests/test_devshard.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Run from the repository root:
+#       python3 -m unittest discover -s tests
+#
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import common
+import rollup
+import devshard
+
+
+START = 1000000
+
+
+class MergeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.connection = sqlite3.connect(os.path.join(self.directory.name, "test.sqlite3"))
+        common.database(self.connection)
+        self.connection.commit()
+        self.tasks = devshard.tasks(
+            self.directory.name, 1, "table", 300, 100, 1, seed = 1, start = START
+        )
+
+    def tearDown(self):
+        self.connection.close()
+        self.directory.cleanup()
+
+    def count(self, table: str) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM " + table).fetchone()[0]
+
+    def rollups(self) -> list:
+        return self.connection.execute(
+            "SELECT * FROM hitcount_rollup ORDER BY resolution, bucket"
+        ).fetchall()
+
+    def test_merge(self):
+        for task in self.tasks:
+            devshard.build_shard(task)
+            self.assertEqual(devshard.merge(self.connection, task), task.count)
+            self.assertFalse(os.path.exists(task.filename))
+        self.assertEqual((self.count("hitcount"), self.count("housekeeping")), (300, 100))
+        merged = self.rollups()
+        rollup.rebuild(self.connection, 1)
+        self.assertEqual(merged, self.rollups())
+
+    def test_conflict_is_rolled_back(self):
+        task = next(t for t in self.tasks if t.table == "hitcount")
+        devshard.build_shard(task)
+        devshard.merge(self.connection, task)
+        rollups = self.rollups()
+        # Same rows again; primary keys conflict
+        devshard.build_shard(task)
+        with self.assertRaises(sqlite3.IntegrityError):
+            devshard.merge(self.connection, task)
+        self.assertFalse(self.connection.in_transaction)
+        self.assertTrue(os.path.exists(task.filename))
+        self.assertEqual(self.count("hitcount"), task.count)
+        self.assertEqual(self.rollups(), rollups)
+        self.assertEqual(
+            [r[1] for r in self.connection.execute("PRAGMA database_list")], ["main"]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# EOF
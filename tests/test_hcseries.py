@@ -0,0 +1,111 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Regression tests for the per-sector hitcount time series.
+#
+# tests/test_hcseries.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Run from the repository root:
+#       python3 -m unittest discover -s tests
+#
+import numpy
+import sqlite3
+import unittest
+
+import common
+import schema
+import hitblob
+import hcseries
+
+
+INTERVAL = schema.HITCOUNT_INTERVAL
+
+
+class OffsetTest(unittest.TestCase):
+
+    def test_sector_start_times(self):
+        self.assertEqual(
+            hcseries.offsets([0, 1, 2, 19, 36], 36.0).tolist(),
+            [0.0, 0.0, 1.0, 18.0, 35.0]
+        )
+        self.assertAlmostEqual(
+            hcseries.offsets([36])[0], 35 * INTERVAL / 36
+        )
+
+
+class SeriesTest(unittest.TestCase):
+    """Long format of two hand-built rotations, counter value = column
+    index (+ 1000 for the second rotation)."""
+
+    def rotations(self, hitcount: str):
+        connection = sqlite3.connect(":memory:")
+        common.database(connection, hitcount = hitcount)
+        counters = [
+            numpy.arange(hitblob.NCOUNTERS),
+            numpy.arange(hitblob.NCOUNTERS) + 1000
+        ]
+        for i, values in enumerate(counters):
+            timestamp = 1000 + i * INTERVAL
+            if hitcount == "table":
+                connection.execute(
+                    schema.HITCOUNT.insert, (timestamp, 1) + tuple(values.tolist())
+                )
+            else:
+                fmt = hitblob.FORMATS[hitcount]
+                connection.execute(
+                    schema.HITCOUNT_PACKED.insert,
+                    (timestamp, 1, fmt, hitblob.encode(values, fmt))
+                )
+        connection.commit()
+        return connection
+
+    def expected(self) -> list:
+        records = []
+        for rotation, base in ((1000, 0), (1000 + INTERVAL, 1000)):
+            for sector, start in ((0, 0.0), (1, 0.0), (36, 35 * INTERVAL / 36)):
+                for channel in (2, 3):
+                    column = "s{:02}e{:02}".format(sector, channel)
+                    records.append((
+                        rotation + start,
+                        rotation,
+                        sector,
+                        channel,
+                        base + hitblob.COLUMNS.index(column)
+                    ))
+        return records
+
+    def test_long_format_of_both_storages(self):
+        for hitcount in ("table", "uint32"):
+            with self.subTest(hitcount = hitcount):
+                connection = self.rotations(hitcount)
+                chunks = list(
+                    hcseries.iter_series(
+                        connection, 1, (36, 0, 1), "e", (3, 2), chunk_rows = 1
+                    )
+                )
+                self.assertEqual(len(chunks), 2)
+                records = numpy.concatenate(chunks)
+                self.assertEqual(records.dtype, hcseries.LONG)
+                self.assertEqual(len(records), len(self.expected()))
+                for record, expected in zip(records.tolist(), self.expected()):
+                    self.assertAlmostEqual(record[0], expected[0])
+                    self.assertEqual(record[1:], expected[1:])
+                # Range selects rotations by their timestamp
+                self.assertEqual(
+                    set(
+                        hcseries.fetch(
+                            connection, 1, (1,), "e", (2,), begin = 1001
+                        )["rotation"].tolist()
+                    ),
+                    {1000 + INTERVAL}
+                )
+                connection.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# EOF
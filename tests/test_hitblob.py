@@ -0,0 +1,88 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Regression tests for packed hitcount storage.
+#
+# tests/test_hitblob.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Run from the repository root:
+#       python3 -m unittest discover -s tests
+#
+import os
+import numpy
+import sqlite3
+import tempfile
+import unittest
+
+import common
+import schema
+import dbconn
+import hitblob
+
+
+class ViewTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.directory.name, "test.sqlite3")
+        self.counters = numpy.random.default_rng(1).integers(
+            0, hitblob.COUNTER_MAX + 1, (2, hitblob.NCOUNTERS)
+        )
+        connection = sqlite3.connect(self.database)
+        schema.create(connection, "uint32")
+        connection.executemany(
+            schema.HITCOUNT_PACKED.insert,
+            [
+                (1000 + fmt, 1, fmt, hitblob.encode(counters, fmt))
+                for fmt, counters in zip(hitblob.FORMATS.values(), self.counters)
+            ]
+        )
+        connection.commit()
+        connection.close()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_view_reads_both_formats(self):
+        connection = dbconn.connect(self.database, profile = False)
+        try:
+            rows = connection.execute(
+                "SELECT * FROM hitcount ORDER BY timestamp"
+            ).fetchall()
+        finally:
+            connection.close()
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(
+            numpy.array([r[2:] for r in rows]).tolist(), self.counters.tolist()
+        )
+
+    def test_selected_columns_of_both_layouts(self):
+        columns = [hitblob.COLUMNS[i] for i in (0, 5, hitblob.NCOUNTERS - 1)]
+        flat = sqlite3.connect(":memory:")
+        schema.create(flat)
+        flat.executemany(
+            schema.HITCOUNT.insert,
+            [(1000 + i, 1) + tuple(c.tolist()) for i, c in enumerate(self.counters)]
+        )
+        packed = sqlite3.connect(self.database)
+        try:
+            for connection in (flat, packed):
+                with self.subTest(storage = hitblob.storage(connection)):
+                    (timestamps, counters), = hitblob.iter_rotations(
+                        connection, 1, columns = columns
+                    )
+                    self.assertEqual(
+                        counters.tolist(), self.counters[:, [0, 5, -1]].tolist()
+                    )
+        finally:
+            flat.close()
+            packed.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# EOF
@@ -0,0 +1,135 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Regression tests for the group-commit ingest writer.
+#
+# tests/test_ingest.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Run from the repository root:
+#       python3 -m unittest discover -s tests
+#
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import common
+import schema
+import ingest
+import phblob
+import phhist
+
+
+def _rows(table: str, timestamp: int, n: int = 1) -> list:
+    width = ingest.WIDTHS[table]
+    return [[timestamp + i, 1] + [i] * (width - 2) for i in range(n)]
+
+
+class WriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.directory.name, "test.sqlite3")
+        connection = sqlite3.connect(self.database)
+        common.database(connection)
+        connection.commit()
+        connection.close()
+        self.writer = ingest.Writer(self.database)
+
+    def tearDown(self):
+        self.writer.connection.close()
+        self.directory.cleanup()
+
+    def count(self, table: str) -> int:
+        connection = sqlite3.connect(self.database)
+        try:
+            return connection.execute("SELECT COUNT(*) FROM " + table).fetchone()[0]
+        finally:
+            connection.close()
+
+    def test_null_value_rejected_on_submit(self):
+        row = _rows("hitcount", 1000)[0]
+        row[5] = None
+        with self.assertRaises(ValueError):
+            ingest.Submission("hitcount", [row])
+        with self.assertRaises(ValueError):
+            ingest.Submission("housekeeping", [_rows("housekeeping", 1000)[0][:-1] + ["1"]])
+
+    def test_failing_submission_does_not_fail_batch(self):
+        good = ingest.Submission("housekeeping", _rows("housekeeping", 1000, 3))
+        bad = ingest.Submission("hitcount", _rows("hitcount", 2000))
+        def broken(rows):
+            raise TypeError("broken row")
+        self.writer._hitcount = broken
+        self.writer.write([good, bad])
+        self.assertTrue(good.done.is_set() and bad.done.is_set())
+        self.assertIsNone(good.error)
+        self.assertIn("broken row", bad.error)
+        self.assertFalse(self.writer.connection.in_transaction)
+        self.assertEqual(self.count("housekeeping"), 3)
+        self.assertEqual(self.count("hitcount"), 0)
+
+    def test_failed_batch_is_not_acknowledged(self):
+        good = ingest.Submission("housekeeping", _rows("housekeeping", 1000))
+        self.writer.connection.execute("BEGIN")     # BEGIN IMMEDIATE fails
+        self.writer.write([good])
+        self.assertTrue(good.done.is_set())
+        self.assertIsNotNone(good.error)
+        self.assertFalse(self.writer.connection.in_transaction)
+        # Writer keeps working after the failure
+        again = ingest.Submission("housekeeping", _rows("housekeeping", 1000))
+        self.writer.write([again])
+        self.assertIsNone(again.error)
+        self.assertEqual(self.count("housekeeping"), 1)
+
+
+    def test_pulseheight_storage(self):
+        for storage in ("rows", "zlib"):
+            with self.subTest(storage = storage):
+                ingest.Config.pulseheight = storage
+                try:
+                    first = 1000 if storage == "rows" else 2000
+                    submission = ingest.Submission(
+                        "pulseheight", _rows("pulseheight", first, 10)
+                    )
+                    self.writer.write([submission])
+                finally:
+                    ingest.Config.pulseheight = "rows"
+                self.assertIsNone(submission.error)
+        self.assertEqual(self.count("pulseheight"), 10)
+        self.assertEqual(self.count("pulseheight_chunk"), 1)
+        timestamps = [
+            t for ts, adc in phblob.iter_events(self.writer.connection, 1) for t in ts
+        ]
+        self.assertEqual(timestamps, list(range(1000, 1010)) + list(range(2000, 2010)))
+        # Histograms of both
+        self.assertEqual(
+            self.writer.connection.execute(
+                "SELECT SUM(count) FROM pulseheight_histogram WHERE detector = 'ac1'"
+            ).fetchone()[0],
+            20
+        )
+
+    def test_pulseheight_bins(self):
+        ingest.Config.bins = phhist.parse_layout("4")
+        try:
+            self.writer.write(
+                [ingest.Submission("pulseheight", _rows("pulseheight", 1000, 10))]
+            )
+        finally:
+            ingest.Config.bins = None
+        self.assertEqual(
+            self.writer.connection.execute(
+                "SELECT DISTINCT width FROM pulseheight_histogram"
+            ).fetchall(),
+            [(4,)]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# EOF
@@ -0,0 +1,104 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Regression tests for the shared-memory live rings.
+#
+# tests/test_livering.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Run from the repository root:
+#       python3 -m unittest discover -s tests
+#
+import os
+import unittest
+
+import common
+import schema
+import livering
+
+
+CAPACITY = 4
+
+
+def _rows(first: int, n: int) -> list:
+    width = len(schema.HOUSEKEEPING.names)
+    return [[t, 1] + [t % 100] * (width - 2) for t in range(first, first + n)]
+
+
+class RingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.prefix = livering.Config.prefix
+        livering.Config.prefix = "patemon-test-{}.".format(os.getpid())
+        self.publisher = livering.Publisher("housekeeping", CAPACITY)
+        self.reader = livering.Reader("housekeeping")
+
+    def tearDown(self):
+        self.reader.close()
+        self.publisher.close(unlink = True)
+        livering.Config.prefix = self.prefix
+
+    def timestamps(self, rows) -> list:
+        return rows["timestamp"].tolist()
+
+    def test_wraparound_keeps_latest_rows_contiguous(self):
+        self.assertEqual(self.reader.latest(2)[0], 0)
+        self.assertEqual(len(self.reader.latest(2)[1]), 0)
+        for first in range(0, 10, 3):
+            self.publisher.publish(_rows(first, 3))
+        sequence, rows = self.reader.latest(CAPACITY)
+        self.assertEqual(sequence, 12)
+        self.assertEqual(self.timestamps(rows), [8, 9, 10, 11])
+        # A view into the segment, not a copy
+        self.assertFalse(rows.flags.owndata)
+        self.assertEqual(self.timestamps(self.reader.latest(100)[1]), [8, 9, 10, 11])
+        # More rows than the capacity in one call
+        self.publisher.publish(_rows(100, 6))
+        self.assertEqual(self.timestamps(self.reader.latest(3)[1]), [103, 104, 105])
+
+    def test_overwritten_view_is_detected(self):
+        self.publisher.publish(_rows(0, 3))
+        sequence, view = self.reader.latest(3)
+        copy = self.reader.latest(3, copy = True)[1]
+        self.assertTrue(self.reader.valid(sequence, 3))
+        self.publisher.publish(_rows(10, 1))
+        self.assertTrue(self.reader.valid(sequence, 3))
+        self.publisher.publish(_rows(11, 1))
+        # Oldest row of the view has been overwritten
+        self.assertFalse(self.reader.valid(sequence, 3))
+        self.assertTrue(self.reader.valid(sequence, 2))
+        self.assertEqual(self.timestamps(view), [11, 1, 2])
+        self.publisher.publish(_rows(20, 3))
+        self.assertFalse(self.reader.valid(sequence, 1))
+        self.assertEqual(self.timestamps(copy), [0, 1, 2])
+
+    def test_reader_catches_up(self):
+        sequence = self.reader.sequence
+        self.assertFalse(self.reader.wait(sequence, timeout = 0.1))
+        self.publisher.publish(_rows(0, 2))
+        self.assertTrue(self.reader.wait(sequence, timeout = 0.1))
+        sequence, rows = self.reader.since(sequence, copy = True)
+        self.assertEqual((sequence, self.timestamps(rows)), (2, [0, 1]))
+        self.assertEqual(len(self.reader.since(sequence)[1]), 0)
+        # A reader that falls behind by more than the capacity loses rows,
+        # which it sees from the sequence numbers
+        self.publisher.publish(_rows(2, 7))
+        end, rows = self.reader.since(sequence)
+        self.assertEqual(self.timestamps(rows), [5, 6, 7, 8])
+        self.assertEqual(end - sequence - len(rows), 3)
+
+    def test_new_publisher_reuses_segment(self):
+        self.publisher.publish(_rows(0, 3))
+        self.publisher.close()
+        self.publisher = livering.Publisher("housekeeping", CAPACITY)
+        self.assertEqual(self.timestamps(self.reader.latest(3)[1]), [0, 1, 2])
+        self.publisher.publish(_rows(3, 1))
+        self.assertEqual(self.reader.sequence, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# EOF
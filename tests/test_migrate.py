@@ -0,0 +1,179 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Regression tests for in-place schema migrations.
+#
+# tests/test_migrate.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Run from the repository root:
+#       python3 -m unittest discover -s tests
+#
+import os
+import sqlite3
+import unittest
+import contextlib
+from unittest import mock
+
+import common
+import schema
+import devdata
+import migrate
+
+
+TABLE = schema.HOUSEKEEPING
+
+# Tables of databases created before versioning (version 0)
+VERSION0 = (
+    "pate", "testing_session", "hitcount", "pulseheight", "register",
+    "note", "command", "psu", "housekeeping"
+)
+
+
+def _objects(connection) -> list:
+    return connection.execute(
+        "SELECT type, name, sql FROM sqlite_master WHERE name NOT LIKE 'sqlite_%' ORDER BY name"
+    ).fetchall()
+
+
+class UpgradeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = sqlite3.connect(":memory:", isolation_level = None)
+        for table in VERSION0:
+            self.connection.execute(schema.TABLES[table].ddl)
+        self.connection.execute("INSERT INTO pate (id_min, id_max, label) VALUES (0, 1, 'test')")
+        self.connection.execute(
+            "INSERT INTO testing_session (started, pate_id, pate_firmware) VALUES ('', 1, '')"
+        )
+        self.connection.executemany(
+            schema.HITCOUNT.insert,
+            [(t, 1) + (1,) * len(schema.HITCOUNT.data) for t in range(1000, 1600, 15)]
+        )
+
+    def tearDown(self):
+        self.connection.close()
+
+    def upgrade(self):
+        with open(os.devnull, "w") as null, contextlib.redirect_stdout(null):
+            return migrate.upgrade(self.connection)
+
+    def test_version0_upgrades_to_current_schema(self):
+        self.assertEqual(self.upgrade(), schema.VERSION)
+        current = sqlite3.connect(":memory:")
+        schema.create(current)
+        self.assertEqual(_objects(self.connection), _objects(current))
+        current.close()
+        self.assertGreater(
+            self.connection.execute("SELECT COUNT(*) FROM hitcount_rollup").fetchone()[0], 0
+        )
+        self.assertEqual(migrate.pending(self.connection), [])
+        self.assertEqual(self.upgrade(), schema.VERSION)
+
+
+
+class RebuildTest(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = sqlite3.connect(":memory:", isolation_level = None)
+        self.connection.execute(TABLE.ddl)
+        self.insert(range(1000, 1010))
+
+    def tearDown(self):
+        self.connection.close()
+
+    def insert(self, timestamps):
+        self.connection.executemany(
+            TABLE.insert,
+            [(t, 1) + (t,) * len(TABLE.data) for t in timestamps]
+        )
+
+    def rows(self, table: str = TABLE.name) -> list:
+        return self.connection.execute(
+            "SELECT * FROM {} ORDER BY timestamp".format(table)
+        ).fetchall()
+
+    def upgrade(self, chunk_rows: int):
+        with open(os.devnull, "w") as null, contextlib.redirect_stdout(null):
+            return migrate.upgrade(self.connection, chunk_rows)
+
+    def copy(self):
+        with open(os.devnull, "w") as null, contextlib.redirect_stdout(null):
+            migrate.copy(self.connection, TABLE, 4)
+
+    def test_changes_to_copied_rows_are_kept(self):
+        self.copy()
+        # Below the copy point; lost before the triggers
+        self.insert([999])
+        self.connection.execute("UPDATE housekeeping SET s_c00 = -1 WHERE timestamp = 1002")
+        self.connection.execute("UPDATE housekeeping SET timestamp = 2000 WHERE timestamp = 1009")
+        self.connection.execute("DELETE FROM housekeeping WHERE timestamp = 1005")
+        self.insert([1500])
+        self.copy()                         # resume
+        self.insert([998, 3000])
+        expected = self.rows()
+        self.connection.execute("BEGIN IMMEDIATE")
+        migrate.swap(self.connection, TABLE)
+        self.connection.execute("COMMIT")
+        self.assertEqual(self.rows(), expected)
+        self.assertEqual(
+            self.connection.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger'"
+            ).fetchone()[0],
+            0
+        )
+
+    def test_swap_aborts_on_mismatch(self):
+        self.copy()
+        for name in ("ai", "au", "ad"):
+            self.connection.execute("DROP TRIGGER housekeeping_copy_{}".format(name))
+        self.insert([999])
+        expected = self.rows()
+        self.connection.execute("BEGIN IMMEDIATE")
+        with self.assertRaises(ValueError):
+            migrate.swap(self.connection, TABLE)
+        self.connection.execute("ROLLBACK")
+        self.assertEqual(self.rows(), expected)
+        self.assertEqual(len(self.rows("housekeeping_new")), 10)
+
+    def test_interrupted_rebuild_resumes_on_upgrade(self):
+        self.connection.close()
+        self.connection = sqlite3.connect(":memory:", isolation_level = None)
+        common.database(self.connection)
+        self.insert(range(1000, 1030))
+        number = schema.VERSION + 1
+        migrate.migration(number, "Rebuild housekeeping")(
+            lambda connection, chunk_rows: migrate.rebuild(connection, TABLE, chunk_rows)
+        )
+        self.addCleanup(migrate.MIGRATIONS.remove, migrate.MIGRATIONS[-1])
+        def interrupt(done):
+            if done > 8:
+                raise KeyboardInterrupt
+        with mock.patch.object(devdata.Progress, "update", side_effect = interrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                self.upgrade(chunk_rows = 4)
+        self.assertEqual(migrate.version(self.connection), schema.VERSION)
+        self.assertFalse(self.connection.in_transaction)
+        self.assertEqual(len(self.rows("housekeeping_new")), 12)
+        # Written while the upgrade was interrupted
+        self.insert([999, 5000])
+        expected = self.rows()
+        self.assertEqual(self.upgrade(chunk_rows = 4), number)
+        self.assertEqual(self.rows(), expected)
+        self.assertEqual(
+            self.connection.execute(
+                """
+                SELECT name FROM sqlite_master
+                WHERE name = 'housekeeping_new' OR name LIKE 'housekeeping_copy_a_'
+                """
+            ).fetchall(),
+            []
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# EOF
@@ -0,0 +1,81 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Regression tests for the NumPy session export.
+#
+# tests/test_npexport.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Run from the repository root:
+#       python3 -m unittest discover -s tests
+#
+import numpy
+import sqlite3
+import tempfile
+import unittest
+
+import common
+import schema
+import phblob
+import npexport
+
+
+class ExportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.connection = sqlite3.connect(":memory:")
+        common.database(self.connection, sessions = 2)
+        self.expected = {}
+        for table, first in (("hitcount", 1000), ("housekeeping", 2000)):
+            width = len(schema.TABLES[table].data)
+            rows = [
+                [first + i, 1] + [i % 200] * width for i in range(25)
+            ] + [[first + 100, 2] + [0] * width]
+            self.connection.executemany(schema.TABLES[table].insert, rows)
+            self.expected[table] = numpy.array(rows[:-1])
+        # Pulseheight events as rows and in a chunk
+        adc = numpy.arange(40 * 8).reshape(40, 8) % 1000
+        self.connection.executemany(
+            schema.PULSEHEIGHT.insert,
+            [[3000 + i, 1] + adc[i].tolist() for i in range(10)]
+        )
+        phblob.write(self.connection, 1, numpy.arange(3010, 3040), adc[10:])
+        self.expected["pulseheight"] = numpy.column_stack(
+            (numpy.arange(3000, 3040), numpy.ones(40, dtype = int), adc)
+        )
+        self.connection.commit()
+
+    def tearDown(self):
+        self.connection.close()
+        self.directory.cleanup()
+
+    def test_export_and_load(self):
+        manifest = npexport.export(self.connection, 1, self.directory.name, chunk_rows = 7)
+        self.assertFalse(self.connection.in_transaction)
+        for table, rows in self.expected.items():
+            with self.subTest(table = table):
+                timestamps, data, columns = npexport.load(self.directory.name, table)
+                self.assertEqual(manifest["tables"][table]["rows"], len(rows))
+                self.assertEqual(columns, schema.TABLES[table].data)
+                self.assertEqual(data.dtype, npexport.DTYPES[table])
+                self.assertEqual(timestamps.tolist(), rows[:, 0].tolist())
+                self.assertEqual(data.tolist(), rows[:, 2:].tolist())
+
+    def test_callers_transaction_is_left_open(self):
+        self.connection.execute("INSERT INTO note (session_id, text) VALUES (1, 'draft')")
+        self.assertTrue(self.connection.in_transaction)
+        npexport.export(self.connection, 1, self.directory.name, ("housekeeping",))
+        self.assertTrue(self.connection.in_transaction)
+        self.connection.rollback()
+        self.assertEqual(
+            self.connection.execute("SELECT COUNT(*) FROM note").fetchone()[0], 0
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# EOF
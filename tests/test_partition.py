@@ -0,0 +1,95 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Regression tests for time-partitioned data files.
+#
+# tests/test_partition.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Run from the repository root:
+#       python3 -m unittest discover -s tests
+#
+import os
+import sqlite3
+import calendar
+import tempfile
+import unittest
+
+import common
+import schema
+import phblob
+import npexport
+import partition
+import rowexport
+
+
+class QueryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        database = os.path.join(self.directory.name, "test.sqlite3")
+        self.connection = sqlite3.connect(database, isolation_level = None)
+        common.database(self.connection)
+        self.router = partition.Router(self.connection, "month")
+        # Two rows in each month of 2025, one partition per month
+        self.timestamps = [
+            calendar.timegm((2025, month, day, 0, 0, 0))
+            for month in range(1, 13) for day in (1, 15)
+        ]
+        rows = [[t, 1] + [0] * len(schema.HOUSEKEEPING.data) for t in self.timestamps]
+        self.router.prepare(rows[:16])
+        self.router.insert(schema.HOUSEKEEPING, rows[:16])
+        self.router.prepare(rows[16:])
+        self.router.insert(schema.HOUSEKEEPING, rows[16:])
+
+    def tearDown(self):
+        self.router.detach_all()
+        self.connection.close()
+        self.directory.cleanup()
+
+    def test_range_over_max_attached_partitions(self):
+        self.assertGreater(12, partition.Config.max_attached)
+        windows = self.router.windows(self.timestamps[0], self.timestamps[-1] + 1)
+        self.assertEqual(len(windows), 2)
+        rows = self.router.query(
+            "housekeeping", self.timestamps[0], self.timestamps[-1] + 1, "timestamp"
+        )
+        self.assertEqual([r[0] for r in rows], self.timestamps)
+        self.assertLessEqual(len(self.router.attached), partition.Config.max_attached)
+
+    def test_readers_include_partitions(self):
+        begin, end = self.timestamps[4], self.timestamps[10]
+        rows = rowexport.iter_rows(
+            self.connection, "housekeeping", 1, begin = begin, end = end, page_rows = 4
+        )
+        self.assertEqual([r[0] for r in rows], self.timestamps[4:10])
+        with self.assertRaises(ValueError):
+            list(rowexport.iter_rows(self.connection, "housekeeping"))
+        # Pulseheight events in the main database and in one partition
+        self.connection.execute(
+            schema.PULSEHEIGHT.insert, (self.timestamps[0] - 1, 1) + (0,) * 8
+        )
+        rows = [[self.timestamps[0], 1] + [1] * 8]
+        self.router.prepare(rows)
+        self.router.insert(schema.PULSEHEIGHT, rows)
+        self.assertEqual(npexport.count_rows(self.connection, "pulseheight", 1), 2)
+        events = [
+            t for timestamps, adc in phblob.iter_events(self.connection, 1)
+            for t in timestamps.tolist()
+        ]
+        self.assertEqual(events, [self.timestamps[0] - 1, self.timestamps[0]])
+
+    def test_recover_spans(self):
+        sql = "SELECT name, earliest, latest FROM data_partition ORDER BY name"
+        spans = self.connection.execute(sql).fetchall()
+        self.connection.execute("UPDATE data_partition SET latest = earliest")
+        self.assertEqual(len(partition.recover(self.connection)), len(spans))
+        self.assertEqual(self.connection.execute(sql).fetchall(), spans)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# EOF
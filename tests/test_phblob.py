@@ -0,0 +1,72 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Regression tests for compressed pulseheight chunk storage.
+#
+# tests/test_phblob.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Run from the repository root:
+#       python3 -m unittest discover -s tests
+#
+import numpy
+import sqlite3
+import unittest
+
+import common
+import schema
+import phblob
+
+
+def _adc(timestamps) -> numpy.ndarray:
+    return numpy.tile(numpy.arange(8), (len(timestamps), 1)) + numpy.asarray(timestamps)[:, None]
+
+
+class ChunkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = sqlite3.connect(":memory:")
+        common.database(self.connection)
+        self.timestamps = numpy.arange(1000, 1200, 2)
+        phblob.write(self.connection, 1, self.timestamps, _adc(self.timestamps), chunk_events = 40)
+
+    def tearDown(self):
+        self.connection.close()
+
+    def events(self) -> list:
+        return [
+            t for timestamps, adc in phblob.iter_events(self.connection, 1)
+            for t in timestamps.tolist()
+        ]
+
+    def test_overlapping_events_rejected(self):
+        for timestamps in ([1101, 1103], [990, 1000], [1198, 1250], [1300, 1300]):
+            with self.assertRaises(ValueError):
+                phblob.write(self.connection, 1, timestamps, _adc(timestamps))
+        self.connection.execute(schema.PULSEHEIGHT.insert, (1301, 1) + (0,) * 8)
+        with self.assertRaises(ValueError):
+            phblob.write(self.connection, 1, [1299, 1301], _adc([1299, 1301]))
+        self.assertEqual(self.events(), self.timestamps.tolist() + [1301])
+
+    def test_compact_merges_row_events_into_chunks(self):
+        rows = [1001, 1077, 1199, 1500]
+        self.connection.executemany(
+            schema.PULSEHEIGHT.insert,
+            [(t, 1) + tuple(a) for t, a in zip(rows, _adc(rows).tolist())]
+        )
+        self.assertEqual(phblob.compact(self.connection, 1, chunk_events = 40), len(rows))
+        expected = sorted(self.timestamps.tolist() + rows)
+        self.assertEqual(self.events(), expected)
+        chunks = self.connection.execute(
+            "SELECT timestamp, latest FROM pulseheight_chunk ORDER BY timestamp"
+        ).fetchall()
+        self.assertTrue(all(a[1] < b[0] for a, b in zip(chunks, chunks[1:])))
+        self.assertEqual(phblob.count_events(self.connection, 1), len(expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# EOF
@@ -0,0 +1,126 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Regression tests for incremental pulseheight histograms.
+#
+# tests/test_phhist.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Run from the repository root:
+#       python3 -m unittest discover -s tests
+#
+import numpy
+import sqlite3
+import unittest
+
+import common
+import schema
+import phblob
+import phhist
+import csvimport
+
+
+def _expected(values: numpy.ndarray, width: int) -> tuple:
+    edges, counts = numpy.unique(values // width * width, return_counts = True)
+    return edges.tolist(), counts.tolist()
+
+
+class HistogramTest(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = sqlite3.connect(":memory:")
+        common.database(self.connection)
+        rng = numpy.random.default_rng(1)
+        self.adc = rng.integers(0, 1024, (300, len(phhist.DETECTORS)))
+        self.timestamps = numpy.arange(1000, 1000 + 15 * len(self.adc), 15)
+        # First 100 events as rows, the rest in chunks
+        self.connection.executemany(
+            schema.PULSEHEIGHT.insert,
+            [
+                (int(t), 1) + tuple(a.tolist())
+                for t, a in zip(self.timestamps[:100], self.adc[:100])
+            ]
+        )
+        phblob.write(self.connection, 1, self.timestamps[100:], self.adc[100:])
+        self.connection.commit()
+
+    def tearDown(self):
+        self.connection.close()
+
+    def query(self, detector: str, width: int = None) -> tuple:
+        bins, counts = phhist.query(self.connection, 1, detector, width)
+        return bins.tolist(), counts.tolist()
+
+    def test_rebuild_matches_events(self):
+        self.assertEqual(phhist.rebuild(self.connection, 1), len(self.adc))
+        for i, detector in enumerate(phhist.DETECTORS):
+            width = phhist.Config.layout[detector]
+            self.assertEqual(self.query(detector), _expected(self.adc[:, i], width))
+            self.assertEqual(
+                self.query(detector, 4 * width), _expected(self.adc[:, i], 4 * width)
+            )
+        with self.assertRaises(ValueError):
+            self.query("ac1", phhist.Config.layout["ac1"] + 1)
+
+    def test_update_adds_to_rebuilt(self):
+        phhist.rebuild(self.connection, 1)
+        phhist.update(self.connection, 1, self.adc)
+        bins, counts = _expected(self.adc[:, 0], 8)
+        self.assertEqual(self.query("ac1", 8), (bins, [2 * c for c in counts]))
+
+    def test_mixed_widths_are_combined(self):
+        phhist.update(self.connection, 1, self.adc[:100], {d: 8 for d in phhist.DETECTORS})
+        phhist.update(self.connection, 1, self.adc[100:], {d: 12 for d in phhist.DETECTORS})
+        # Default is the least common multiple of the stored widths
+        self.assertEqual(self.query("d1a"), _expected(self.adc[:, 1], 24))
+        self.assertEqual(self.query("d1a", 48), _expected(self.adc[:, 1], 48))
+        for width in (8, 12, 36):
+            with self.assertRaises(ValueError):
+                self.query("d1a", width)
+
+
+class LayoutTest(unittest.TestCase):
+
+    def test_parse(self):
+        self.assertEqual(phhist.parse_layout("4"), dict.fromkeys(phhist.DETECTORS, 4))
+        layout = phhist.parse_layout("4, ac1=16,ac2=16")
+        self.assertEqual((layout["ac1"], layout["d1a"], layout["ac2"]), (16, 4, 16))
+        layout = phhist.parse_layout("d3=2")
+        self.assertEqual(layout["d3"], 2)
+        self.assertEqual(layout["d1a"], phhist.Config.layout["d1a"])
+        for text in ("", "0", "ac1=x", "ac3=8", "-4"):
+            with self.subTest(text = text):
+                with self.assertRaises(ValueError):
+                    phhist.parse_layout(text)
+
+    def test_writers_use_given_layout(self):
+        connection = sqlite3.connect(":memory:")
+        common.database(connection)
+        adc = numpy.arange(64 * len(phhist.DETECTORS)).reshape(64, -1)
+        for storage, session_id in (("rows", 1), ("zlib", 2)):
+            with self.subTest(storage = storage):
+                csvimport.write_events(
+                    connection, session_id, numpy.arange(64) + 1000 * session_id, adc,
+                    storage, phhist.parse_layout("16,ac1=32")
+                )
+                self.assertEqual(
+                    dict(
+                        connection.execute(
+                            """
+                            SELECT DISTINCT detector, width FROM pulseheight_histogram
+                            WHERE session_id = ? AND detector IN ('ac1', 'd1a')
+                            """,
+                            (session_id,)
+                        )
+                    ),
+                    {"ac1": 32, "d1a": 16}
+                )
+        connection.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# EOF
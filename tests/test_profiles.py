@@ -0,0 +1,119 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Regression tests for the database PRAGMA profiles.
+#
+# tests/test_profiles.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Run from the repository root:
+#       python3 -m unittest discover -s tests
+#
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import common
+import schema
+import setup
+import profiles
+
+
+def _pragma(connection, name: str):
+    return connection.execute("PRAGMA {}".format(name)).fetchone()[0]
+
+
+class ProfileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.directory.name, "patemon.sqlite3")
+        self.connection = sqlite3.connect(self.database)
+
+    def tearDown(self):
+        self.connection.close()
+        self.directory.cleanup()
+
+    def create(self, settings: dict):
+        profiles.create(self.connection, settings)
+        schema.create(self.connection)
+        profiles.record(self.connection, settings)
+
+    def test_create_sets_creation_time_pragmas(self):
+        self.create(profiles.profile("PRD"))
+        self.assertEqual(_pragma(self.connection, "page_size"), 16384)
+        self.assertEqual(_pragma(self.connection, "auto_vacuum"), 2)    # INCREMENTAL
+        self.assertEqual(_pragma(self.connection, "journal_mode"), "wal")
+        with self.assertRaises(ValueError):
+            profiles.create(self.connection, profiles.profile("DEV"))
+
+    def test_record_and_apply(self):
+        settings = profiles.profile("UAT", {"cache_size": "-4096"})
+        self.create(settings)
+        self.assertEqual(
+            dict(self.connection.execute("SELECT name, value FROM connection_pragma")),
+            {name: str(settings[name]) for name in profiles.RUNTIME}
+        )
+        # Runtime settings are per connection
+        connection = sqlite3.connect(self.database)
+        self.assertNotEqual(_pragma(connection, "cache_size"), -4096)
+        self.assertEqual(
+            profiles.apply(connection),
+            {name: str(settings[name]) for name in profiles.RUNTIME}
+        )
+        self.assertEqual(_pragma(connection, "cache_size"), -4096)
+        self.assertEqual(_pragma(connection, "synchronous"), 1)          # NORMAL
+        self.assertEqual(_pragma(connection, "wal_autocheckpoint"), 10000)
+        self.assertEqual(_pragma(connection, "foreign_keys"), 1)
+        connection.close()
+
+    def test_apply_without_recorded_settings(self):
+        self.assertEqual(profiles.apply(self.connection), {})
+
+
+class InstallConfigTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "install.config")
+        self.mode = setup.Config.Mode.default
+        self.pragmas = dict(setup.Config.DB.pragmas)
+
+    def tearDown(self):
+        setup.Config.Mode.default = self.mode
+        setup.Config.DB.pragmas.clear()
+        setup.Config.DB.pragmas.update(self.pragmas)
+        self.directory.cleanup()
+
+    def read(self, database: str) -> dict:
+        with open(self.filename, "w") as file:
+            file.write("[Config]\nmode = UAT\n\n[Database]\n" + database)
+        setup.read_config(self.filename)
+        return profiles.profile(setup.Config.Mode.default, setup.Config.DB.pragmas)
+
+    def test_overrides(self):
+        settings = self.read("cache_size = -32768\nsynchronous = FULL\n")
+        self.assertEqual(setup.Config.Mode.default, "UAT")
+        self.assertEqual(settings["cache_size"], "-32768")
+        self.assertEqual(settings["synchronous"], "FULL")
+        self.assertEqual(settings["page_size"], profiles.PROFILES["UAT"]["page_size"])
+
+    def test_invalid_overrides_are_rejected(self):
+        for database in (
+            "cache_size = 1; DROP TABLE psu\n",
+            "synchronous = \n",
+            "locking_mode = EXCLUSIVE\n"
+        ):
+            with self.subTest(database = database):
+                setup.Config.DB.pragmas.clear()
+                with self.assertRaises(ValueError):
+                    self.read(database)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# EOF
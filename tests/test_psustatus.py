@@ -0,0 +1,119 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Regression tests for PSU status publishing.
+#
+# tests/test_psustatus.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Run from the repository root:
+#       python3 -m unittest discover -s tests
+#
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import common
+import schema
+import psustatus
+
+
+READING = ('ON', 5.0, 1.0, 0.5, 4.9)
+
+
+class PublishTest(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = sqlite3.connect(":memory:")
+        self.connection.execute(schema.PSU.ddl)
+        self.connection.execute(schema.TRIGGERS["psu_ari"])
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_unchanged_reading_is_not_written(self):
+        self.assertTrue(psustatus.publish(self.connection, *READING))
+        self.assertFalse(psustatus.publish(self.connection, *READING))
+        self.assertFalse(self.connection.in_transaction)
+        self.assertTrue(psustatus.publish(self.connection, 'OFF', *READING[1:]))
+
+    def test_unchanged_reading_is_a_heartbeat(self):
+        psustatus.publish(self.connection, *READING)
+        self.connection.execute(
+            "UPDATE psu SET modified = datetime('now', ?)",
+            ("-{} seconds".format(psustatus.HEARTBEAT + 1),)
+        )
+        self.connection.commit()
+        self.assertTrue(psustatus.publish(self.connection, *READING))
+        self.assertEqual(
+            self.connection.execute(
+                "SELECT modified > datetime('now', '-2 seconds') FROM psu"
+            ).fetchone()[0],
+            1
+        )
+
+    def test_publish_within_a_second_is_written_once(self):
+        psustatus.publish(self.connection, *READING)
+        changes = self.connection.total_changes
+        self.assertTrue(psustatus.publish(self.connection, 'OFF', *READING[1:]))
+        # Same second: 'modified' is unchanged, trigger must not rewrite it
+        self.assertEqual(self.connection.total_changes - changes, 1)
+
+    def test_publish_does_not_need_the_trigger(self):
+        self.connection.execute("DROP TRIGGER psu_ari")
+        psustatus.publish(self.connection, *READING)
+        self.connection.execute("UPDATE psu SET modified = '2000-01-01 00:00:00'")
+        self.connection.commit()
+        self.assertTrue(psustatus.publish(self.connection, 'OFF', *READING[1:]))
+        self.assertEqual(
+            self.connection.execute(
+                "SELECT modified > datetime('now', '-2 seconds') FROM psu"
+            ).fetchone()[0],
+            1
+        )
+
+    def test_plain_update_refreshes_modified(self):
+        psustatus.publish(self.connection, *READING)
+        self.connection.execute("UPDATE psu SET modified = '2000-01-01 00:00:00'")
+        self.connection.execute("UPDATE psu SET measured_current = 0.4")
+        self.connection.commit()
+        self.assertEqual(
+            self.connection.execute(
+                "SELECT modified > datetime('now', '-2 seconds') FROM psu"
+            ).fetchone()[0],
+            1
+        )
+
+
+class MirrorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "psu")
+        self.mirror = psustatus.StatusMirror(self.filename)
+        self.reader = psustatus.StatusReader(self.filename)
+
+    def tearDown(self):
+        self.reader.close()
+        self.mirror.close()
+        self.directory.cleanup()
+
+    def test_read(self):
+        self.assertIsNone(self.reader.read())
+        self.mirror.write(*READING)
+        self.assertEqual(self.reader.read()[:5], READING)
+
+    def test_reader_gives_up_on_a_stuck_writer(self):
+        self.mirror.write(*READING)
+        psustatus._HEADER.pack_into(self.mirror.map, 0, self.mirror.sequence + 1)
+        with self.assertRaises(TimeoutError):
+            self.reader.read(retries = 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# EOF
@@ -0,0 +1,152 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Regression tests for hitcount rollups.
+#
+# tests/test_rollup.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Run from the repository root:
+#       python3 -m unittest discover -s tests
+#
+import os
+import numpy
+import sqlite3
+import tempfile
+import unittest
+import collections
+
+import common
+import schema
+import ingest
+import rollup
+import hitblob
+
+
+class RollupTest(unittest.TestCase):
+    """Rollups against aggregates computed from the raw rows."""
+    hitcount = "table"
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.directory.name, "test.sqlite3")
+        connection = sqlite3.connect(self.database)
+        common.database(connection, sessions = 2, hitcount = self.hitcount)
+        connection.commit()
+        connection.close()
+        self.writer = ingest.Writer(self.database)
+        schema.register(self.writer.connection)
+        # Rotations of two sessions over two days, ending off bucket edges
+        # (timestamps are primary keys; sessions are a second apart)
+        rng = numpy.random.default_rng(1)
+        start = 86400 * 20000 - 3600 + 7
+        self.rows = [
+            [start + 15 * i + session_id, session_id] +
+            rng.integers(0, hitblob.COUNTER_MAX + 1, hitblob.NCOUNTERS).tolist()
+            for session_id in (1, 2)
+            for i in range(0, 12000, 37 if session_id == 1 else 89)
+        ]
+
+    def tearDown(self):
+        self.writer.connection.close()
+        self.directory.cleanup()
+
+    def ingest(self, batch_rows: int):
+        """Submit the rows in batches, later batches before earlier ones."""
+        batches = [
+            self.rows[i:i + batch_rows] for i in range(0, len(self.rows), batch_rows)
+        ]
+        for rows in batches[1::2] + batches[0::2]:
+            submission = ingest.Submission("hitcount", rows)
+            self.writer.write([submission])
+            self.assertIsNone(submission.error)
+
+    def expected(self, session_id: int) -> dict:
+        """resolution: {bucket: (rotations, sums, mins, maxs)} from the rows
+        of table (or view) 'hitcount'."""
+        rows = self.writer.connection.execute(
+            "SELECT * FROM hitcount WHERE session_id = ?", (session_id,)
+        ).fetchall()
+        result = {}
+        for resolution in rollup.RESOLUTIONS:
+            groups = collections.defaultdict(list)
+            for row in rows:
+                groups[row[0] // resolution * resolution].append(row[2:])
+            result[resolution] = {}
+            for bucket, group in groups.items():
+                data = numpy.array(group, dtype = numpy.int64)
+                result[resolution][bucket] = (
+                    len(group),
+                    data.sum(axis = 0).tolist(),
+                    data.min(axis = 0).tolist(),
+                    data.max(axis = 0).tolist()
+                )
+        return result
+
+    def stored(self, session_id: int, resolution: int) -> dict:
+        return {
+            bucket: (
+                rotations,
+                numpy.frombuffer(sums, dtype = rollup.SUM).tolist(),
+                numpy.frombuffer(mins, dtype = rollup.MINMAX).tolist(),
+                numpy.frombuffer(maxs, dtype = rollup.MINMAX).tolist()
+            )
+            for bucket, rotations, sums, mins, maxs in self.writer.connection.execute(
+                """
+                SELECT  bucket, rotations, sums, mins, maxs
+                FROM    hitcount_rollup
+                WHERE   session_id = ? AND resolution = ?
+                """,
+                (session_id, resolution)
+            )
+        }
+
+    def assertRollups(self):
+        for session_id in (1, 2):
+            expected = self.expected(session_id)
+            for resolution in rollup.RESOLUTIONS:
+                with self.subTest(session_id = session_id, resolution = resolution):
+                    self.assertGreater(len(expected[resolution]), 1)
+                    self.assertEqual(
+                        self.stored(session_id, resolution), expected[resolution]
+                    )
+
+    def test_ingest_batches_merge_into_buckets(self):
+        self.ingest(batch_rows = 23)
+        self.assertRollups()
+
+    def test_rebuild(self):
+        self.ingest(batch_rows = 100)
+        self.writer.connection.execute(
+            "UPDATE hitcount_rollup SET rotations = 0 WHERE session_id = 1"
+        )
+        self.writer.connection.execute(
+            "DELETE FROM hitcount_rollup WHERE session_id = 2 AND resolution = 60"
+        )
+        for session_id in (1, 2):
+            rotations = rollup.rebuild(self.writer.connection, session_id, chunk_rows = 50)
+            self.assertEqual(rotations, sum(1 for r in self.rows if r[1] == session_id))
+        self.assertRollups()
+
+    def test_query_picks_resolution(self):
+        self.ingest(batch_rows = 100)
+        # Whole buckets; a query returns the buckets that [begin, end[ touches
+        begin, end = 86400 * 20000, 86400 * 20001
+        result = rollup.query(self.writer.connection, 1, begin, end, 100)
+        self.assertEqual(result.resolution, 60)
+        self.assertEqual(
+            int(result.rotations.sum()),
+            sum(1 for r in self.rows if r[1] == 1 and begin <= r[0] < end)
+        )
+
+
+class PackedRollupTest(RollupTest):
+    hitcount = "uint32"
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# EOF
@@ -0,0 +1,65 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Regression tests for keyset-paginated table export.
+#
+# tests/test_rowexport.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Run from the repository root:
+#       python3 -m unittest discover -s tests
+#
+import numpy
+import sqlite3
+import unittest
+
+import common
+import schema
+import phblob
+import rowexport
+
+
+class PulseheightTest(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = sqlite3.connect(":memory:")
+        common.database(self.connection, sessions = 3)
+        self.expected = []
+        # Sessions 1 and 2 in chunks (and a row event), 3 in rows only
+        for session_id, first in ((1, 1000), (2, 5000), (3, 3000)):
+            timestamps = numpy.arange(first, first + 300, 2)
+            adc = numpy.tile(numpy.arange(8), (len(timestamps), 1)) + session_id
+            if session_id == 3:
+                self.connection.executemany(
+                    schema.PULSEHEIGHT.insert,
+                    [(int(t), session_id) + tuple(a) for t, a in zip(timestamps, adc.tolist())]
+                )
+            else:
+                phblob.write(self.connection, session_id, timestamps, adc, chunk_events = 64)
+                self.connection.execute(
+                    schema.PULSEHEIGHT.insert, (first + 301, session_id) + (0,) * 8
+                )
+                self.expected.append((first + 301, session_id) + (0,) * 8)
+            self.expected.extend(
+                (int(t), session_id) + tuple(a) for t, a in zip(timestamps, adc.tolist())
+            )
+        self.expected.sort()
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_all_sessions_in_timestamp_order(self):
+        rows = list(rowexport.iter_rows(self.connection, "pulseheight", page_rows = 100))
+        self.assertEqual(rows, self.expected)
+
+    def test_session(self):
+        rows = list(rowexport.iter_rows(self.connection, "pulseheight", 2, page_rows = 100))
+        self.assertEqual(rows, [r for r in self.expected if r[1] == 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# EOF
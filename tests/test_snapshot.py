@@ -0,0 +1,137 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Regression tests for online backups and snapshot rotation.
+#
+# tests/test_snapshot.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Run from the repository root:
+#       python3 -m unittest discover -s tests
+#
+import os
+import sqlite3
+import calendar
+import tempfile
+import unittest
+
+import common
+import schema
+import snapshot
+import partition
+
+
+class BackupTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.directory.name, "patemon.sqlite3")
+        self.connection = sqlite3.connect(self.database)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        common.database(self.connection)
+        self.connection.executemany(
+            schema.HOUSEKEEPING.insert,
+            [(t, 1) + (0,) * len(schema.HOUSEKEEPING.data) for t in range(1000, 5000)]
+        )
+        self.connection.commit()
+
+    def tearDown(self):
+        self.connection.close()
+        self.directory.cleanup()
+
+    def test_backup_copies_committed_rows(self):
+        # Uncommitted rows are not part of the snapshot
+        self.connection.execute(
+            schema.HOUSEKEEPING.insert, (5000, 1) + (0,) * len(schema.HOUSEKEEPING.data)
+        )
+        filename = os.path.join(self.directory.name, "copy.sqlite3")
+        result = snapshot.backup(self.database, filename, pages = 4, sleep = 0)
+        self.assertEqual(result.filename, filename)
+        self.assertEqual(result.bytes, os.path.getsize(filename))
+        self.assertFalse(os.path.exists(filename + ".partial"))
+        copy = snapshot.connect_readonly(filename)
+        self.assertEqual(copy.execute("PRAGMA journal_mode").fetchone()[0], "delete")
+        self.assertEqual(copy.execute("SELECT COUNT(*) FROM housekeeping").fetchone()[0], 4000)
+        copy.close()
+
+    def test_partitions_are_copied_with_snapshot(self):
+        router = partition.Router(self.connection, "month")
+        rows = [
+            [calendar.timegm((2025, month, 1, 0, 0, 0)), 1] +
+            [0] * len(schema.HOUSEKEEPING.data) for month in (1, 2, 3)
+        ]
+        router.prepare(rows)
+        router.insert(schema.HOUSEKEEPING, rows)
+        self.connection.commit()
+        router.detach_all()
+        directory = os.path.join(self.directory.name, "backup")
+        os.mkdir(directory)
+        filename = os.path.join(directory, "patemon.20261016-120000.sqlite3")
+        result = snapshot.backup(self.database, filename, sleep = 0)
+        names = ["2025-01", "2025-02", "2025-03"]
+        self.assertEqual(
+            result.partitions, [partition.filename(filename, n) for n in names]
+        )
+        self.assertEqual(snapshot.snapshots(self.database, directory), [filename])
+        readonly = os.path.join(self.directory.name, "patemon.snapshot.sqlite3")
+        snapshot.publish(filename, readonly)
+        # Rows added to the live partitions afterwards are not in the copies
+        added = [[rows[0][0] + 1] + rows[0][1:]]
+        router.prepare(added)
+        router.insert(schema.HOUSEKEEPING, added)
+        self.connection.commit()
+        router.detach_all()
+        for copy in (filename, readonly):
+            with self.subTest(copy = copy):
+                connection = snapshot.connect_readonly(copy)
+                self.assertEqual(
+                    connection.execute(
+                        "SELECT name, filename FROM data_partition ORDER BY name"
+                    ).fetchall(),
+                    [(n, partition.filename(copy, n)) for n in names]
+                )
+                relation = partition.relation(connection, "housekeeping")
+                self.assertEqual(
+                    connection.execute(
+                        "SELECT COUNT(*) FROM {}".format(relation)
+                    ).fetchone()[0],
+                    4000 + len(rows)
+                )
+                connection.close()
+        self.assertEqual(snapshot.rotate(self.database, directory, 0), [filename])
+        self.assertEqual(os.listdir(directory), [])
+
+    def test_rotate_keeps_newest(self):
+        directory = os.path.join(self.directory.name, "backup")
+        os.mkdir(directory)
+        names = [
+            "patemon.2026101{}-120000.sqlite3".format(day) for day in (3, 1, 4, 2)
+        ] + ["other.20261015-120000.sqlite3", "patemon.sqlite3"]
+        for name in names:
+            open(os.path.join(directory, name), "w").close()
+        removed = snapshot.rotate(self.database, directory, 2)
+        self.assertEqual(
+            [os.path.basename(f) for f in removed],
+            ["patemon.20261011-120000.sqlite3", "patemon.20261012-120000.sqlite3"]
+        )
+        self.assertEqual(
+            sorted(os.listdir(directory)),
+            [
+                "other.20261015-120000.sqlite3",
+                "patemon.20261013-120000.sqlite3",
+                "patemon.20261014-120000.sqlite3",
+                "patemon.sqlite3"
+            ]
+        )
+        self.assertEqual(snapshot.rotate(self.database, directory, 0), [
+            os.path.join(directory, "patemon.20261013-120000.sqlite3"),
+            os.path.join(directory, "patemon.20261014-120000.sqlite3")
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# EOF
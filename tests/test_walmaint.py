@@ -0,0 +1,147 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# Regression tests for the WAL checkpoint maintenance daemon.
+#
+# tests/test_walmaint.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   Run from the repository root:
+#       python3 -m unittest discover -s tests
+#
+import os
+import sqlite3
+import logging
+import tempfile
+import unittest
+
+import common
+import schema
+import walmaint
+
+
+class MaintainerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.truncate_size = walmaint.Config.truncate_size
+        self.directory = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.directory.name, "patemon.sqlite3")
+        self.writer = sqlite3.connect(self.database)
+        self.writer.execute("PRAGMA journal_mode = WAL")
+        common.database(self.writer)
+        self.writer.commit()
+        # Writers leave checkpoints to walmaint
+        walmaint.configure(self.writer)
+        logging.disable(logging.INFO)
+        self.maintainer = walmaint.Maintainer(self.database)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        self.maintainer.connection.close()
+        self.writer.close()
+        self.directory.cleanup()
+        walmaint.Config.truncate_size = self.truncate_size
+
+    def insert(self, first: int, n: int = 200):
+        self.writer.executemany(
+            schema.HOUSEKEEPING.insert,
+            [(t, 1) + (t,) * len(schema.HOUSEKEEPING.data) for t in range(first, first + n)]
+        )
+        self.writer.commit()
+
+    def wal_size(self) -> int:
+        return os.path.getsize(walmaint.sidecar_files(self.database)[0])
+
+    def test_passive_checkpoint(self):
+        self.insert(1000)
+        busy, frames, done, _ = walmaint.checkpoint(self.maintainer.connection)
+        self.assertEqual((busy, done), (0, frames))
+        self.assertGreater(frames, 0)
+        # step() counts the frames, keeps the WAL and shortens the interval
+        self.insert(2000)
+        interval = self.maintainer.interval
+        self.maintainer.step()
+        frames, done = self.maintainer.previous
+        self.assertGreater(frames, 0)
+        self.assertEqual(done, frames)
+        self.assertGreater(self.wal_size(), 0)
+        self.assertLess(self.maintainer.interval, interval)
+        # Nothing written; interval grows back
+        self.maintainer.step()
+        self.assertGreater(self.maintainer.interval, interval / 2)
+
+    def test_truncate_once_wal_exceeds_threshold(self):
+        self.insert(1000)
+        walmaint.Config.truncate_size = self.wal_size()
+        self.maintainer.step()
+        self.assertGreater(self.wal_size(), 0)
+        # Writers reuse the checkpointed WAL from its start; it grows only
+        # for a larger transaction
+        self.insert(2000, 10000)
+        self.assertGreater(self.wal_size(), walmaint.Config.truncate_size)
+        self.maintainer.step()
+        self.assertEqual(self.wal_size(), 0)
+        self.assertEqual(self.maintainer.previous, (0, 0))
+        self.assertTrue(os.path.exists(walmaint.sidecar_files(self.database)[1]))
+
+    def test_fix_ownership(self):
+        os.chmod(self.database, 0o664)
+        for filename in walmaint.sidecar_files(self.database):
+            os.chmod(filename, 0o600)
+            if os.geteuid() == 0:
+                os.chown(filename, 12345, 12345)
+        walmaint.fix_ownership(self.database)
+        st = os.stat(self.database)
+        for filename in walmaint.sidecar_files(self.database):
+            with self.subTest(filename = filename):
+                fs = os.stat(filename)
+                self.assertEqual(fs.st_mode & 0o777, 0o664)
+                self.assertEqual((fs.st_uid, fs.st_gid), (st.st_uid, st.st_gid))
+
+
+class IncrementalVacuumTest(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = sqlite3.connect(":memory:", isolation_level = None)
+
+    def tearDown(self):
+        self.connection.close()
+
+    def free(self) -> int:
+        return self.connection.execute("PRAGMA freelist_count").fetchone()[0]
+
+    def fill_and_delete(self):
+        self.connection.execute("BEGIN")
+        common.database(self.connection)
+        self.connection.executemany(
+            schema.HOUSEKEEPING.insert,
+            [(t, 1) + (t,) * len(schema.HOUSEKEEPING.data) for t in range(2000)]
+        )
+        self.connection.execute("DELETE FROM housekeeping")
+        self.connection.execute("COMMIT")
+
+    def test_loop_releases_free_pages(self):
+        self.connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self.fill_and_delete()
+        free = self.free()
+        self.assertGreater(free, 10)
+        self.assertEqual(walmaint.incremental_vacuum(self.connection, 10), 10)
+        self.assertEqual(self.free(), free - 10)
+        while walmaint.incremental_vacuum(self.connection, 10):
+            pass
+        self.assertEqual(self.free(), 0)
+        self.assertFalse(self.connection.in_transaction)
+
+    def test_other_auto_vacuum_modes_are_left_alone(self):
+        self.fill_and_delete()
+        free = self.free()
+        self.assertEqual(walmaint.incremental_vacuum(self.connection, 10), 0)
+        self.assertEqual(self.free(), free)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# EOF
@@ -0,0 +1,285 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PATE Monitor / Development Utility 2018
+# WAL checkpoint maintenance daemon.
+#
+# walmaint.py
+#   0.1.0   2026.10.16  Initial version.
+#
+#   In WAL mode, SQLite creates '-wal' and '-shm' files under the ownership
+#   of whoever happens to open the database first, and removes them when
+#   the last connection closes. With several users ('patemon' daemons,
+#   'www-data' web UI), a file owned by one user may lock out the others.
+#
+#   This daemon:
+#       - Keeps one connection open at all times, so that SQLite never
+#         removes the WAL/SHM files (TRUNCATE checkpoints only zero them).
+#       - Gives the WAL/SHM files the ownership and mode of the database
+#         file itself (as set by setup.py), and repairs them if needed.
+#       - Takes checkpointing away from the writers. Writers should call
+#         configure() on connect, so that no commit ends up doing an
+#         automatic checkpoint ("long commit"). Automatic checkpoints stay
+#         enabled at 'backstop' pages, which the WAL reaches only when this
+#         daemon is not running; the WAL never grows without bound.
+#       - Runs PASSIVE checkpoints on an adaptive schedule; more often when
+#         the WAL grows fast, less often when idle. When the WAL exceeds
+#         'truncate_size' and has been fully checkpointed, a TRUNCATE
+#         checkpoint resets it, unless readers keep it busy.
+#       - Logs checkpoint duration and the number of frames moved.
+#       - In databases created with auto_vacuum = INCREMENTAL (profiles.py;
+#         UAT, PRD), returns free pages to the file system, at most
+#         'vacuum_pages' per cycle, so that no writer waits behind it long.
+#
+import os
+import time
+import signal
+import sqlite3
+import threading
+import logging
+import argparse
+
+import profiles
+
+
+class Config:
+    log_level       = "INFO"
+    log_file        = None          # None = stderr
+    database        = "/srv/patemon.sqlite3"
+    class Interval:
+        min         = 0.5           # seconds between checkpoints, lower bound
+        max         = 30.0          # upper bound, reached when idle
+        default     = 5.0
+    truncate_size   = 4 * 2**20     # WAL bytes that trigger TRUNCATE
+    busy_timeout    = 0.1           # seconds; do not queue behind readers
+    vacuum_pages    = 256           # free pages released per cycle, at most
+    backstop        = 10000         # wal_autocheckpoint pages of configure()
+
+
+log = logging.getLogger("walmaint")
+
+
+def configure(connection):
+    """Writers: leave checkpoints to this daemon (see module header)."""
+    connection.execute("PRAGMA wal_autocheckpoint = {}".format(Config.backstop))
+
+
+def sidecar_files(database: str) -> tuple:
+    return (database + "-wal", database + "-shm")
+
+
+def fix_ownership(database: str):
+    """Give WAL/SHM files the owner, group and mode of the database file."""
+    st = os.stat(database)
+    for filename in sidecar_files(database):
+        try:
+            fs = os.stat(filename)
+        except FileNotFoundError:
+            continue
+        if (fs.st_uid, fs.st_gid) != (st.st_uid, st.st_gid):
+            try:
+                os.chown(filename, st.st_uid, st.st_gid)
+                log.info(
+                    "'{}' ownership set to {}:{}".format(
+                        filename, st.st_uid, st.st_gid
+                    )
+                )
+            except PermissionError:
+                log.error("Cannot change ownership of '{}'!".format(filename))
+        mode = st.st_mode & 0o777
+        if fs.st_mode & 0o777 != mode:
+            try:
+                os.chmod(filename, mode)
+                log.info("'{}' mode set to {:o}".format(filename, mode))
+            except PermissionError:
+                log.error("Cannot change mode of '{}'!".format(filename))
+
+
+def incremental_vacuum(connection, pages: int) -> int:
+    """Release up to 'pages' free pages of an auto_vacuum = INCREMENTAL
+    database. Returns the number of pages released."""
+    if connection.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return 0
+    free = connection.execute("PRAGMA freelist_count").fetchone()[0]
+    if not free:
+        return 0
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        # Each step releases one page, and sqlite3 steps a statement that
+        # has no result columns only once
+        for _ in range(min(free, pages)):
+            connection.execute("PRAGMA incremental_vacuum")
+        released = free - connection.execute("PRAGMA freelist_count").fetchone()[0]
+        connection.execute("COMMIT")
+    except:
+        connection.execute("ROLLBACK")
+        raise
+    return released
+
+
+def checkpoint(connection, mode: str = "PASSIVE") -> tuple:
+    """Run checkpoint, returns (busy, wal frames, checkpointed frames, seconds)."""
+    start = time.perf_counter()
+    busy, frames, done = connection.execute(
+        "PRAGMA wal_checkpoint({})".format(mode)
+    ).fetchone()
+    return busy, frames, done, time.perf_counter() - start
+
+
+class Maintainer:
+    """Checkpoint scheduler. Call run() to loop until stop() is called."""
+    def __init__(self, database: str):
+        self.database   = database
+        self.interval   = Config.Interval.default
+        self.previous   = (0, 0)    # (wal frames, checkpointed frames)
+        self.stopped    = threading.Event()
+        self.connection = sqlite3.connect(
+            database,
+            timeout = Config.busy_timeout,
+            isolation_level = None
+        )
+        mode = self.connection.execute("PRAGMA journal_mode").fetchone()[0]
+        if mode != "wal":
+            raise ValueError(
+                "Database '{}' is not in WAL mode ('{}')".format(database, mode)
+            )
+        profiles.apply(self.connection)
+        configure(self.connection)
+        # A read creates the WAL/SHM files; this connection keeps them alive
+        self.connection.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        fix_ownership(database)
+
+    def step(self):
+        """One maintenance cycle; adjusts self.interval."""
+        fix_ownership(self.database)
+        busy, frames, done, duration = checkpoint(self.connection)
+        if frames < 0:
+            # Not in WAL mode anymore (or WAL could not be opened)
+            log.error("Checkpoint failed (busy={}, frames={})".format(busy, frames))
+            return
+        prev_frames, prev_done = self.previous
+        if frames < prev_frames:
+            # WAL was restarted by a writer since previous cycle
+            prev_frames, prev_done = 0, 0
+        moved = max(done - prev_done, 0)
+        grown = frames - prev_frames
+        self.previous = (frames, done)
+        if moved or grown:
+            log.info(
+                "PASSIVE checkpoint: {} frames moved, {}/{} done, {:.1f} ms".format(
+                    moved, done, frames, duration * 1000
+                )
+            )
+        #
+        # Reset WAL once it has grown big and everything has been copied
+        #
+        try:
+            wal_size = os.path.getsize(sidecar_files(self.database)[0])
+        except FileNotFoundError:
+            # Removed by another process (last connection closed)
+            wal_size = 0
+        if wal_size > Config.truncate_size and done == frames:
+            busy, frames, done, duration = checkpoint(self.connection, "TRUNCATE")
+            if busy:
+                log.info(
+                    "TRUNCATE checkpoint blocked by readers ({:.1f} ms)".format(
+                        duration * 1000
+                    )
+                )
+            else:
+                log.info(
+                    "TRUNCATE checkpoint: {} bytes released, {:.1f} ms".format(
+                        wal_size, duration * 1000
+                    )
+                )
+                self.previous = (0, 0)
+        #
+        # Release free pages; checkpointed on the following cycles
+        #
+        try:
+            released = incremental_vacuum(self.connection, Config.vacuum_pages)
+        except sqlite3.OperationalError as e:
+            # A writer holds the lock; next cycle
+            log.debug("Incremental vacuum skipped: {}".format(e))
+            released = 0
+        if released:
+            log.info("Incremental vacuum: {} pages released".format(released))
+        #
+        # Adapt interval; readers left frames behind or WAL grows -> sooner
+        #
+        if done < frames or grown > 0:
+            self.interval = max(self.interval / 2, Config.Interval.min)
+        else:
+            self.interval = min(self.interval * 2, Config.Interval.max)
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                self.step()
+            except sqlite3.Error as e:
+                log.error("Maintenance cycle failed: {}".format(e))
+            self.stopped.wait(self.interval)
+        # Final checkpoint; files are left in place for the other users
+        checkpoint(self.connection, "TRUNCATE")
+        self.connection.close()
+
+    def stop(self, *args):
+        self.stopped.set()
+
+
+
+##############################################################################
+#
+# MAIN
+#
+##############################################################################
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description = "PATE Monitor database WAL checkpoint maintenance daemon."
+    )
+    parser.add_argument(
+        '-l',
+        '--log',
+        help    = "Set logging level. Default: '{}'".format(Config.log_level),
+        choices = ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
+        dest    = "log_level",
+        default = Config.log_level,
+        type    = str.upper,
+        metavar = "LEVEL"
+    )
+    parser.add_argument(
+        '-d',
+        '--database',
+        help    = "Database file. Default: '{}'".format(Config.database),
+        dest    = "database",
+        default = Config.database
+    )
+    parser.add_argument(
+        '--truncate',
+        help    = "WAL size (bytes) that triggers TRUNCATE. Default: {}".format(
+            Config.truncate_size
+        ),
+        dest    = "truncate_size",
+        default = Config.truncate_size,
+        type    = int
+    )
+    args = parser.parse_args()
+    Config.truncate_size = args.truncate_size
+
+    logging.basicConfig(
+        level       = getattr(logging, args.log_level),
+        filename    = Config.log_file,
+        format      = "%(asctime)s.%(msecs)03d %(levelname)s: %(message)s",
+        datefmt     = "%H:%M:%S"
+    )
+
+    maintainer = Maintainer(args.database)
+    signal.signal(signal.SIGTERM, maintainer.stop)
+    signal.signal(signal.SIGINT, maintainer.stop)
+    log.info("Maintaining '{}'".format(args.database))
+    maintainer.run()
+
+
+# EOF